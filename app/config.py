@@ -12,6 +12,36 @@ class Settings(BaseModel):
     cors_origins: list[str] = Field(default_factory=lambda: ["*"])  # Configure in prod
     default_tenant_name: str = Field(default=os.getenv("DEFAULT_TENANT", "demo"))
     timezone: str = Field(default=os.getenv("TZ", "Asia/Seoul"))
+    # Background job queue: "database" (optimize_jobs table, shared by all uvicorn workers) or "memory"
+    job_store: str = Field(default=os.getenv("JOB_STORE", "database"))
+    job_poll_interval: float = Field(default=float(os.getenv("JOB_POLL_INTERVAL", "1.0")))  # seconds between claims
+    job_workers: int = Field(default=int(os.getenv("JOB_WORKERS", "2")))
+    job_tenant_concurrency: int = Field(default=int(os.getenv("JOB_TENANT_CONCURRENCY", "1")))
+    job_timeout: float = Field(default=float(os.getenv("JOB_TIMEOUT", "600")))  # seconds per running job
+    job_ttl: float = Field(default=float(os.getenv("JOB_TTL", "3600")))  # keep finished jobs this long
+    # Where optimize jobs solve: "thread" (API process) or "process" (pre-forked worker pool)
+    optimize_execution: str = Field(default=os.getenv("OPTIMIZE_EXECUTION", "thread"))
+    optimize_processes: int = Field(default=int(os.getenv("OPTIMIZE_PROCESSES", "2")))
+    # Max age of the in-memory vacancy occupancy matrix (plan/room/timeslot changes rebuild it sooner)
+    vacancy_cache_ttl: float = Field(default=float(os.getenv("VACANCY_CACHE_TTL", "300")))
+    # /v1/vacancy/stream: how often each hub re-checks the plan (publishes in this process push at once)
+    vacancy_stream_poll: float = Field(default=float(os.getenv("VACANCY_STREAM_POLL", "5")))
+    vacancy_stream_heartbeat: float = Field(default=float(os.getenv("VACANCY_STREAM_HEARTBEAT", "15")))
+    # Max age of precomputed default timetables (plan/timeslot changes invalidate them sooner)
+    timetable_cache_ttl: float = Field(default=float(os.getenv("TIMETABLE_CACHE_TTL", "21600")))
+    # Background review analysis: sweep interval (seconds) and reviews per transaction
+    review_analysis_interval: float = Field(default=float(os.getenv("REVIEW_ANALYSIS_INTERVAL", "5")))
+    review_analysis_batch: int = Field(default=int(os.getenv("REVIEW_ANALYSIS_BATCH", "200")))
+    # api_keys.last_used_at is buffered in memory and flushed every N seconds or N keys
+    api_key_touch_interval: float = Field(default=float(os.getenv("API_KEY_TOUCH_INTERVAL", "30")))
+    api_key_touch_batch: int = Field(default=int(os.getenv("API_KEY_TOUCH_BATCH", "256")))
+    # Published plan versions kept per tenant for rollback
+    plan_history: int = Field(default=int(os.getenv("PLAN_HISTORY", "5")))
+    # Exact solver backends (ortools/pulp)
+    solver_time_limit: float = Field(default=float(os.getenv("SOLVER_TIME_LIMIT", "30")))
+    solver_workers: int = Field(default=int(os.getenv("SOLVER_WORKERS", "0")))  # 0 = all cores
+    # 0 = full model (millions of triples on the fixed dataset); with a cap, "optimal" only holds for the pruned model
+    solver_max_rooms_per_course: int = Field(default=int(os.getenv("SOLVER_MAX_ROOMS_PER_COURSE", "4")))
 
 
 @lru_cache(maxsize=1)
@@ -32,6 +32,9 @@ def _run_schema_upgrades() -> None:
         if "enrollment_open_until" not in tenant_cols:
             conn.execute(text("ALTER TABLE tenants ADD COLUMN enrollment_open_until TIMESTAMP NULL"))
             tenant_cols.add("enrollment_open_until")
+        if "active_plan_id" not in tenant_cols:
+            conn.execute(text("ALTER TABLE tenants ADD COLUMN active_plan_id INTEGER NULL"))
+            tenant_cols.add("active_plan_id")
         # api_keys.key_type
         api_key_cols = {col["name"] for col in inspector.get_columns("api_keys")}
         if "key_type" not in api_key_cols:
@@ -56,6 +59,45 @@ def _run_schema_upgrades() -> None:
         course_cols = {col["name"] for col in inspector.get_columns("courses")}
         if "department" not in course_cols:
             conn.execute(text("ALTER TABLE courses ADD COLUMN department VARCHAR(100)"))
+        # assignments.plan_id/retired_plan_id (NULL plan_id rows are the pre-versioning plan)
+        assignment_cols = {col["name"] for col in inspector.get_columns("assignments")}
+        if "plan_id" not in assignment_cols:
+            conn.execute(text("ALTER TABLE assignments ADD COLUMN plan_id INTEGER NULL"))
+            conn.execute(text("CREATE INDEX ix_assignments_plan_id ON assignments (plan_id)"))
+        if "retired_plan_id" not in assignment_cols:
+            conn.execute(text("ALTER TABLE assignments ADD COLUMN retired_plan_id INTEGER NULL"))
+            conn.execute(text("CREATE INDEX ix_assignments_retired_plan_id ON assignments (retired_plan_id)"))
+        # course_reviews.answers/analyzed_at: reviews written before the analysis queue were
+        # analyzed inline, so they start out as done
+        if inspector.has_table("course_reviews"):
+            review_cols = {col["name"] for col in inspector.get_columns("course_reviews")}
+            if "answers" not in review_cols:
+                conn.execute(text("ALTER TABLE course_reviews ADD COLUMN answers JSON"))
+            if "analyzed_at" not in review_cols:
+                conn.execute(text("ALTER TABLE course_reviews ADD COLUMN analyzed_at TIMESTAMP NULL"))
+                conn.execute(text("UPDATE course_reviews SET analyzed_at = created_at"))
+                conn.execute(text("CREATE INDEX ix_course_reviews_analyzed_at ON course_reviews (analyzed_at)"))
+        # plans.rollup (table itself comes from create_all)
+        if inspector.has_table("plans"):
+            plan_cols = {col["name"] for col in inspector.get_columns("plans")}
+            if "rollup" not in plan_cols:
+                conn.execute(text("ALTER TABLE plans ADD COLUMN rollup JSON"))
+        # optimize_jobs.fingerprint/result (table itself comes from create_all)
+        if inspector.has_table("optimize_jobs"):
+            job_cols = {col["name"] for col in inspector.get_columns("optimize_jobs")}
+            if "fingerprint" not in job_cols:
+                conn.execute(text("ALTER TABLE optimize_jobs ADD COLUMN fingerprint VARCHAR(64)"))
+                conn.execute(text("CREATE INDEX ix_optimize_jobs_fingerprint ON optimize_jobs (fingerprint)"))
+            if "result" not in job_cols:
+                conn.execute(text("ALTER TABLE optimize_jobs ADD COLUMN result JSON"))
+            if "dedupe_key" not in job_cols:
+                conn.execute(text("ALTER TABLE optimize_jobs ADD COLUMN dedupe_key VARCHAR(128)"))
+                conn.execute(
+                    text(
+                        "CREATE UNIQUE INDEX ux_optimize_jobs_dedupe_active ON optimize_jobs (dedupe_key) "
+                        "WHERE status IN ('queued', 'running')"
+                    )
+                )
 
 
 def init_db() -> None:
@@ -63,7 +105,26 @@ def init_db() -> None:
     from . import models  # noqa: F401
 
     _run_schema_upgrades()
+    inspector = inspect(_engine)
+    backfill_stats = not inspector.has_table("course_stats")
+    backfill_review_index = not inspector.has_table("review_terms")
     Base.metadata.create_all(bind=_engine)
+    # existing reviews/enrollments predate these tables; afterwards they are kept up to date on write
+    if backfill_stats:
+        from .services.course_stats import rebuild_course_stats
+
+        with SessionLocal() as db:
+            rebuild_course_stats(db)
+    if backfill_review_index:
+        from .services.review_index import rebuild_review_index
+
+        with SessionLocal() as db:
+            rebuild_review_index(db)
+    # plans published before rollups were stored; new plans get theirs in publish_plan
+    from .services.utilization import backfill_rollups
+
+    with SessionLocal() as db:
+        backfill_rollups(db)
 
 
 def get_db() -> Generator[Session, None, None]:
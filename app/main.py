@@ -8,7 +8,12 @@ from sqlalchemy.exc import OperationalError
 from .config import get_settings
 from .db import init_db, get_db
 from .models import Tenant
+from .services.auth import flush_api_key_usage
+from .services.co_enrollment import load_co_enrollment_indexes
+from .services.executor import shutdown_process_pool, start_process_pool
 from .services.fixed_seed import ensure_fixed_dataset
+from .services.review_analysis import start_review_analysis
+from .services.jobs import queue as job_queue
 from .routers import get_v1_router
 
 
@@ -45,6 +50,20 @@ def create_app() -> FastAPI:
                 db.commit()
                 db.refresh(tenant)
             ensure_fixed_dataset(db, tenant)
+            load_co_enrollment_indexes(db)
+
+        # Pick up jobs queued before a restart or submitted through another uvicorn worker
+        job_queue.start()
+        # Queue analysis for reviews submitted while the server was down, then keep sweeping
+        start_review_analysis()
+        # OPTIMIZE_EXECUTION=process: bring solver workers up before the first job arrives
+        start_process_pool()
+
+    @app.on_event("shutdown")
+    def _shutdown() -> None:
+        shutdown_process_pool()
+        # last_used_at values still buffered in memory
+        flush_api_key_usage()
 
     app.include_router(get_v1_router())
 
@@ -5,17 +5,25 @@ from .core import (
     AuditLog,
     Blackout,
     Calendar,
+    CoEnrollmentSnapshot,
     Course,
     CourseReview,
+    CourseStats,
+    CourseTermCount,
     CurriculumActivation,
     DataUpload,
     DepartmentActivation,
     Enrollment,
+    OptimizeJob,
+    Plan,
     Policy,
     Project,
+    ReviewTerm,
     Room,
     Student,
     Tenant,
+    TimetableCache,
+    TimetablePayload,
     Timeslot,
     User,
 )
@@ -27,6 +35,7 @@ __all__ = [
     "Course",
     "Timeslot",
     "Assignment",
+    "Plan",
     "Policy",
     "Calendar",
     "Blackout",
@@ -37,7 +46,14 @@ __all__ = [
     "Student",
     "Enrollment",
     "CourseReview",
+    "CourseStats",
+    "CoEnrollmentSnapshot",
+    "ReviewTerm",
+    "CourseTermCount",
     "CurriculumActivation",
+    "OptimizeJob",
     "DataUpload",
     "DepartmentActivation",
+    "TimetableCache",
+    "TimetablePayload",
 ]
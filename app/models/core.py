@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import JSON, Boolean, CheckConstraint, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, Boolean, CheckConstraint, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..db import Base
@@ -21,6 +21,7 @@ class Tenant(Base):
     ai_portal_enabled: Mapped[bool] = mapped_column(Boolean, default=False)
     enrollment_open: Mapped[bool] = mapped_column(Boolean, default=False)
     enrollment_open_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    active_plan_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # plans.id readers see
 
 
 class User(Base):
@@ -88,6 +89,24 @@ class Assignment(Base):
     status: Mapped[str] = mapped_column(String(16), default="auto")  # auto/locked/edited
     reason: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     version: Mapped[int] = mapped_column(Integer, default=1)
+    # Member of every plan in [plan_id, retired_plan_id); plan_id NULL = legacy (pre-versioning) row
+    plan_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
+    retired_plan_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)
+
+
+class Plan(Base):
+    __tablename__ = "plans"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), index=True)
+    status: Mapped[str] = mapped_column(String(16), default="staging")  # staging|published|archived
+    source: Mapped[str] = mapped_column(String(32), default="optimize")  # optimize|replay|legacy
+    job_id: Mapped[Optional[str]] = mapped_column(String(36), nullable=True)
+    assignment_count: Mapped[int] = mapped_column(Integer, default=0)
+    # building -> floor -> room -> day -> period 점유 집계 (services/utilization.py)
+    rollup: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    published_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
 
 class Policy(Base):
@@ -250,4 +269,123 @@ class CourseReview(Base):
     tags: Mapped[list[str]] = mapped_column(JSON, default=list)
     comment: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     semester: Mapped[Optional[str]] = mapped_column(String(16), nullable=True)
+    answers: Mapped[Optional[list[int]]] = mapped_column(JSON, nullable=True)  # Likert survey answers
+    # NULL until services/review_analysis.py has folded the review into the student's profile
+    analyzed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class CourseStats(Base):
+    """Running review/enrollment aggregates per course, kept in step by services/course_stats.py."""
+
+    __tablename__ = "course_stats"
+
+    course_id: Mapped[int] = mapped_column(ForeignKey("courses.id"), primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), index=True)
+    review_count: Mapped[int] = mapped_column(Integer, default=0)
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0)  # over reviews with rating_overall
+    rating_count: Mapped[int] = mapped_column(Integer, default=0)
+    difficulty_sum: Mapped[int] = mapped_column(Integer, default=0)
+    difficulty_count: Mapped[int] = mapped_column(Integer, default=0)
+    enrollment_count: Mapped[int] = mapped_column(Integer, default=0)  # every status
+    requested_count: Mapped[int] = mapped_column(Integer, default=0)
+    enrolled_count: Mapped[int] = mapped_column(Integer, default=0)
+    waitlisted_count: Mapped[int] = mapped_column(Integer, default=0)
+    completed_count: Mapped[int] = mapped_column(Integer, default=0)
+    dropped_count: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    @property
+    def avg_rating(self) -> Optional[float]:
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @property
+    def avg_difficulty(self) -> Optional[float]:
+        return self.difficulty_sum / self.difficulty_count if self.difficulty_count else None
+
+
+class ReviewTerm(Base):
+    """Posting: review ``review_id`` carries ``term`` (a tag or a comment word), see services/review_index.py."""
+
+    __tablename__ = "review_terms"
+    __table_args__ = (Index("ix_review_terms_course_term", "course_id", "kind", "term"),)
+
+    review_id: Mapped[int] = mapped_column(ForeignKey("course_reviews.id"), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(8), primary_key=True)  # tag|keyword
+    term: Mapped[str] = mapped_column(String(64), primary_key=True)
+    course_id: Mapped[int] = mapped_column(ForeignKey("courses.id"))
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), index=True)
+
+
+class CourseTermCount(Base):
+    # Facet counts: reviews of the course carrying the term
+    __tablename__ = "course_term_counts"
+
+    course_id: Mapped[int] = mapped_column(ForeignKey("courses.id"), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(8), primary_key=True)
+    term: Mapped[str] = mapped_column(String(64), primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), index=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class CoEnrollmentSnapshot(Base):
+    """Persisted course × course co-enrollment matrix (CSR) per tenant, see services/co_enrollment.py."""
+
+    __tablename__ = "co_enrollment_snapshots"
+
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), primary_key=True)
+    watermark: Mapped[int] = mapped_column(Integer, default=0)  # highest enrollments.id folded in
+    payload: Mapped[bytes] = mapped_column(LargeBinary)  # zlib-compressed JSON of the CSR arrays
+    built_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class OptimizeJob(Base):
+    __tablename__ = "optimize_jobs"
+    __table_args__ = (
+        # At most one queued/running job per dedupe key: identical submits coalesce in the database
+        Index(
+            "ux_optimize_jobs_dedupe_active",
+            "dedupe_key",
+            unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    tenant_id: Mapped[Optional[int]] = mapped_column(ForeignKey("tenants.id"), nullable=True, index=True)
+    status: Mapped[str] = mapped_column(String(16), default="queued", index=True)  # queued|running|completed|failed|cancelled|timed_out
+    target: Mapped[str] = mapped_column(String(255))  # "module:function" called as target(job_id, params)
+    params: Mapped[dict] = mapped_column(JSON, default=dict)
+    score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    explain: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    metrics: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    timeout: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # seconds
+    worker: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)  # host:pid that claimed the job
+    fingerprint: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)  # sha256 of solver inputs
+    dedupe_key: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)  # request identity while queued/running
+    result: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)  # cached plan for replays
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class TimetableCache(Base):
+    """Precomputed default-preference timetable per student (services/timetable_cache.py)."""
+
+    __tablename__ = "timetable_cache"
+
+    student_id: Mapped[int] = mapped_column(ForeignKey("students.id"), primary_key=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), index=True)
+    version: Mapped[str] = mapped_column(String(64))  # plan/timeslot version the payload was built from
+    digest: Mapped[str] = mapped_column(String(40))  # -> timetable_payloads.digest
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class TimetablePayload(Base):
+    # Students with the same answer share one row, so the per-student cache stays a few bytes each
+    __tablename__ = "timetable_payloads"
+
+    digest: Mapped[str] = mapped_column(String(40), primary_key=True)  # sha1 of the compressed payload
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), index=True)
+    payload: Mapped[bytes] = mapped_column(LargeBinary)  # zlib-compressed JSON response
@@ -16,6 +16,7 @@ from . import (
     student,
     faculty,
     tenant_admin,
+    courses,
 )
 
 
@@ -36,4 +37,5 @@ def get_v1_router() -> APIRouter:
     router.include_router(student.router)
     router.include_router(faculty.router)
     router.include_router(tenant_admin.router)
+    router.include_router(courses.router)
     return router
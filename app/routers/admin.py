@@ -9,7 +9,7 @@ from sqlalchemy.orm import Session
 
 from ..db import get_db
 from ..models import Tenant, Project, ApiKey
-from ..services.auth import generate_api_key
+from ..services.auth import generate_api_key, pending_last_used
 
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -91,7 +91,7 @@ def list_keys(project_id: int, db: Session = Depends(get_db), x_admin: Optional[
             "key_prefix": k.key_prefix,
             "active": k.active,
             "created_at": k.created_at,
-            "last_used_at": k.last_used_at,
+            "last_used_at": pending_last_used(k.id) or k.last_used_at,
         }
         for k in keys
     ]
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import List
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..db import get_db
+from ..schemas import CourseSearchHit
+from ..services.auth import resolve_tenant_from_headers
+from ..services.course_search import get_search_index
+
+router = APIRouter(prefix="/courses", tags=["courses"])
+
+
+@router.get("/search", response_model=List[CourseSearchHit])
+def search_courses(
+    q: str = Query(..., min_length=1, description="과목 코드/과목명/학과/학년 일부 (한글 바이그램 검색)"),
+    limit: int = Query(default=20, ge=1, le=100),
+    fuzzy: bool = Query(default=True, description="오타 허용 (질의 바이그램 절반 이상 일치)"),
+    tenant_key: str | None = Header(default=None, convert_underscores=False, alias="X-Tenant-ID"),
+    tenant_query: str | None = Query(default=None, alias="tenant"),
+    x_api_key: str | None = Header(default=None, convert_underscores=False, alias="X-API-Key"),
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: Session = Depends(get_db),
+) -> list[CourseSearchHit]:
+    """과목 검색. 정확한 코드 일치 > 접두 일치 > 부분 일치 > 유사(fuzzy) 일치 순으로 정렬합니다."""
+    tenant = resolve_tenant_from_headers(
+        db,
+        api_key=(x_api_key or authorization or None),
+        tenant_key=tenant_query or tenant_key,
+    )
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="tenant_not_found")
+    hits = get_search_index(db, tenant.id).search(q, limit=limit, fuzzy=fuzzy)
+    return [CourseSearchHit(**hit) for hit in hits]
@@ -5,7 +5,9 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import select
 
 from ..db import get_db
-from ..models import Tenant, Room, Timeslot, Assignment
+from ..models import Tenant, Room, Timeslot, Assignment, Plan
+from ..services.occupancy import invalidate_occupancy
+from ..services.utilization import invalidate_rollup
 
 router = APIRouter(prefix="/dev", tags=["dev"])
 
@@ -46,5 +48,10 @@ def clear_assignments(db=Depends(get_db)):
     if tenant is None:
         return {"cleared": 0}
     count = db.query(Assignment).filter(Assignment.tenant_id == tenant.id).delete()
+    # Plan history goes too; the next optimize run publishes plan versions from scratch
+    db.query(Plan).filter(Plan.tenant_id == tenant.id).delete()
+    tenant.active_plan_id = None
     db.commit()
+    invalidate_occupancy(tenant.id)
+    invalidate_rollup(tenant.id)
     return {"cleared": count}
@@ -6,7 +6,7 @@ from sqlalchemy import select
 
 from ..db import get_db
 from ..models import Project, ApiKey, User, Tenant
-from ..services.auth import get_user_from_token, generate_api_key
+from ..services.auth import get_user_from_token, generate_api_key, pending_last_used
 
 
 router = APIRouter(prefix="/dev", tags=["dev"])
@@ -74,7 +74,7 @@ def list_keys(project_id: int, authorization: str | None = Header(default=None,
             "key_prefix": k.key_prefix,
             "active": k.active,
             "created_at": k.created_at,
-            "last_used_at": k.last_used_at,
+            "last_used_at": pending_last_used(k.id) or k.last_used_at,
         }
         for k in keys
     ]
@@ -2,14 +2,15 @@ from __future__ import annotations
 
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Header, HTTPException
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from ..db import get_db
-from ..models import Course, CourseReview, Enrollment, User
+from ..models import Course, CourseReview, CourseStats, User
 from ..schemas import CourseReviewRequest, FacultyCourseOverview
 from ..services.auth import get_user_from_token
+from ..services.course_stats import STATUSES, record_review
+from ..services.review_index import course_facets, index_review, review_term_filters
 
 
 router = APIRouter(prefix="/faculty", tags=["faculty"])
@@ -30,48 +31,27 @@ def course_overview(
     db: Session = Depends(get_db),
 ) -> list[FacultyCourseOverview]:
     user = _require_faculty(db, authorization)
-    rating_subq = (
-        db.query(
-            CourseReview.course_id.label("course_id"),
-            func.avg(CourseReview.rating_overall).label("avg_rating"),
-            func.count(CourseReview.id).label("review_count"),
-        )
-        .filter(CourseReview.tenant_id == user.tenant_id)
-        .group_by(CourseReview.course_id)
-        .subquery()
-    )
-    enrollment_subq = (
-        db.query(
-            Enrollment.course_id.label("course_id"),
-            func.count(Enrollment.id).label("enrollment_count"),
-        )
-        .filter(Enrollment.tenant_id == user.tenant_id)
-        .group_by(Enrollment.course_id)
-        .subquery()
-    )
     rows = (
-        db.query(
-            Course,
-            rating_subq.c.avg_rating,
-            rating_subq.c.review_count,
-            enrollment_subq.c.enrollment_count,
-        )
-        .outerjoin(rating_subq, rating_subq.c.course_id == Course.id)
-        .outerjoin(enrollment_subq, enrollment_subq.c.course_id == Course.id)
+        db.query(Course, CourseStats)
+        .outerjoin(CourseStats, CourseStats.course_id == Course.id)
         .filter(Course.tenant_id == user.tenant_id)
         .order_by(Course.name.asc())
         .all()
     )
     result: list[FacultyCourseOverview] = []
-    for course, avg_rating, review_count, enrollment_count in rows:
+    for course, stats in rows:
         result.append(
             FacultyCourseOverview(
                 course_id=course.id,
                 course_code=course.code,
                 course_name=course.name,
-                avg_rating=float(avg_rating) if avg_rating is not None else None,
-                review_count=int(review_count or 0),
-                enrollment_count=int(enrollment_count or 0),
+                avg_rating=stats.avg_rating if stats else None,
+                avg_difficulty=stats.avg_difficulty if stats else None,
+                review_count=stats.review_count if stats else 0,
+                enrollment_count=stats.enrollment_count if stats else 0,
+                enrollment_by_status=(
+                    {name: getattr(stats, f"{name}_count") for name in STATUSES} if stats else {}
+                ),
             )
         )
     return result
@@ -80,6 +60,8 @@ def course_overview(
 @router.get("/courses/{course_id}/reviews")
 def list_course_reviews(
     course_id: int,
+    tag: List[str] = Query(default=[], description="반복 지정 시 모든 태그를 가진 후기만"),
+    keyword: str | None = Query(default=None, description="후기 본문 단어 (접두 일치: 과제 → 과제가, 과제는)"),
     authorization: str | None = Header(default=None, alias="Authorization"),
     db: Session = Depends(get_db),
 ) -> list[dict]:
@@ -87,12 +69,11 @@ def list_course_reviews(
     course = db.get(Course, course_id)
     if course is None or course.tenant_id != user.tenant_id:
         raise HTTPException(status_code=404, detail="course_not_found")
-    reviews = (
-        db.query(CourseReview)
-        .filter(CourseReview.course_id == course_id)
-        .order_by(CourseReview.created_at.desc())
-        .all()
+    query = db.query(CourseReview).filter(
+        CourseReview.course_id == course_id,
+        *review_term_filters(course_id, tags=tag, keyword=keyword),
     )
+    reviews = query.order_by(CourseReview.created_at.desc()).all()
     return [
         {
             "id": r.id,
@@ -108,6 +89,26 @@ def list_course_reviews(
     ]
 
 
+@router.get("/courses/{course_id}/reviews/facets")
+def course_review_facets(
+    course_id: int,
+    limit: int = Query(default=20, ge=1, le=200),
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: Session = Depends(get_db),
+) -> dict:
+    """태그/본문 단어별 후기 수 (많은 순). 목록 필터는 GET /courses/{course_id}/reviews?tag=&keyword=."""
+    user = _require_faculty(db, authorization)
+    course = db.get(Course, course_id)
+    if course is None or course.tenant_id != user.tenant_id:
+        raise HTTPException(status_code=404, detail="course_not_found")
+    stats = db.get(CourseStats, course_id)
+    return {
+        "course_id": course_id,
+        "review_count": stats.review_count if stats else 0,
+        **course_facets(db, course_id, limit=limit),
+    }
+
+
 @router.post("/courses/{course_id}/reviews/ack", status_code=200)
 def acknowledge_review(
     course_id: int,
@@ -132,5 +133,7 @@ def acknowledge_review(
         semester=payload.semester,
     )
     db.add(review)
+    record_review(db, review)
+    index_review(db, review)
     db.commit()
     return {"status": "recorded"}
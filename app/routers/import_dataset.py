@@ -13,6 +13,8 @@ from sqlalchemy import select
 from ..db import get_db
 from ..models import Tenant, Room, Course, Timeslot, DataUpload
 from ..services.auth import resolve_tenant_from_headers
+from ..services.course_scoring import invalidate_course_features
+from ..services.course_search import refresh_courses
 
 router = APIRouter(prefix="/import", tags=["import"])
 
@@ -227,8 +229,11 @@ def _normalize_building(raw: str | None) -> str | None:
     return txt
 
 
-def _process_rows(db, tenant: Tenant, rows: List[Dict[str, str]]) -> dict[str, int]:
+def _process_rows(db, tenant: Tenant, rows: List[Dict[str, str]]) -> tuple[dict[str, int], set[int]]:
+    """Create missing rooms/courses/timeslots; returns the created counts and the course ids
+    that were created or actually changed (for the search index and scoring cache)."""
     created = {"rooms": 0, "courses": 0, "timeslots": 0}
+    touched: set[int] = set()
     created["timeslots"] = _ensure_timeslots(db, tenant)
 
     map_ = _header_map(list(rows[0].keys()))
@@ -298,15 +303,20 @@ def _process_rows(db, tenant: Tenant, rows: List[Dict[str, str]]) -> dict[str, i
             db.flush()
             existing_courses[code] = c
             created["courses"] += 1
+            touched.add(c.id)
         elif code and code in existing_courses:
             existing = existing_courses[code]
-            if department:
+            changed = False
+            if department and existing.department != department:
                 existing.department = department
-            if cohort:
+                changed = True
+            if cohort and existing.cohort != cohort:
                 existing.cohort = cohort
-            db.add(existing)
+                changed = True
+            if changed:
+                touched.add(existing.id)
 
-    return created
+    return created, touched
 
 
 @router.post("/dataset")
@@ -328,11 +338,14 @@ def import_dataset(
     if not rows:
         return {"imported": False, "reason": "empty file"}
 
-    created = _process_rows(db, tenant, rows)
+    created, touched = _process_rows(db, tenant, rows)
     filename = os.path.basename(path)
     file_type = os.path.splitext(filename)[1].lstrip(".").lower() or None
     _record_data_upload(db, tenant, filename, file_type, len(rows), created)
     db.commit()
+    if touched:
+        invalidate_course_features(tenant.id)
+        refresh_courses(db, tenant.id, touched)
     return {"imported": True, "file": os.path.basename(path), "created": created}
 
 
@@ -351,9 +364,12 @@ def upload_dataset(
     tenant = resolve_tenant_from_headers(db, api_key=(x_api_key or authorization or None), tenant_key=tenant_key)
     if tenant is None:
         return {"imported": False, "reason": "no tenant"}
-    created = _process_rows(db, tenant, rows)
+    created, touched = _process_rows(db, tenant, rows)
     filename = file.filename or "upload"
     file_type = os.path.splitext(filename)[1].lstrip(".").lower() or None
     record = _record_data_upload(db, tenant, filename, file_type, len(rows), created)
     db.commit()
+    if touched:
+        invalidate_course_features(tenant.id)
+        refresh_courses(db, tenant.id, touched)
     return {"imported": True, "file": filename, "created": created, "dataset_id": record.id}
@@ -10,6 +10,8 @@ from sqlalchemy import select
 from ..db import get_db
 from ..models import Course, Tenant
 from ..schemas import ImportSectionsReport
+from ..services.course_scoring import invalidate_course_features
+from ..services.course_search import refresh_courses
 
 router = APIRouter(tags=["import"])
 
@@ -35,6 +37,7 @@ def import_sections(
     total = 0
     valid = 0
     errors: List[str] = []
+    touched: List[Course] = []
 
     required = {"code", "name", "hours_per_week", "expected_enrollment"}
     for i, row in enumerate(reader, start=2):  # header is line 1
@@ -74,7 +77,10 @@ def import_sections(
         course.cohort = cohort
         course.department = department
         course.needs_lab = needs_lab
+        touched.append(course)
         valid += 1
 
     db.commit()
+    invalidate_course_features(tenant.id)
+    refresh_courses(db, tenant.id, [course.id for course in touched])
     return ImportSectionsReport(total_rows=total, valid_rows=valid, errors=errors)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Header, Depends
+from fastapi import APIRouter, Header, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from ..schemas import OptimizeRequest, OptimizeStatus
@@ -31,9 +31,16 @@ def optimize(
         solver=(req.solver or "greedy"),
         slot_group=(req.slot_group or 1),
         forbid_checks=(req.forbid_checks if req.forbid_checks is not None else True),
+        time_limit=req.time_limit,
         tenant_id=tenant_id,
     )
-    return OptimizeStatus(job_id=job_id, status="queued", solver=req.solver or "greedy")
+    job = queue.get(job_id)
+    return OptimizeStatus(
+        job_id=job_id,
+        status=job.status if job else "queued",
+        solver=req.solver or "greedy",
+        queue_position=job.queue_position if job else None,
+    )
 
 
 @router.get("/{job_id}", response_model=OptimizeStatus)
@@ -41,4 +48,23 @@ def optimize_status(job_id: str) -> OptimizeStatus:
     job = queue.get(job_id)
     if job is None:
         return OptimizeStatus(job_id=job_id, status="not_found")
-    return OptimizeStatus(job_id=job.id, status=job.status, score=job.score, explain=job.explain)
+    return OptimizeStatus(
+        job_id=job.id,
+        status=job.status,
+        score=job.score,
+        explain=job.explain,
+        metrics=job.metrics,
+        queue_position=job.queue_position,
+    )
+
+
+@router.delete("/{job_id}", response_model=OptimizeStatus)
+def optimize_cancel(job_id: str) -> OptimizeStatus:
+    # 대기 중이면 즉시 취소, 실행 중이면 다음 체크포인트에서 중단 (배치 결과는 저장하지 않음)
+    if not queue.cancel(job_id):
+        job = queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    job = queue.get(job_id)
+    return OptimizeStatus(job_id=job_id, status=job.status if job else "cancelled", explain=job.explain if job else None)
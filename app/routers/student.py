@@ -17,7 +17,10 @@ from ..schemas import (
     StudentProfile,
 )
 from ..services.auth import get_user_from_token
-from ..services.recommendation import generate_course_recommendations, generate_personalized_recommendations, analyze_review_and_update_profile
+from ..services.course_stats import record_enrollment, record_review
+from ..services.recommendation import generate_course_recommendations, generate_personalized_recommendations
+from ..services.review_analysis import notify_review_submitted
+from ..services.review_index import index_review
 
 
 router = APIRouter(prefix="/student", tags=["student"])
@@ -158,7 +161,9 @@ def upsert_enrollment(
         .first()
     )
     status = payload.status or "requested"
-    if enrollment is None:
+    created = enrollment is None
+    old_status = None if created else enrollment.status
+    if created:
         enrollment = Enrollment(
             tenant_id=student.tenant_id,
             student_id=student.id,
@@ -171,6 +176,7 @@ def upsert_enrollment(
         if payload.term:
             enrollment.term = payload.term
     db.add(enrollment)
+    record_enrollment(db, student.tenant_id, payload.course_id, old_status, status, created=created)
     db.commit()
     db.refresh(enrollment)
     return EnrollmentItem(
@@ -204,17 +210,15 @@ def submit_review(
         tags=payload.tags,
         comment=payload.comment,
         semester=payload.semester,
+        answers=payload.answers or None,
     )
     db.add(review)
+    record_review(db, review)
+    index_review(db, review)
     db.commit()
-    # run lightweight analysis to update student's profile/preferences
-    analysis = {}
-    try:
-        analysis = analyze_review_and_update_profile(db, student.id, payload.course_id, payload.answers or [], payload.comment)
-    except Exception:
-        # don't fail the request if analysis fails
-        analysis = {}
-    return {"status": "created", "analysis": analysis}
+    # profile/preference analysis runs in the background queue (services/review_analysis.py)
+    notify_review_submitted()
+    return {"status": "created", "analysis": "queued"}
 
 
 @router.get("/enrollment_status")
@@ -17,12 +17,20 @@ from ..models import (
     DepartmentActivation,
     DepartmentActivation,
     Enrollment,
+    Plan,
     Student,
     Tenant,
     User,
 )
 from ..schemas import AdminDataUpload
-from ..services import catalog
+from ..services import catalog, plans
+from ..services.course_scoring import invalidate_course_features
+from ..services.course_search import refresh_courses
+from ..services.course_stats import record_enrollment, record_review
+from ..services.jobs import queue
+from ..services.review_analysis import review_analysis_status
+from ..services.review_index import index_review
+from ..services.timetable_cache import submit_timetable_precompute
 from ..services.auth import get_user_from_token, generate_api_key
 from ..services.fixed_dataset import summarize_fixed_dataset
 
@@ -94,6 +102,7 @@ def ingest_data(
     tenant_id = user.tenant_id
 
     counts = {"courses": 0, "students": 0, "enrollments": 0, "reviews": 0}
+    touched_courses: list[Course] = []
 
     for course_data in payload.courses:
         code = course_data.get("code")
@@ -112,6 +121,7 @@ def ingest_data(
         course.needs_lab = course_data.get("needs_lab", course.needs_lab)
         course.expected_enrollment = course_data.get("expected_enrollment", course.expected_enrollment)
         db.add(course)
+        touched_courses.append(course)
         counts["courses"] += 1
 
     for student_data in payload.students:
@@ -149,15 +159,18 @@ def ingest_data(
             Enrollment.student_id == student.id,
             Enrollment.course_id == course.id,
         ).first()
-        if enrollment is None:
+        created = enrollment is None
+        if created:
             enrollment = Enrollment(
                 tenant_id=tenant_id,
                 student_id=student.id,
                 course_id=course.id,
             )
+        old_status = enrollment.status
         enrollment.status = enrollment_data.get("status", enrollment.status)
         enrollment.term = enrollment_data.get("term", enrollment.term)
         db.add(enrollment)
+        record_enrollment(db, tenant_id, course.id, old_status, enrollment.status, created=created)
         counts["enrollments"] += 1
 
     for review_data in payload.reviews:
@@ -187,9 +200,13 @@ def ingest_data(
             semester=review_data.get("semester"),
         )
         db.add(review)
+        record_review(db, review)
+        index_review(db, review)
         counts["reviews"] += 1
 
     db.commit()
+    invalidate_course_features(tenant_id)
+    refresh_courses(db, tenant_id, [course.id for course in touched_courses])
     return counts
 
 
@@ -317,14 +334,52 @@ def set_enrollment_window(
         tenant.enrollment_open_until = None
     db.add(tenant)
     db.commit()
+    # 수강신청 오픈 직후 몰리는 추천 요청을 캐시로 받도록 미리 계산
+    precompute_job_id = submit_timetable_precompute(tenant.id) if payload.open else None
     return {
         "enrollment_open": tenant.enrollment_open,
         "enrollment_open_until": tenant.enrollment_open_until.isoformat()
         if tenant.enrollment_open_until
         else None,
+        "timetable_precompute_job_id": precompute_job_id,
     }
 
 
+@router.post("/timetable-cache")
+def precompute_timetables(
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
+    """전체 학생의 기본 시간표 추천을 백그라운드로 미리 계산합니다 (진행 중이면 같은 job을 반환)."""
+    user = _require_admin_user(db, authorization)
+    job_id = submit_timetable_precompute(user.tenant_id)
+    job = queue.get(job_id)
+    return {"job_id": job_id, "status": job.status if job else "queued"}
+
+
+@router.get("/timetable-cache/{job_id}")
+def timetable_precompute_status(
+    job_id: str,
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
+    user = _require_admin_user(db, authorization)
+    job = queue.get(job_id)
+    if job is None or job.tenant_id != user.tenant_id:
+        raise HTTPException(status_code=404, detail="job_not_found")
+    return {"job_id": job.id, "status": job.status, "explain": job.explain, "metrics": job.metrics}
+
+
+@router.get("/review-analysis")
+def review_analysis(
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
+    """미분석 리뷰 수와 백그라운드 분석 실행 기록 (이 프로세스 기준)."""
+    user = _require_admin_user(db, authorization)
+    return review_analysis_status(db, user.tenant_id)
+
+
 class ActivateDatasetReq(BaseModel):
     active_until: Optional[datetime] = None
 
@@ -452,3 +507,46 @@ def set_department_activation(
     db.add(entry)
     db.commit()
     return {"department": dept, "active": entry.active}
+
+
+def _serialize_plan(record: Plan, active_plan_id: Optional[int]) -> dict[str, Any]:
+    return {
+        "id": record.id,
+        "status": record.status,
+        "source": record.source,
+        "job_id": record.job_id,
+        "assignment_count": record.assignment_count,
+        "active": record.id == active_plan_id,
+        "created_at": record.created_at.isoformat(),
+        "published_at": record.published_at.isoformat() if record.published_at else None,
+    }
+
+
+@router.get("/plans")
+def list_schedule_plans(
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: Session = Depends(get_db),
+) -> list[dict[str, Any]]:
+    user = _require_admin_user(db, authorization)
+    tenant = db.get(Tenant, user.tenant_id)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="tenant_not_found")
+    return [_serialize_plan(entry, tenant.active_plan_id) for entry in plans.list_plans(db, tenant.id)]
+
+
+@router.post("/plans/{plan_id}/activate")
+def activate_schedule_plan(
+    plan_id: int,
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: Session = Depends(get_db),
+) -> dict[str, Any]:
+    """Roll the published timetable back (or forward) to a kept plan version without re-solving."""
+    user = _require_admin_user(db, authorization)
+    tenant = db.get(Tenant, user.tenant_id)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="tenant_not_found")
+    try:
+        plan = plans.activate_plan(db, tenant, plan_id)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="plan_not_found")
+    return _serialize_plan(plan, tenant.active_plan_id)
@@ -9,6 +9,7 @@ from ..db import get_db
 from ..models import Assignment, Course, Room, Timeslot
 from ..schemas import TimetableRoomItem
 from ..services.auth import get_user_from_token, resolve_tenant_from_headers
+from ..services.plans import active_assignments_clause, plan_scope
 from ..services.timetable import recommend_timetable_for_student
 
 router = APIRouter(prefix="/timetable", tags=["timetable"])
@@ -56,8 +57,8 @@ def rooms_timetable(
         tenant_key=tenant_query or tenant_key,
     )
     q = db.query(Assignment, Course, Timeslot, Room)
-    if tenant:
-        q = q.filter(Assignment.tenant_id == tenant.id)
+    # Only the active plan version; staging/archived plans stay invisible
+    q = q.filter(plan_scope(tenant) if tenant else active_assignments_clause())
     q = q.join(Course, Assignment.course_id == Course.id)
     q = q.join(Timeslot, Assignment.timeslot_id == Timeslot.id)
     q = q.join(Room, Assignment.room_id == Room.id)
@@ -1,15 +1,26 @@
 from __future__ import annotations
 
 from typing import List, Optional
-from datetime import datetime
-from fastapi import APIRouter, Query, Depends, Header
+from datetime import date, datetime
+from fastapi import APIRouter, Query, Depends, Header, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from ..schemas import VacancyHeatmapCell
+from ..schemas import VacancyBatchRequest, VacancyHeatmapCell
 from ..db import get_db
-from ..models import Tenant, Room, Timeslot, Assignment
+from ..models import Tenant
 from ..services.auth import resolve_tenant_from_headers
+from ..services.occupancy import (
+    DAY_MINUTES,
+    OccupancyMatrix,
+    format_minutes,
+    get_occupancy,
+    to_minutes,
+    weekday_code,
+)
+from ..services.utilization import get_rollup
+from ..services.vacancy_stream import subscribe
 
 router = APIRouter(prefix="/vacancy", tags=["vacancy"])
 
@@ -29,6 +40,19 @@ def _resolve_tenant(db: Session, tenant_key: Optional[str]) -> Optional[Tenant]:
     return db.execute(select(Tenant).where(Tenant.enabled == True)).scalars().first()  # noqa: E712
 
 
+def _heatmap_cells(matrix: OccupancyMatrix, room_mask: int) -> tuple[list[VacancyHeatmapCell], int]:
+    total_rooms = room_mask.bit_count()
+    cells: list[VacancyHeatmapCell] = []
+    occupied_slots = 0
+    for slot, occ in zip(matrix.slots, matrix.occupied):
+        occupied = (occ & room_mask).bit_count()
+        occupied_slots += occupied
+        vacant = max(0, total_rooms - occupied)
+        ratio = round(vacant / max(1, total_rooms), 4)
+        cells.append(VacancyHeatmapCell(day=slot.day, time=slot.start, vacancy_ratio=ratio))
+    return cells, occupied_slots
+
+
 @router.get("/heatmap", response_model=List[VacancyHeatmapCell])
 def vacancy_heatmap(
     week: str = Query(..., description="YYYY-WW (미사용 placeholder)"),
@@ -42,46 +66,11 @@ def vacancy_heatmap(
     if tenant is None:
         return []
 
-    # Load all timeslots (tenant-scoped)
-    timeslots: list[Timeslot] = db.query(Timeslot).filter(Timeslot.tenant_id == tenant.id).all()
-    if not timeslots:
-        return []
-
-    # Room scope (optionally by building)
-    room_q = db.query(Room).filter(Room.tenant_id == tenant.id)
-    if building:
-        room_q = room_q.filter(Room.building == building)
-    rooms = room_q.all()
-    total_rooms = len(rooms)
-    if total_rooms == 0:
+    matrix = get_occupancy(db, tenant)
+    room_mask = matrix.room_mask(building)
+    if not matrix.slots or not room_mask:
         return []
-
-    # Pre-index assignments per timeslot
-    ts_ids = [t.id for t in timeslots]
-    a_rows = (
-        db.query(Assignment.room_id, Assignment.timeslot_id)
-        .filter(Assignment.tenant_id == tenant.id, Assignment.timeslot_id.in_(ts_ids))
-        .all()
-    )
-    occ_by_ts: dict[int, set[int]] = {}
-    for room_id, ts_id in a_rows:
-        if room_id is None or ts_id is None:
-            continue
-        occ_by_ts.setdefault(ts_id, set()).add(room_id)
-
-    # If building filter is present, restrict occupancy sets to that building
-    if building:
-        allowed_room_ids = {r.id for r in rooms}
-        for ts_id in list(occ_by_ts.keys()):
-            occ_by_ts[ts_id] = {rid for rid in occ_by_ts[ts_id] if rid in allowed_room_ids}
-
-    # Build heatmap cells by (day, start)
-    cells: list[VacancyHeatmapCell] = []
-    for t in sorted(timeslots, key=lambda x: (x.day, x.start)):
-        occupied = len(occ_by_ts.get(t.id, set()))
-        vacant = max(0, total_rooms - occupied)
-        ratio = round(vacant / max(1, total_rooms), 4)
-        cells.append(VacancyHeatmapCell(day=t.day, time=t.start, vacancy_ratio=ratio))
+    cells, _ = _heatmap_cells(matrix, room_mask)
     return cells
 
 
@@ -99,45 +88,16 @@ def vacancy_snapshot(
     if tenant is None:
         return {"heatmap": [], "note": "tenant_not_found"}
 
-    timeslots: list[Timeslot] = db.query(Timeslot).filter(Timeslot.tenant_id == tenant.id).all()
-    if not timeslots:
+    matrix = get_occupancy(db, tenant)
+    if not matrix.slots:
         return {"heatmap": [], "note": "no_timeslots"}
-
-    room_q = db.query(Room).filter(Room.tenant_id == tenant.id)
-    if building:
-        room_q = room_q.filter(Room.building == building)
-    rooms = room_q.all()
-    total_rooms = len(rooms)
+    room_mask = matrix.room_mask(building)
+    total_rooms = room_mask.bit_count()
     if total_rooms == 0:
         return {"heatmap": [], "note": "no_rooms"}
 
-    ts_ids = [t.id for t in timeslots]
-    a_rows = (
-        db.query(Assignment.room_id, Assignment.timeslot_id)
-        .filter(Assignment.tenant_id == tenant.id, Assignment.timeslot_id.in_(ts_ids))
-        .all()
-    )
-    occ_by_ts: dict[int, set[int]] = {}
-    for room_id, ts_id in a_rows:
-        if room_id is None or ts_id is None:
-            continue
-        occ_by_ts.setdefault(ts_id, set()).add(room_id)
-
-    if building:
-        allowed_room_ids = {r.id for r in rooms}
-        for ts_id in list(occ_by_ts.keys()):
-            occ_by_ts[ts_id] = {rid for rid in occ_by_ts[ts_id] if rid in allowed_room_ids}
-
-    cells: list[VacancyHeatmapCell] = []
-    occupied_slots = 0
-    for t in sorted(timeslots, key=lambda x: (x.day, x.start)):
-        occupied = len(occ_by_ts.get(t.id, set()))
-        occupied_slots += occupied
-        vacant = max(0, total_rooms - occupied)
-        ratio = round(vacant / max(1, total_rooms), 4)
-        cells.append(VacancyHeatmapCell(day=t.day, time=t.start, vacancy_ratio=ratio))
-
-    total_slots = len(timeslots) * total_rooms
+    cells, occupied_slots = _heatmap_cells(matrix, room_mask)
+    total_slots = len(matrix.slots) * total_rooms
     utilization_ratio = round(occupied_slots / max(1, total_slots), 4)
 
     # Live utilization: 현재 요일/시간에 겹치는 슬롯만 계산
@@ -145,22 +105,15 @@ def vacancy_snapshot(
     now = datetime.now()
     today_code = weekday_names[now.weekday()]
     now_hm = now.strftime("%H:%M")
-    live_slot_ids = [
-        t.id
-        for t in timeslots
-        if t.day == today_code and t.start <= now_hm < t.end
-    ]
-    live_occupied_ids: set[int] = set()
-    for ts_id in live_slot_ids:
-        live_occupied_ids |= occ_by_ts.get(ts_id, set())
-    live_occupied = len(live_occupied_ids)
+    live_slot_ids = [s.id for s in matrix.slots if s.day == today_code and s.start <= now_hm < s.end]
+    live_occupied = (matrix.occupied_mask(live_slot_ids) & room_mask).bit_count()
     live_util_ratio = round(live_occupied / max(1, total_rooms), 4)
 
     return {
         "last_refreshed": datetime.utcnow().isoformat() + "Z",
         "building": building,
         "total_rooms": total_rooms,
-        "total_timeslots": len(timeslots),
+        "total_timeslots": len(matrix.slots),
         "occupancy": {
             "occupied_slots": occupied_slots,
             "vacant_slots": max(0, total_slots - occupied_slots),
@@ -177,12 +130,126 @@ def vacancy_snapshot(
     }
 
 
+@router.get("/stream")
+def vacancy_stream(
+    building: str | None = Query(default=None),
+    tenant: str | None = Query(default=None, description="X-Tenant-ID 대신 사용 (EventSource는 헤더를 못 붙임)"),
+    tenant_key: str | None = Header(default=None, convert_underscores=False, alias="X-Tenant-ID"),
+    x_api_key: str | None = Header(default=None, convert_underscores=False, alias="X-API-Key"),
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: Session = Depends(get_db),
+):
+    """로비 키오스크용 실시간 공실 SSE 스트림.
+    접속 직후 `snapshot`(현재 교시 점유 현황 전체)을 보내고, 이후에는 교시 경계가 바뀌거나 플랜이 재게시될 때만
+    변경된 필드와 `taken`/`freed` 강의실 id만 담은 `delta`를 보냅니다.
+    (테넌트, 건물)마다 계산은 한 번만 수행되어 모든 접속 클라이언트에 전달됩니다.
+    """
+    resolved = resolve_tenant_from_headers(
+        db, api_key=(x_api_key or authorization or None), tenant_key=(tenant_key or tenant)
+    )
+    if resolved is None:
+        raise HTTPException(status_code=404, detail="tenant_not_found")
+    return StreamingResponse(
+        subscribe(resolved.id, building),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/utilization")
+def vacancy_utilization(
+    building: str | None = Query(default=None),
+    floor: str | None = Query(default=None, description="building과 함께 사용"),
+    tenant_key: str | None = Header(default=None, convert_underscores=False, alias="X-Tenant-ID"),
+    x_api_key: str | None = Header(default=None, convert_underscores=False, alias="X-API-Key"),
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: Session = Depends(get_db),
+):
+    """건물 → 층 → 강의실 → 요일 → 교시 가동률 집계.
+    플랜 게시 시점에 계산해 둔 값을 그대로 반환하므로 배정 테이블을 스캔하지 않습니다 (대시보드 폴링용).
+    `by_day`는 {요일: {교시: 점유 셀 수}} 형태이며 점유가 있는 항목만 포함합니다.
+    """
+    tenant = resolve_tenant_from_headers(db, api_key=(x_api_key or authorization or None), tenant_key=tenant_key)
+    if tenant is None:
+        return {"buildings": {}, "note": "tenant_not_found"}
+    rollup = get_rollup(db, tenant)
+    if building is None:
+        return JSONResponse({"plan_id": tenant.active_plan_id, **rollup})
+    node = rollup["buildings"].get(building)
+    if node is None:
+        raise HTTPException(status_code=404, detail="building_not_found")
+    if floor is not None:
+        node = node["floors"].get(floor)
+        if node is None:
+            raise HTTPException(status_code=404, detail="floor_not_found")
+    return JSONResponse(
+        {
+            "plan_id": tenant.active_plan_id,
+            "building": building,
+            "floor": floor,
+            "computed_at": rollup["computed_at"],
+            **node,
+        }
+    )
+
+
+def _availability(
+    matrix: OccupancyMatrix,
+    *,
+    day: Optional[str],
+    start: str,
+    end: str,
+    building: Optional[str] = None,
+    min_capacity: Optional[int] = None,
+    on: Optional[date] = None,
+    include_busy: bool = False,
+) -> dict:
+    """Answer one availability query from a loaded occupancy view; ValueError carries the 400 detail."""
+    try:
+        start_min, end_min = to_minutes(start), to_minutes(end)
+    except ValueError:
+        raise ValueError("invalid_time_format")
+    if not (0 <= start_min < end_min <= DAY_MINUTES):
+        raise ValueError("invalid_time_range")
+    if on is not None:
+        day = day or weekday_code(on)
+    if not day:
+        raise ValueError("day_or_date_required")
+
+    room_mask = matrix.room_mask(building, min_capacity)
+    if not room_mask:
+        return {"items": []}
+
+    items: list[dict] = []
+    busy: list[dict] = []
+    # Room bits follow (building, room name) order, so the lists come out sorted
+    for r in matrix.rooms_in(room_mask):
+        free, window = matrix.room_window(r.id, day, start_min, end_min, on)
+        if not free and not include_busy:
+            continue
+        entry = {
+            "room_id": r.id,
+            "room_name": r.name,
+            "building": r.building,
+            "capacity": r.capacity,
+            "next_free": {"start": format_minutes(window[0]), "end": format_minutes(window[1])} if window else None,
+        }
+        (items if free else busy).append(entry)
+    result = {"items": items, "total": room_mask.bit_count(), "free": len(items)}
+    if include_busy:
+        result["busy"] = busy
+    return result
+
+
 @router.get("/available")
 def available_rooms(
-    day: str = Query(..., description="요일 식별자 (예: Mon)"),
+    day: str | None = Query(default=None, description="요일 식별자 (예: Mon); date가 있으면 생략 가능"),
     start: str = Query(..., description="시작 HH:MM"),
     end: str = Query(..., description="종료 HH:MM"),
     building: str | None = Query(default=None),
+    min_capacity: int | None = Query(default=None, ge=0),
+    on: date | None = Query(default=None, alias="date", description="YYYY-MM-DD: 해당 날짜의 Blackout 반영"),
+    include_busy: bool = Query(default=False, description="사용 중인 강의실과 다음 빈 시간도 반환"),
     tenant_key: str | None = Header(default=None, convert_underscores=False, alias="X-Tenant-ID"),
     x_api_key: str | None = Header(default=None, convert_underscores=False, alias="X-API-Key"),
     authorization: str | None = Header(default=None, alias="Authorization"),
@@ -190,50 +257,58 @@ def available_rooms(
 ):
     """주어진 구간에 비어있는 강의실 목록을 반환합니다.
     외부 대여 연동(가용 조회)의 기본 API로 사용 가능합니다.
+    분 단위 임의 구간(예: 10:30–12:15)을 지원하며 각 강의실의 `next_free` 구간을 함께 제공합니다.
     """
     tenant = resolve_tenant_from_headers(db, api_key=(x_api_key or authorization or None), tenant_key=tenant_key)
     if tenant is None:
         return {"items": []}
+    try:
+        return _availability(
+            get_occupancy(db, tenant),
+            day=day,
+            start=start,
+            end=end,
+            building=building,
+            min_capacity=min_capacity,
+            on=on,
+            include_busy=include_busy,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
-    # Candidate rooms
-    room_q = db.query(Room).filter(Room.tenant_id == tenant.id)
-    if building:
-        room_q = room_q.filter(Room.building == building)
-    rooms = room_q.all()
-    if not rooms:
-        return {"items": []}
 
-    # Find overlapping timeslots on that day
-    slots = (
-        db.query(Timeslot)
-        .filter(Timeslot.tenant_id == tenant.id, Timeslot.day == day)
-        .all()
-    )
-    def _overlap(s: Timeslot) -> bool:
-        return not (s.end <= start or s.start >= end)  # string compare OK for HH:MM
-
-    slot_ids = [s.id for s in slots if _overlap(s)]
-    if not slot_ids:
-        # no timeslots overlap → all rooms considered free
-        items = [
-            {"room_id": r.id, "room_name": r.name, "building": r.building, "capacity": r.capacity}
-            for r in rooms
-        ]
-        return {"items": items}
-
-    # Rooms occupied in any overlapping slot
-    occ_rows = (
-        db.query(Assignment.room_id)
-        .filter(Assignment.tenant_id == tenant.id, Assignment.timeslot_id.in_(slot_ids))
-        .all()
-    )
-    occupied_ids = {rid for (rid,) in occ_rows if rid is not None}
-
-    free = [r for r in rooms if r.id not in occupied_ids]
-    items = [
-        {"room_id": r.id, "room_name": r.name, "building": r.building, "capacity": r.capacity}
-        for r in free
-    ]
-    # sort by building, then room name
-    items.sort(key=lambda x: ((x["building"] or ""), x["room_name"] or ""))
-    return {"items": items, "total": len(rooms), "free": len(items)}
+@router.post("/available/batch")
+def available_rooms_batch(
+    req: VacancyBatchRequest,
+    tenant_key: str | None = Header(default=None, convert_underscores=False, alias="X-Tenant-ID"),
+    x_api_key: str | None = Header(default=None, convert_underscores=False, alias="X-API-Key"),
+    authorization: str | None = Header(default=None, alias="Authorization"),
+    db: Session = Depends(get_db),
+):
+    """여러 구간(예: 주간 그리드 전체)을 한 번에 조회합니다.
+    테넌트/API 키 확인과 점유 현황 로딩은 요청당 한 번만 수행하며, 결과는 queries 순서대로 반환합니다.
+    잘못된 항목은 전체 실패 대신 해당 항목에 `error`를 담습니다.
+    """
+    tenant = resolve_tenant_from_headers(db, api_key=(x_api_key or authorization or None), tenant_key=tenant_key)
+    if tenant is None:
+        return {"results": [{"items": []} for _ in req.queries]}
+    matrix = get_occupancy(db, tenant)
+    results: list[dict] = []
+    for q in req.queries:
+        try:
+            results.append(
+                _availability(
+                    matrix,
+                    day=q.day,
+                    start=q.start,
+                    end=q.end,
+                    building=q.building,
+                    min_capacity=q.min_capacity,
+                    on=q.date,
+                    include_busy=req.include_busy,
+                )
+            )
+        except ValueError as exc:
+            results.append({"items": [], "error": str(exc)})
+    # Plain dicts/strs/ints only: skip jsonable_encoder's walk over thousands of room entries
+    return JSONResponse({"results": results})
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date as date_type, datetime
 from typing import Any, Optional
 from pydantic import BaseModel, Field
 
@@ -17,6 +17,7 @@ class OptimizeRequest(BaseModel):
     solver: str | None = Field(default="greedy", description="greedy | pulp | ortools")
     slot_group: int | None = Field(default=3, description="Group N consecutive slots as one block (default 3h 강의)")
     forbid_checks: bool | None = Field(default=True, description="Enable forbidden-set filtering")
+    time_limit: float | None = Field(default=None, gt=0, description="Wall-clock budget for pulp/ortools in seconds (greedy hint, model build and search)")
 
 
 class OptimizeStatus(BaseModel):
@@ -25,6 +26,8 @@ class OptimizeStatus(BaseModel):
     score: Optional[float] = None
     explain: Optional[str] = None
     solver: Optional[str] = None
+    metrics: Optional[dict[str, Any]] = None
+    queue_position: Optional[int] = None
 
 
 class AssignmentPatch(BaseModel):
@@ -51,6 +54,20 @@ class VacancyHeatmapCell(BaseModel):
     vacancy_ratio: float
 
 
+class VacancyQuery(BaseModel):
+    day: str | None = Field(default=None, description="Mon..Fri; optional when date is given")
+    start: str = Field(..., description="HH:MM")
+    end: str = Field(..., description="HH:MM")
+    building: str | None = None
+    min_capacity: int | None = Field(default=None, ge=0)
+    date: date_type | None = Field(default=None, description="YYYY-MM-DD: apply blackouts of that day")
+
+
+class VacancyBatchRequest(BaseModel):
+    queries: list[VacancyQuery] = Field(..., min_length=1, max_length=500)
+    include_busy: bool = False
+
+
 class CourseInsight(BaseModel):
     summary: str
     sentiment: str
@@ -107,13 +124,25 @@ class CourseReviewRequest(BaseModel):
     answers: list[int] = Field(default_factory=list)
 
 
+class CourseSearchHit(BaseModel):
+    course_id: int
+    code: Optional[str] = None
+    name: str
+    department: Optional[str] = None
+    cohort: Optional[str] = None
+    score: float
+    match: str  # exact|prefix|contains|fuzzy
+
+
 class FacultyCourseOverview(BaseModel):
     course_id: int
     course_code: Optional[str] = None
     course_name: str
     avg_rating: Optional[float] = None
+    avg_difficulty: Optional[float] = None
     review_count: int = 0
     enrollment_count: int = 0
+    enrollment_by_status: dict[str, int] = Field(default_factory=dict)
 
 
 class AdminDataUpload(BaseModel):
@@ -6,15 +6,22 @@ import hmac
 import os
 import secrets
 import hashlib
+import logging
+import threading
 import time
 from datetime import datetime
 from typing import Optional, Tuple
 
+from sqlalchemy import bindparam, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
+from ..config import get_settings
 from ..models import ApiKey, Tenant, Project, User
 
 
+logger = logging.getLogger(__name__)
+
 PEPPER = os.getenv("API_KEY_PEPPER", "")
 AUTH_SECRET = os.getenv("AUTH_SECRET", "")
 
@@ -87,13 +94,86 @@ def verify_api_key(db: Session, token: str) -> Optional[ApiKey]:
     if not row:
         return None
     if hmac.compare_digest(row.key_hash, _sha256_hex(secret)):
-        row.last_used_at = datetime.utcnow()
-        db.add(row)
-        db.commit()
+        now = datetime.utcnow()
+        # Buffered; shown on the row without marking it dirty so the caller's session stays read-only
+        set_committed_value(row, "last_used_at", now)
+        touch_api_key(row.id, now)
         return row
     return None
 
 
+# api_keys.last_used_at is written in batches: key id -> latest use not yet flushed
+_LAST_USED: dict[int, datetime] = {}
+_LAST_USED_LOCK = threading.Lock()
+_FLUSH_WAKE = threading.Event()
+_FLUSHER: Optional[threading.Thread] = None
+
+
+def touch_api_key(key_id: int, when: datetime) -> None:
+    """Record a key use; the background flusher writes it within API_KEY_TOUCH_INTERVAL seconds."""
+    global _FLUSHER
+    with _LAST_USED_LOCK:
+        _LAST_USED[key_id] = when
+        pending = len(_LAST_USED)
+        if _FLUSHER is None or not _FLUSHER.is_alive():
+            _FLUSHER = threading.Thread(target=_flush_loop, name="api-key-touch", daemon=True)
+            _FLUSHER.start()
+    if pending >= get_settings().api_key_touch_batch:
+        _FLUSH_WAKE.set()
+
+
+def pending_last_used(key_id: int) -> Optional[datetime]:
+    with _LAST_USED_LOCK:
+        return _LAST_USED.get(key_id)
+
+
+def flush_api_key_usage() -> int:
+    """Write buffered last_used_at values in one UPDATE batch; returns the number of keys flushed.
+
+    Keys deleted since they were used simply match no row and are dropped. On failure the
+    batch goes back into the buffer and the error is re-raised.
+    """
+    from ..db import SessionLocal
+
+    with _LAST_USED_LOCK:
+        batch = dict(_LAST_USED)
+        _LAST_USED.clear()
+    if not batch:
+        return 0
+    try:
+        with SessionLocal() as db:
+            # Core executemany, not the ORM bulk UPDATE by primary key: that one raises
+            # StaleDataError when a key was deleted, and the batch would be re-queued forever
+            db.execute(
+                update(ApiKey.__table__)
+                .where(ApiKey.id == bindparam("b_id"))
+                .values(last_used_at=bindparam("b_used")),
+                [{"b_id": key_id, "b_used": used_at} for key_id, used_at in batch.items()],
+            )
+            db.commit()
+    except Exception:
+        # put them back (keeping newer uses recorded meanwhile) for the next attempt
+        with _LAST_USED_LOCK:
+            for key_id, used_at in batch.items():
+                if _LAST_USED.get(key_id, used_at) <= used_at:
+                    _LAST_USED[key_id] = used_at
+        raise
+    return len(batch)
+
+
+def _flush_loop() -> None:
+    while True:
+        _FLUSH_WAKE.wait(timeout=get_settings().api_key_touch_interval)
+        _FLUSH_WAKE.clear()
+        try:
+            flush_api_key_usage()
+        except Exception:
+            # the batch was put back; retried at the next interval
+            with _LAST_USED_LOCK:
+                pending = len(_LAST_USED)
+            logger.exception("api key last_used_at flush failed (%d keys pending)", pending)
+
+
 def resolve_tenant_from_headers(db: Session, *, api_key: Optional[str], tenant_key: Optional[str]) -> Optional[Tenant]:
     # 1) API key wins
     if api_key:
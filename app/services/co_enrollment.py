@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime
+from itertools import permutations
+from typing import Iterable, Optional
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from ..models import CoEnrollmentSnapshot, Enrollment, Tenant
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover
+    np = None
+
+COMPACT_AT = 20_000  # overlay entries before they are folded into the CSR arrays and persisted
+VERIFY_EVERY = 30.0  # seconds between checks for enrollments dropped/deleted below the watermark
+# Dropped enrollments are not co-enrollment; NULL is the column default ("enrolled")
+ACTIVE = or_(Enrollment.status.is_(None), Enrollment.status != "dropped")
+
+
+def _array(values: list[int]):
+    return np.array(values, dtype=np.int64) if np is not None else values
+
+
+class CoEnrollmentIndex:
+    """Sparse course × course matrix: cell (x, y) = students enrolled in both x and y.
+
+    The bulk lives in CSR arrays (``indptr``/``indices``/``data`` over ``course_ids``);
+    enrollments that arrive later go into a small dict overlay until :meth:`compacted` folds
+    them in. ``counts`` is the diagonal (students per course). Only non-dropped enrollments
+    count.
+
+    New rows are folded in by id (:meth:`catch_up`), but the matrix cannot subtract: rows at
+    or below the watermark that are dropped, deleted or re-activated are detected by
+    ``active`` — (count, sum of ids) of the active rows folded in — no longer matching the
+    table (:meth:`stale`), and the index is then rebuilt.
+    """
+
+    def __init__(
+        self,
+        tenant_id: int,
+        watermark: int,
+        course_ids,
+        counts,
+        indptr,
+        indices,
+        data,
+        active: Optional[tuple[int, int]] = None,
+    ) -> None:
+        self.tenant_id = tenant_id
+        self.watermark = watermark
+        self.active = active  # None: unknown (older snapshot), treated as stale
+        self.course_ids = course_ids
+        self.counts = counts
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self._pos = {int(cid): i for i, cid in enumerate(course_ids)}
+        self._extra: dict[int, Counter] = defaultdict(Counter)
+        self._extra_counts: Counter = Counter()
+        self._extra_size = 0
+        self.verified_at = 0.0  # time.time() of the last stale() check
+        self.lock = threading.Lock()
+
+    # -- construction -----------------------------------------------------
+
+    @classmethod
+    def from_pairs(
+        cls,
+        tenant_id: int,
+        watermark: int,
+        counts: dict[int, int],
+        pairs: dict[int, Counter],
+        active: Optional[tuple[int, int]] = None,
+    ) -> "CoEnrollmentIndex":
+        course_ids = sorted(counts)
+        pos = {cid: i for i, cid in enumerate(course_ids)}
+        indptr, indices, data = [0], [], []
+        for cid in course_ids:
+            row = sorted((pos[other], n) for other, n in pairs.get(cid, {}).items() if n)
+            indices.extend(j for j, _ in row)
+            data.extend(n for _, n in row)
+            indptr.append(len(indices))
+        return cls(
+            tenant_id,
+            watermark,
+            _array(course_ids),
+            _array([counts[cid] for cid in course_ids]),
+            _array(indptr),
+            _array(indices),
+            _array(data),
+            active,
+        )
+
+    @classmethod
+    def build(cls, db: Session, tenant_id: int) -> "CoEnrollmentIndex":
+        """Full pass over the tenant's active enrollments."""
+        watermark = rows = id_sum = 0
+        by_student: dict[int, set[int]] = defaultdict(set)
+        for eid, student_id, course_id, status in db.execute(
+            select(Enrollment.id, Enrollment.student_id, Enrollment.course_id, Enrollment.status).where(
+                Enrollment.tenant_id == tenant_id
+            )
+        ):
+            # Dropped rows still move the watermark: if they come back they are caught by stale()
+            watermark = max(watermark, eid)
+            if status == "dropped":
+                continue
+            by_student[student_id].add(course_id)
+            rows += 1
+            id_sum += eid
+        counts: Counter = Counter()
+        pairs: dict[int, Counter] = defaultdict(Counter)
+        for courses in by_student.values():
+            counts.update(courses)
+            for a, b in permutations(courses, 2):
+                pairs[a][b] += 1
+        return cls.from_pairs(tenant_id, watermark, counts, pairs, (rows, id_sum))
+
+    def to_payload(self) -> bytes:
+        body = {
+            name: [int(v) for v in getattr(self, name)]
+            for name in ("course_ids", "counts", "indptr", "indices", "data")
+        }
+        body["active"] = list(self.active) if self.active is not None else None
+        return zlib.compress(json.dumps(body, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_payload(cls, tenant_id: int, watermark: int, payload: bytes) -> "CoEnrollmentIndex":
+        body = json.loads(zlib.decompress(payload))
+        arrays = (_array(body[name]) for name in ("course_ids", "counts", "indptr", "indices", "data"))
+        active = body.get("active")
+        return cls(tenant_id, watermark, *arrays, tuple(active) if active is not None else None)
+
+    # -- reads ------------------------------------------------------------
+
+    def count(self, course_id: int) -> int:
+        pos = self._pos.get(course_id)
+        base = int(self.counts[pos]) if pos is not None else 0
+        return base + self._extra_counts.get(course_id, 0)
+
+    def row(self, course_id: int) -> dict[int, int]:
+        """course_id -> students who also took ``course_id``."""
+        out: dict[int, int] = {}
+        pos = self._pos.get(course_id)
+        if pos is not None:
+            lo, hi = int(self.indptr[pos]), int(self.indptr[pos + 1])
+            others = [self.course_ids[j] for j in self.indices[lo:hi]]
+            out = {int(cid): int(n) for cid, n in zip(others, self.data[lo:hi])}
+        for other, n in self._extra.get(course_id, {}).items():
+            out[other] = out.get(other, 0) + n
+        return out
+
+    def similar(self, taken: Iterable[int]) -> dict[int, float]:
+        """"Students who took X also took Y": Σ over taken X of cosine(X, Y), for Y not taken."""
+        taken = set(taken)
+        scores: dict[int, float] = {}
+        for x in taken:
+            nx = self.count(x)
+            if not nx:
+                continue
+            for y, both in self.row(x).items():
+                if y in taken:
+                    continue
+                scores[y] = scores.get(y, 0.0) + both / math.sqrt(nx * max(1, self.count(y)))
+        return scores
+
+    # -- incremental updates ----------------------------------------------
+
+    def add(self, course_id: int, previous: Iterable[int]) -> None:
+        """One new enrollment of a student who already had ``previous`` courses."""
+        self._extra_counts[course_id] += 1
+        for other in previous:
+            self._extra[course_id][other] += 1
+            self._extra[other][course_id] += 1
+            self._extra_size += 2
+
+    def catch_up(self, db: Session) -> int:
+        """Fold in active enrollments newer than the watermark; returns how many were applied."""
+        rows = db.execute(
+            select(Enrollment.id, Enrollment.student_id, Enrollment.course_id, Enrollment.status)
+            .where(Enrollment.tenant_id == self.tenant_id, Enrollment.id > self.watermark)
+            .order_by(Enrollment.id)
+        ).all()
+        if not rows:
+            return 0
+        previous, self.watermark = self.watermark, rows[-1].id
+        rows = [row for row in rows if row.status != "dropped"]
+        if not rows:
+            return 0
+        students = {row.student_id for row in rows}
+        known: dict[int, set[int]] = defaultdict(set)
+        for student_id, course_id in db.execute(
+            select(Enrollment.student_id, Enrollment.course_id).where(
+                Enrollment.student_id.in_(students), Enrollment.id <= previous, ACTIVE
+            )
+        ):
+            known[student_id].add(course_id)
+        for row in rows:
+            courses = known[row.student_id]
+            if row.course_id not in courses:  # a duplicate row is the same enrollment
+                self.add(row.course_id, courses)
+                courses.add(row.course_id)
+        if self.active is not None:
+            self.active = (self.active[0] + len(rows), self.active[1] + sum(row.id for row in rows))
+        return len(rows)
+
+    def stale(self, db: Session) -> bool:
+        """True when active rows up to the watermark differ from what was folded in (drops, deletes)."""
+        if self.active is None:
+            return True
+        rows, id_sum = db.execute(
+            select(func.count(Enrollment.id), func.coalesce(func.sum(Enrollment.id), 0)).where(
+                Enrollment.tenant_id == self.tenant_id, Enrollment.id <= self.watermark, ACTIVE
+            )
+        ).one()
+        return (rows, id_sum) != self.active
+
+    def needs_compaction(self) -> bool:
+        return self._extra_size >= COMPACT_AT
+
+    def compacted(self) -> "CoEnrollmentIndex":
+        counts: Counter = Counter({int(cid): int(n) for cid, n in zip(self.course_ids, self.counts)})
+        counts.update(self._extra_counts)
+        pairs: dict[int, Counter] = defaultdict(Counter)
+        for cid in counts:
+            pairs[cid].update(self.row(cid))
+        return CoEnrollmentIndex.from_pairs(self.tenant_id, self.watermark, counts, pairs, self.active)
+
+
+# tenant_id -> index; swapped whole on rebuild/compaction
+_INDEXES: dict[int, CoEnrollmentIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def _save(db: Session, index: CoEnrollmentIndex) -> None:
+    row = db.get(CoEnrollmentSnapshot, index.tenant_id)
+    if row is None:
+        row = CoEnrollmentSnapshot(tenant_id=index.tenant_id)
+    row.watermark = index.watermark
+    row.payload = index.to_payload()
+    row.built_at = datetime.utcnow()
+    db.add(row)
+    db.commit()
+
+
+def rebuild_co_enrollment(db: Session, tenant_id: int) -> CoEnrollmentIndex:
+    index = CoEnrollmentIndex.build(db, tenant_id)
+    index.verified_at = time.time()
+    _save(db, index)
+    with _INDEXES_LOCK:
+        _INDEXES[tenant_id] = index
+    return index
+
+
+def _load(db: Session, tenant_id: int) -> CoEnrollmentIndex:
+    snapshot = db.get(CoEnrollmentSnapshot, tenant_id)
+    if snapshot is None:
+        return rebuild_co_enrollment(db, tenant_id)
+    index = CoEnrollmentIndex.from_payload(tenant_id, snapshot.watermark, snapshot.payload)
+    with _INDEXES_LOCK:
+        _INDEXES[tenant_id] = index
+    return index
+
+
+def load_co_enrollment_indexes(db: Session) -> None:
+    """Startup: read every tenant's persisted matrix (building the missing ones)."""
+    for tenant_id in db.execute(select(Tenant.id)).scalars():
+        _load(db, tenant_id)
+
+
+def get_co_enrollment(db: Session, tenant_id: int) -> CoEnrollmentIndex:
+    """The tenant's index with every enrollment up to now folded in.
+
+    Additions are applied on every call; removals (every ``VERIFY_EVERY`` seconds) trigger a
+    full rebuild, since the matrix only adds.
+    """
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(tenant_id)
+    if index is None:
+        index = _load(db, tenant_id)
+    with index.lock:
+        stale = False
+        if time.time() - index.verified_at >= VERIFY_EVERY:
+            stale = index.stale(db)
+            index.verified_at = time.time()
+    if stale:
+        return rebuild_co_enrollment(db, tenant_id)
+    with index.lock:
+        index.catch_up(db)
+        if not index.needs_compaction():
+            return index
+        compacted = index.compacted()
+    _save(db, compacted)
+    with _INDEXES_LOCK:
+        _INDEXES[tenant_id] = compacted
+    return compacted
+
+
+def co_enrollment_scores(db: Session, tenant_id: int, taken: Iterable[int]) -> dict[int, float]:
+    index = get_co_enrollment(db, tenant_id)
+    with index.lock:
+        return index.similar(taken)
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models import Course, CourseStats
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover
+    np = None
+
+RATING_WEIGHT = 0.6
+ENROLLMENT_WEIGHT = 0.01  # × expected_enrollment
+MAJOR_BOOST = 0.8  # student major found in course cohort
+POPULARITY_CAP = 0.5  # min(cap, enrollments / POPULARITY_SCALE)
+POPULARITY_SCALE = 10.0
+CO_ENROLLMENT_BOOST = 1.0  # × min(1, co-enrollment similarity to the student's courses)
+# Stats rows are re-read this far behind the newest updated_at seen: writers stamp updated_at
+# before they commit, so commits can land out of timestamp order
+_STATS_SLACK = timedelta(seconds=5)
+
+
+@dataclass
+class CourseFeatures:
+    """Column-wise copy of a tenant's courses and their stats, ordered by course id.
+
+    The course columns are rebuilt only when the catalog changes (``version``); the stats
+    columns follow CourseStats through :meth:`with_stats`. Never mutated once cached: a stats
+    change swaps in a copy, so readers can keep using the arrays they hold.
+    """
+
+    version: tuple
+    ids: Any  # int64 array (list without numpy)
+    codes: list[Optional[str]]
+    names: list[str]
+    cohorts: list[str]  # lower-cased, "" when missing
+    avg_rating: Any  # 0.0 when the course has no rating
+    review_count: Any  # only counted for rated courses, like the old rating map
+    expected: Any
+    enrollments: Any
+    stats_seen: Optional[datetime] = None  # newest CourseStats.updated_at applied
+    _major_masks: dict[str, Any] = field(default_factory=dict)
+    _id_index: Optional[dict[int, int]] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def major_mask(self, major: Optional[str]) -> Any:
+        """Courses whose cohort contains ``major`` (case-insensitive); cached per major."""
+        key = (major or "").lower()
+        with self._lock:
+            mask = self._major_masks.get(key)
+        if mask is None:
+            hits = [bool(key) and bool(cohort) and key in cohort for cohort in self.cohorts]
+            mask = np.array(hits, dtype=bool) if np is not None else hits
+            with self._lock:
+                self._major_masks[key] = mask
+        return mask
+
+    def _index(self) -> dict[int, int]:
+        if self._id_index is None:
+            self._id_index = {int(cid): i for i, cid in enumerate(self.ids)}
+        return self._id_index
+
+    def positions(self, course_ids: Iterable[int]) -> list[int]:
+        index = self._index()
+        return [index[cid] for cid in course_ids if cid in index]
+
+    def with_stats(self, rows: Iterable[Any]) -> "CourseFeatures":
+        """Copy with the stats columns of ``rows`` (CourseStats values), or ``self`` when nothing differs."""
+        index = self._index()
+        seen = self.stats_seen
+        changes: list[tuple[int, tuple[float, int, float]]] = []
+        for row in rows:
+            if seen is None or row.updated_at > seen:
+                seen = row.updated_at
+            pos = index.get(row.course_id)
+            if pos is None:
+                continue
+            values = _stats_values(row)
+            if (self.avg_rating[pos], self.review_count[pos], self.enrollments[pos]) != values:
+                changes.append((pos, values))
+        if not changes:
+            self.stats_seen = seen  # only narrows the next re-read window
+            return self
+        copy = np.copy if np is not None else list
+        avg_rating, review_count, enrollments = copy(self.avg_rating), copy(self.review_count), copy(self.enrollments)
+        for pos, (rating, reviews, enrolled) in changes:
+            avg_rating[pos], review_count[pos], enrollments[pos] = rating, reviews, enrolled
+        # Course columns and the per-major masks only depend on the catalog and are shared
+        return replace(self, avg_rating=avg_rating, review_count=review_count, enrollments=enrollments, stats_seen=seen)
+
+    def dense(self, values: dict[int, float]) -> Any:
+        """Per-course vector of ``values`` (0 for courses not in it)."""
+        index = self._index()
+        out = np.zeros(len(self)) if np is not None else [0.0] * len(self)
+        for cid, value in values.items():
+            pos = index.get(cid)
+            if pos is not None:
+                out[pos] = value
+        return out
+
+
+# tenant_id -> features; rebuilt when the catalog version below moves, patched for stats
+_FEATURES: dict[int, CourseFeatures] = {}
+_FEATURES_LOCK = threading.Lock()
+
+
+def _version(db: Session, tenant_id: int) -> tuple:
+    # Catalog only: enrollments and reviews move CourseStats, which is patched in instead
+    return tuple(
+        db.execute(
+            select(func.count(Course.id), func.max(Course.id), func.sum(Course.expected_enrollment)).where(
+                Course.tenant_id == tenant_id
+            )
+        ).one()
+    )
+
+
+def _stats_values(row: Any) -> tuple[float, int, float]:
+    # (avg_rating, review_count, enrollments); review_count only counts for rated courses
+    rated = bool(row.rating_count)
+    return (
+        row.rating_sum / row.rating_count if rated else 0.0,
+        row.review_count if rated else 0,
+        float(row.enrollment_count or 0),
+    )
+
+
+def _stats_rows(db: Session, tenant_id: int, since: Optional[datetime]) -> list[Any]:
+    query = select(
+        CourseStats.course_id,
+        CourseStats.rating_sum,
+        CourseStats.rating_count,
+        CourseStats.review_count,
+        CourseStats.enrollment_count,
+        CourseStats.updated_at,
+    ).where(CourseStats.tenant_id == tenant_id)
+    if since is not None:
+        query = query.where(CourseStats.updated_at > since - _STATS_SLACK)
+    return db.execute(query).all()
+
+
+def _load(db: Session, tenant_id: int, version: tuple) -> CourseFeatures:
+    rows = db.execute(
+        select(Course.id, Course.code, Course.name, Course.cohort, Course.expected_enrollment)
+        .where(Course.tenant_id == tenant_id)
+        .order_by(Course.id)
+    ).all()
+    columns = {
+        "ids": [row.id for row in rows],
+        "avg_rating": [0.0] * len(rows),
+        "review_count": [0] * len(rows),
+        "expected": [float(row.expected_enrollment or 0) for row in rows],
+        "enrollments": [0.0] * len(rows),
+    }
+    if np is not None:
+        columns = {
+            "ids": np.array(columns["ids"], dtype=np.int64),
+            "avg_rating": np.array(columns["avg_rating"], dtype=np.float64),
+            "review_count": np.array(columns["review_count"], dtype=np.int64),
+            "expected": np.array(columns["expected"], dtype=np.float64),
+            "enrollments": np.array(columns["enrollments"], dtype=np.float64),
+        }
+    features = CourseFeatures(
+        version=version,
+        codes=[row.code for row in rows],
+        names=[row.name for row in rows],
+        cohorts=[(row.cohort or "").lower() for row in rows],
+        **columns,
+    )
+    return features.with_stats(_stats_rows(db, tenant_id, None))
+
+
+def get_course_features(db: Session, tenant_id: int) -> CourseFeatures:
+    """Cached features for the tenant.
+
+    A catalog change (courses added/removed, expected enrollment) rebuilds them; enrollments
+    and reviews only re-read the CourseStats rows updated since the last call and patch
+    those positions.
+    """
+    version = _version(db, tenant_id)
+    with _FEATURES_LOCK:
+        cached = _FEATURES.get(tenant_id)
+    if cached is None or cached.version != version:
+        features = _load(db, tenant_id, version)
+    else:
+        features = cached.with_stats(_stats_rows(db, tenant_id, cached.stats_seen))
+        if features is cached:
+            return cached
+    with _FEATURES_LOCK:
+        _FEATURES[tenant_id] = features
+    return features
+
+
+def invalidate_course_features(tenant_id: Optional[int]) -> None:
+    """Drop the cached arrays (``None``: every tenant's) after edits the version key cannot see.
+
+    That is renames and cohort changes, and stats rebuilds that delete rows.
+    """
+    with _FEATURES_LOCK:
+        if tenant_id is None:
+            _FEATURES.clear()
+        else:
+            _FEATURES.pop(tenant_id, None)
+
+
+@dataclass
+class ScoredCourse:
+    position: int
+    score: float  # rounded to 2 places, the ranking key
+    major_match: bool
+    personal_boost: float
+    co_enrollment: float = 0.0  # boost from "students who took your courses also took this"
+
+
+def score_courses(
+    features: CourseFeatures,
+    *,
+    major: Optional[str],
+    exclude_ids: Iterable[int],
+    limit: int,
+    popularity: bool,
+    co_enrollment: Optional[dict[int, float]] = None,
+) -> list[ScoredCourse]:
+    """Top ``limit`` courses by rating/size score plus the major boost (and popularity when ``popularity``).
+
+    ``co_enrollment`` maps course_id to its similarity to the student's courses; it adds
+    ``CO_ENROLLMENT_BOOST × min(1, similarity)``.
+
+    Everything is scored in one array expression; already-taken courses are masked out and
+    ``argpartition`` picks the top k. Ties on the rounded score keep course-id order.
+    """
+    if limit <= 0 or not len(features):
+        return []
+    excluded = features.positions(exclude_ids)
+    major_mask = features.major_mask(major)
+    co_boost = features.dense({cid: CO_ENROLLMENT_BOOST * min(1.0, sim) for cid, sim in (co_enrollment or {}).items()})
+    if np is None:
+        return _score_python(features, major_mask, co_boost, set(excluded), limit, popularity)
+
+    boost = np.where(major_mask, MAJOR_BOOST, 0.0) + co_boost
+    if popularity:
+        boost = boost + np.minimum(POPULARITY_CAP, features.enrollments / POPULARITY_SCALE)
+    scores = np.round(features.avg_rating * RATING_WEIGHT + features.expected * ENROLLMENT_WEIGHT + boost, 2)
+    scores[excluded] = -np.inf
+    valid = np.flatnonzero(scores > -np.inf)
+    if limit < len(valid):
+        kth = scores[valid[np.argpartition(-scores[valid], limit - 1)[limit - 1]]]
+        above = valid[scores[valid] > kth]
+        ties = valid[scores[valid] == kth][: limit - len(above)]
+        valid = np.concatenate([above, ties])
+    top = valid[np.lexsort((valid, -scores[valid]))]
+    return [
+        ScoredCourse(
+            position=int(i),
+            score=float(scores[i]),
+            major_match=bool(major_mask[i]),
+            personal_boost=float(boost[i]),
+            co_enrollment=float(co_boost[i]),
+        )
+        for i in top
+    ]
+
+
+def _score_python(
+    features: CourseFeatures,
+    major_mask: list[bool],
+    co_boost: list[float],
+    excluded: set[int],
+    limit: int,
+    popularity: bool,
+) -> list[ScoredCourse]:
+    scored: list[ScoredCourse] = []
+    for i in range(len(features)):
+        if i in excluded:
+            continue
+        boost = (MAJOR_BOOST if major_mask[i] else 0.0) + co_boost[i]
+        if popularity:
+            boost += min(POPULARITY_CAP, features.enrollments[i] / POPULARITY_SCALE)
+        score = round(features.avg_rating[i] * RATING_WEIGHT + features.expected[i] * ENROLLMENT_WEIGHT + boost, 2)
+        scored.append(
+            ScoredCourse(position=i, score=score, major_match=major_mask[i], personal_boost=boost, co_enrollment=co_boost[i])
+        )
+    return heapq.nsmallest(limit, scored, key=lambda s: (-s.score, s.position))
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import heapq
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models import Course
+
+# field -> weight; a gram found in several fields counts with the highest weight
+FIELDS = (("code", 4.0), ("name", 3.0), ("department", 1.0), ("cohort", 1.0))
+FUZZY_MIN = 0.5  # share of the query's bigrams a fuzzy hit must contain
+MATCH_BONUS = {"exact": 3.0, "prefix": 2.0, "contains": 1.0, "fuzzy": 0.0}
+
+_STRIP_RE = re.compile(r"[^0-9a-z가-힣]")
+
+
+def normalize(text: Optional[str]) -> str:
+    """NFC, lower-case, letters/digits/Hangul only: "간호관리학(1)" -> "간호관리학1"."""
+    if not text:
+        return ""
+    return _STRIP_RE.sub("", unicodedata.normalize("NFC", text).lower())
+
+
+def bigrams(text: str) -> set[str]:
+    """Character bigrams (no tokenizer needed for Hangul); a 1-character string is its own gram."""
+    if len(text) < 2:
+        return {text} if text else set()
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+@dataclass(slots=True)
+class _Doc:
+    course_id: int
+    code: Optional[str]
+    name: str
+    department: Optional[str]
+    cohort: Optional[str]
+    fields: tuple[str, ...]  # normalized, in FIELDS order
+    grams: dict[str, float]  # gram -> weight (bigrams and single characters)
+
+
+class CourseSearchIndex:
+    """Inverted index over course code/name/department/cohort for one tenant.
+
+    Postings map a bigram (or a single character, for 1-character queries) to the courses
+    containing it with the field weight. Courses can be added or replaced one at a time.
+    """
+
+    def __init__(self, tenant_id: int) -> None:
+        self.tenant_id = tenant_id
+        self.docs: dict[int, _Doc] = {}
+        self.postings: dict[str, dict[int, float]] = {}
+        self.codes: dict[str, int] = {}  # upper-cased code -> course_id
+        self.max_id = 0
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def upsert(self, course_id: int, code: Optional[str], name: str, department: Optional[str], cohort: Optional[str]) -> None:
+        with self.lock:
+            self.remove(course_id)
+            fields = tuple(normalize(value) for value in (code, name, department, cohort))
+            grams: dict[str, float] = {}
+            for text, (_, weight) in zip(fields, FIELDS):
+                for gram in bigrams(text) | set(text):
+                    if weight > grams.get(gram, 0.0):
+                        grams[gram] = weight
+            self.docs[course_id] = _Doc(course_id, code, name, department, cohort, fields, grams)
+            for gram, weight in grams.items():
+                self.postings.setdefault(gram, {})[course_id] = weight
+            if code:
+                self.codes[code.upper()] = course_id
+            self.max_id = max(self.max_id, course_id)
+
+    def remove(self, course_id: int) -> None:
+        with self.lock:
+            doc = self.docs.pop(course_id, None)
+            if doc is None:
+                return
+            for gram in doc.grams:
+                posting = self.postings.get(gram)
+                if posting is not None:
+                    posting.pop(course_id, None)
+                    if not posting:
+                        del self.postings[gram]
+            if doc.code and self.codes.get(doc.code.upper()) == course_id:
+                del self.codes[doc.code.upper()]
+
+    def add_rows(self, rows: Iterable[Any]) -> None:
+        for row in rows:
+            self.upsert(row.id, row.code, row.name, row.department, row.cohort)
+
+    def course_id_for_code(self, code: str) -> Optional[int]:
+        return self.codes.get(code.strip().upper())
+
+    def search(self, query: str, *, limit: int = 20, fuzzy: bool = True) -> list[dict[str, Any]]:
+        """Ranked matches: exact code, then field prefix, substring, and (with ``fuzzy``) partial bigram overlap."""
+        q = normalize(query)
+        if not q or limit <= 0:
+            return []
+        grams = bigrams(q)
+        max_weight = FIELDS[0][1]
+        with self.lock:
+            # per course: query grams it contains, and their summed field weights
+            hits: dict[int, int] = {}
+            weights: dict[int, float] = {}
+            for gram in grams:
+                for course_id, weight in self.postings.get(gram, {}).items():
+                    hits[course_id] = hits.get(course_id, 0) + 1
+                    weights[course_id] = weights.get(course_id, 0.0) + weight
+            scored: list[tuple[float, int, str]] = []
+            for course_id, hit_count in hits.items():
+                doc = self.docs[course_id]
+                if doc.fields[0] == q:
+                    match = "exact"
+                elif any(text.startswith(q) for text in doc.fields):
+                    match = "prefix"
+                elif any(q in text for text in doc.fields):
+                    match = "contains"
+                elif fuzzy and len(q) > 1 and hit_count >= FUZZY_MIN * len(grams):
+                    match = "fuzzy"
+                else:
+                    continue
+                score = MATCH_BONUS[match] + weights[course_id] / (max_weight * len(grams))
+                scored.append((score, -course_id, match))
+            top = heapq.nlargest(limit, scored)
+            return [
+                {
+                    "course_id": self.docs[-neg_id].course_id,
+                    "code": self.docs[-neg_id].code,
+                    "name": self.docs[-neg_id].name,
+                    "department": self.docs[-neg_id].department,
+                    "cohort": self.docs[-neg_id].cohort,
+                    "score": round(score, 4),
+                    "match": match,
+                }
+                for score, neg_id, match in top
+            ]
+
+
+_INDEXES: dict[int, CourseSearchIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+_COLUMNS = (Course.id, Course.code, Course.name, Course.department, Course.cohort)
+
+
+def get_search_index(db: Session, tenant_id: int) -> CourseSearchIndex:
+    """The tenant's index; courses added since the last call are indexed incrementally."""
+    count, max_id = db.execute(
+        select(func.count(Course.id), func.max(Course.id)).where(Course.tenant_id == tenant_id)
+    ).one()
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(tenant_id)
+    if index is not None and (max_id or 0) > index.max_id:
+        index.add_rows(
+            db.execute(select(*_COLUMNS).where(Course.tenant_id == tenant_id, Course.id > index.max_id))
+        )
+    if index is None or len(index) != count:
+        # first use, or courses were deleted: full build
+        index = CourseSearchIndex(tenant_id)
+        index.add_rows(db.execute(select(*_COLUMNS).where(Course.tenant_id == tenant_id)))
+        with _INDEXES_LOCK:
+            _INDEXES[tenant_id] = index
+    return index
+
+
+def refresh_courses(db: Session, tenant_id: int, course_ids: Optional[Iterable[int]] = None) -> None:
+    """Re-index courses an import created or edited (all of the tenant's when ``course_ids`` is None)."""
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(tenant_id)
+    if index is None:
+        return  # built on first search
+    if course_ids is None:
+        with _INDEXES_LOCK:
+            _INDEXES.pop(tenant_id, None)
+        return
+    ids = list(course_ids)
+    for i in range(0, len(ids), 500):
+        index.add_rows(db.execute(select(*_COLUMNS).where(Course.id.in_(ids[i : i + 500]))))
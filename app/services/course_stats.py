@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models import CourseReview, CourseStats, Enrollment
+
+# Statuses with their own counter column; anything else only moves enrollment_count
+STATUSES = ("requested", "enrolled", "waitlisted", "completed", "dropped")
+DEFAULT_STATUS = "enrolled"  # Enrollment.status column default
+
+
+def _status_column(status: Optional[str]) -> Optional[str]:
+    status = status or DEFAULT_STATUS
+    return f"{status}_count" if status in STATUSES else None
+
+
+def _apply(db: Session, tenant_id: int, course_id: int, deltas: dict[str, int]) -> None:
+    """Add ``deltas`` to the course's counters in a single UPDATE (safe against concurrent writers)."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    now = datetime.utcnow()
+    stmt = (
+        update(CourseStats)
+        .where(CourseStats.course_id == course_id)
+        .values(updated_at=now, **{name: getattr(CourseStats, name) + delta for name, delta in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(stmt).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.add(CourseStats(tenant_id=tenant_id, course_id=course_id, updated_at=now, **deltas))
+    except IntegrityError:
+        # another request created the row first
+        db.execute(stmt)
+
+
+def record_review(db: Session, review: CourseReview) -> None:
+    """Count a newly added review; call in the same transaction that inserts it."""
+    deltas = {"review_count": 1}
+    if review.rating_overall is not None:
+        deltas.update(rating_sum=review.rating_overall, rating_count=1)
+    if review.rating_difficulty is not None:
+        deltas.update(difficulty_sum=review.rating_difficulty, difficulty_count=1)
+    _apply(db, review.tenant_id, review.course_id, deltas)
+
+
+def record_enrollment(
+    db: Session,
+    tenant_id: int,
+    course_id: int,
+    old_status: Optional[str],
+    new_status: Optional[str],
+    *,
+    created: bool = False,
+) -> None:
+    """Move one enrollment between status counters (``created`` for a new row, where ``old_status`` is ignored)."""
+    deltas: dict[str, int] = {}
+    if created:
+        deltas["enrollment_count"] = 1
+    else:
+        old_column = _status_column(old_status)
+        if old_column:
+            deltas[old_column] = -1
+    new_column = _status_column(new_status)
+    if new_column:
+        deltas[new_column] = deltas.get(new_column, 0) + 1
+    _apply(db, tenant_id, course_id, deltas)
+
+
+def rebuild_course_stats(db: Session, tenant_id: Optional[int] = None) -> int:
+    """Recompute the table from reviews/enrollments (one tenant or all); returns the row count."""
+    rows: dict[int, dict[str, int]] = {}
+
+    def row(course_id: int, tid: int) -> dict[str, int]:
+        return rows.setdefault(course_id, {"tenant_id": tid})
+
+    review_q = select(
+        CourseReview.course_id,
+        CourseReview.tenant_id,
+        func.count(CourseReview.id),
+        func.coalesce(func.sum(CourseReview.rating_overall), 0),
+        func.count(CourseReview.rating_overall),
+        func.coalesce(func.sum(CourseReview.rating_difficulty), 0),
+        func.count(CourseReview.rating_difficulty),
+    ).group_by(CourseReview.course_id, CourseReview.tenant_id)
+    status = func.coalesce(Enrollment.status, DEFAULT_STATUS)
+    enrollment_q = select(
+        Enrollment.course_id,
+        Enrollment.tenant_id,
+        func.count(Enrollment.id),
+        *(func.sum(case((status == name, 1), else_=0)) for name in STATUSES),
+    ).group_by(Enrollment.course_id, Enrollment.tenant_id)
+    if tenant_id is not None:
+        review_q = review_q.where(CourseReview.tenant_id == tenant_id)
+        enrollment_q = enrollment_q.where(Enrollment.tenant_id == tenant_id)
+
+    for course_id, tid, count, r_sum, r_count, d_sum, d_count in db.execute(review_q):
+        row(course_id, tid).update(
+            review_count=count,
+            rating_sum=int(r_sum),
+            rating_count=r_count,
+            difficulty_sum=int(d_sum),
+            difficulty_count=d_count,
+        )
+    for course_id, tid, count, *per_status in db.execute(enrollment_q):
+        values = row(course_id, tid)
+        values["enrollment_count"] = count
+        for name, value in zip(STATUSES, per_status):
+            values[f"{name}_count"] = int(value or 0)
+
+    clear = delete(CourseStats)
+    if tenant_id is not None:
+        clear = clear.where(CourseStats.tenant_id == tenant_id)
+    db.execute(clear)
+    now = datetime.utcnow()
+    db.add_all(CourseStats(course_id=course_id, updated_at=now, **values) for course_id, values in rows.items())
+    db.commit()
+    # Cached scoring features only pick up changed rows; rows this dropped would linger there
+    from .course_scoring import invalidate_course_features
+
+    invalidate_course_features(tenant_id)
+    return len(rows)
+
+
+def get_course_stats(db: Session, course_id: int) -> Optional[CourseStats]:
+    return db.get(CourseStats, course_id)
+
+
+def course_stats_map(
+    db: Session, tenant_id: int, course_ids: Optional[Iterable[int]] = None
+) -> dict[int, CourseStats]:
+    """course_id -> stats for the tenant (or just ``course_ids``); courses without activity are absent."""
+    query = select(CourseStats).where(CourseStats.tenant_id == tenant_id)
+    if course_ids is not None:
+        course_ids = list(course_ids)
+        if not course_ids:
+            return {}
+        query = query.where(CourseStats.course_id.in_(course_ids))
+    return {stats.course_id: stats for stats in db.execute(query).scalars()}
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from ..config import get_settings
+from .scheduler.worker import warmup
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def process_mode() -> bool:
+    return get_settings().optimize_execution == "process"
+
+
+def start_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Create the solver pool and force every worker to spawn and import the solvers now,
+    so the first optimize job does not pay process start-up + import cost."""
+    global _POOL
+    if not process_mode():
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            size = max(1, get_settings().optimize_processes)
+            # spawn: forking a process that already runs job/uvicorn threads is not safe
+            _POOL = ProcessPoolExecutor(
+                max_workers=size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warmup,
+            )
+            # ProcessPoolExecutor starts workers lazily; one task per slot brings them all up
+            for future in [_POOL.submit(warmup) for _ in range(size)]:
+                future.result()
+        return _POOL
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    pool = _POOL or start_process_pool()
+    if pool is None:
+        raise RuntimeError("OPTIMIZE_EXECUTION is not 'process'")
+    return pool
+
+
+def shutdown_process_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
@@ -8,6 +8,9 @@ from sqlalchemy.orm import Session
 
 from ..models import Course, DepartmentActivation, Enrollment, Student, Tenant
 from ..routers import import_dataset as import_router
+from .course_scoring import invalidate_course_features
+from .course_search import refresh_courses
+from .course_stats import record_enrollment
 from .fixed_dataset import get_fixed_rows
 
 
@@ -16,8 +19,11 @@ def ensure_fixed_dataset(db: Session, tenant: Tenant) -> None:
     if not rows:
         return
     normalized = [import_router._dict_to_str_row(row) for row in rows]  # type: ignore[attr-defined]
-    import_router._process_rows(db, tenant, normalized)  # type: ignore[attr-defined]
+    _, touched = import_router._process_rows(db, tenant, normalized)  # type: ignore[attr-defined]
     db.commit()
+    if touched:  # empty when the dataset was already imported unchanged
+        invalidate_course_features(tenant.id)
+        refresh_courses(db, tenant.id, touched)
     _ensure_department_activations(db, tenant, normalized)
     _ensure_sample_students(db, tenant)
     tenant.enrollment_open = True
@@ -90,5 +96,6 @@ def _ensure_sample_students(db: Session, tenant: Tenant) -> None:
                     term="2025-1",
                 )
                 db.add(enrollment)
+                record_enrollment(db, tenant.id, course.id, None, "enrolled", created=True)
             student_counter += 1
     db.commit()
@@ -1,10 +1,32 @@
 from __future__ import annotations
 
+import importlib
+import logging
+import os
+import socket
 import threading
 import time
 import uuid
-from dataclasses import dataclass
-from typing import Callable, Dict, Optional
+from collections import Counter, deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, Optional, Union
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..config import get_settings
+from ..db import SessionLocal
+from ..models import OptimizeJob
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = frozenset({"completed", "failed", "cancelled", "timed_out"})
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job target once the job was cancelled or ran past its timeout."""
 
 
 @dataclass
@@ -13,33 +35,561 @@ class Job:
     status: str
     score: Optional[float] = None
     explain: Optional[str] = None
+    metrics: Optional[dict[str, Any]] = None
+    tenant_id: Optional[int] = None
+    queue_position: Optional[int] = None  # 1-based while queued
+    timeout: Optional[float] = None
+    fingerprint: Optional[str] = None  # input hash for result reuse
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
 
 
 class InMemoryJobQueue:
-    def __init__(self) -> None:
+    """Bounded FIFO job runner.
+
+    A fixed pool of worker threads pulls jobs in submission order, skipping jobs whose tenant
+    already has ``per_tenant_limit`` jobs running (they keep their place in line). Targets are
+    called as ``target(job_id, params)`` and should call :meth:`check` between expensive
+    phases so cancellation and timeouts take effect. Finished jobs are evicted after
+    ``ttl_seconds``.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 2,
+        per_tenant_limit: int = 1,
+        job_timeout: float = 600.0,
+        ttl_seconds: float = 3600.0,
+    ) -> None:
+        self.max_workers = max(1, max_workers)
+        self.per_tenant_limit = max(1, per_tenant_limit)
+        self.job_timeout = job_timeout
+        self.ttl_seconds = ttl_seconds
+        self._cond = threading.Condition()
         self._jobs: Dict[str, Job] = {}
+        self._pending: Deque[str] = deque()
+        self._targets: Dict[str, tuple[Callable[[str, dict], None], dict]] = {}
+        self._results: Dict[str, dict] = {}
+        self._dedupe: Dict[str, str] = {}  # dedupe_key -> latest job created with it
+        self._running_by_tenant: Counter = Counter()
+        self._workers: list[threading.Thread] = []
+
+    def start(self) -> None:
+        with self._cond:
+            self._ensure_workers()
 
-    def create(self, target: Callable[[str], None]) -> Job:
+    def create(
+        self,
+        target: Callable[[str, dict], None],
+        params: Optional[dict] = None,
+        *,
+        tenant_id: Optional[int] = None,
+        timeout: Optional[float] = None,
+        fingerprint: Optional[str] = None,
+        dedupe_key: Optional[str] = None,
+    ) -> Job:
+        """Queue ``target``; with ``dedupe_key``, a queued/running job with the same key is returned instead."""
         job_id = str(uuid.uuid4())
-        job = Job(id=job_id, status="queued")
-        self._jobs[job_id] = job
+        job = Job(
+            id=job_id,
+            status="queued",
+            tenant_id=tenant_id,
+            timeout=timeout or self.job_timeout,
+            fingerprint=fingerprint,
+        )
+        with self._cond:
+            self._sweep()
+            if dedupe_key is not None:
+                active = self._dedupe.get(dedupe_key)
+                if active is not None and self._jobs[active].status in ACTIVE_STATUSES:
+                    return self._snapshot(self._jobs[active])
+                self._dedupe[dedupe_key] = job_id
+            self._jobs[job_id] = job
+            self._targets[job_id] = (target, params or {})
+            self._pending.append(job_id)
+            self._ensure_workers()
+            self._cond.notify_all()
+            return self._snapshot(job)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            self._sweep()
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job is not None else None
+
+    def update(
+        self,
+        job_id: str,
+        *,
+        status: Optional[str] = None,
+        score: Optional[float] = None,
+        explain: Optional[str] = None,
+        metrics: Optional[dict[str, Any]] = None,
+        fingerprint: Optional[str] = None,
+        result: Optional[dict] = None,
+    ) -> None:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            # Evicted, or already cancelled/timed out: late updates from the target are dropped
+            if job is None or job.status in TERMINAL_STATUSES:
+                return
+            if fingerprint is not None:
+                job.fingerprint = fingerprint
+            if result is not None:
+                self._results[job_id] = result
+            if status is not None:
+                job.status = status
+                if status in TERMINAL_STATUSES:
+                    job.finished_at = time.time()
+            if score is not None:
+                job.score = score
+            if explain is not None:
+                job.explain = explain
+            if metrics is not None:
+                job.metrics = metrics
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job immediately, or flag a running one for cooperative stop."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in TERMINAL_STATUSES:
+                return False
+            if job.status == "queued":
+                self._pending.remove(job_id)
+                self._targets.pop(job_id, None)
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            self._cond.notify_all()
+            return True
+
+    def find(self, fingerprint: str) -> Optional[Job]:
+        """In-flight job with this fingerprint if any, else the most recently finished completed one."""
+        with self._cond:
+            self._sweep()
+            matches = [j for j in self._jobs.values() if j.fingerprint == fingerprint]
+            for job in matches:
+                if job.status in ("queued", "running"):
+                    return self._snapshot(job)
+            done = [j for j in matches if j.status == "completed" and j.id in self._results]
+            if not done:
+                return None
+            return self._snapshot(max(done, key=lambda j: j.finished_at or 0.0))
+
+    def result(self, job_id: str) -> Optional[dict]:
+        with self._cond:
+            return self._results.get(job_id)
+
+    def check(self, job_id: str) -> None:
+        with self._cond:
+            self._sweep()
+            job = self._jobs.get(job_id)
+            if job is None or job.status in ("cancelled", "timed_out"):
+                raise JobCancelled(job_id)
+
+    def _snapshot(self, job: Job) -> Job:
+        position = None
+        if job.status == "queued":
+            position = self._pending.index(job.id) + 1
+        return replace(job, queue_position=position, metrics=dict(job.metrics) if job.metrics else job.metrics)
+
+    def _sweep(self) -> None:
+        # Caller holds the lock
+        now = time.time()
+        expired: list[str] = []
+        for job in self._jobs.values():
+            if job.status == "running" and job.timeout and job.started_at and now - job.started_at > job.timeout:
+                job.status = "timed_out"
+                job.finished_at = now
+                job.explain = f"Exceeded timeout of {job.timeout:.0f}s"
+            elif job.status in TERMINAL_STATUSES and job.finished_at and now - job.finished_at > self.ttl_seconds:
+                expired.append(job.id)
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._results.pop(job_id, None)
+        if expired:
+            self._dedupe = {key: job_id for key, job_id in self._dedupe.items() if job_id in self._jobs}
+
+    def _ensure_workers(self) -> None:
+        # Caller holds the lock
+        while len(self._workers) < self.max_workers:
+            t = threading.Thread(target=self._worker_loop, name=f"job-worker-{len(self._workers)}", daemon=True)
+            self._workers.append(t)
+            t.start()
+
+    def _next_runnable(self) -> Optional[str]:
+        for job_id in self._pending:
+            job = self._jobs[job_id]
+            # Jobs without an explicit tenant share one bucket (the default tenant)
+            if self._running_by_tenant[job.tenant_id] < self.per_tenant_limit:
+                return job_id
+        return None
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                job_id = self._next_runnable()
+                while job_id is None:
+                    self._cond.wait(timeout=1.0)
+                    self._sweep()
+                    job_id = self._next_runnable()
+                self._pending.remove(job_id)
+                target, params = self._targets.pop(job_id)
+                job = self._jobs[job_id]
+                job.status = "running"
+                job.started_at = time.time()
+                tenant_id = job.tenant_id
+                self._running_by_tenant[tenant_id] += 1
+            try:
+                target(job_id, params)
+            except JobCancelled:
+                pass
+            except Exception as exc:
+                self.update(job_id, status="failed", explain=f"{type(exc).__name__}: {exc}")
+            finally:
+                with self._cond:
+                    job = self._jobs.get(job_id)
+                    # Targets that return without a terminal status are treated as done
+                    if job is not None and job.status not in TERMINAL_STATUSES:
+                        job.status = "completed"
+                        job.finished_at = time.time()
+                    self._running_by_tenant[tenant_id] -= 1
+                    self._cond.notify_all()
+
+
+def _target_path(target: Callable[[str, dict], None]) -> str:
+    path = f"{target.__module__}:{target.__qualname__}"
+    if "<" in path:  # lambdas/closures cannot be re-imported by another process
+        raise ValueError(f"Job target must be a module-level function, got {path}")
+    return path
 
-        t = threading.Thread(target=target, args=(job_id,), daemon=True)
-        t.start()
+
+def _resolve_target(path: str) -> Callable[[str, dict], None]:
+    module_name, _, attr = path.partition(":")
+    obj: Any = importlib.import_module(module_name)
+    for part in attr.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    # Columns hold naive UTC (datetime.utcnow), like the rest of the schema
+    return value.replace(tzinfo=timezone.utc).timestamp() if value is not None else None
+
+
+class SqlJobQueue:
+    """Job store backed by the ``optimize_jobs`` table, shared by every process on the database.
+
+    Any uvicorn worker can answer ``get`` for any job, and each process runs ``max_workers``
+    threads that claim queued jobs with a conditional ``UPDATE ... WHERE status='queued'``
+    so a job runs exactly once. Targets are stored as ``module:function`` paths and must be
+    importable module-level functions. Queued jobs survive restarts; running jobs orphaned by
+    a dead process end as ``timed_out`` once their timeout passes. The per-tenant limit is
+    checked right before the claim, so it is exact within a process and best effort across them.
+
+    Reads (``get``/``find``/``result``) never write: timeouts and TTL eviction are applied by
+    a sweeper thread that :meth:`start` runs next to the workers.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 2,
+        per_tenant_limit: int = 1,
+        job_timeout: float = 600.0,
+        ttl_seconds: float = 3600.0,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.max_workers = max(1, max_workers)
+        self.per_tenant_limit = max(1, per_tenant_limit)
+        self.job_timeout = job_timeout
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = poll_interval
+        self.worker_name = f"{socket.gethostname()}:{os.getpid()}"[:64]
+        self._wakeup = threading.Condition()
+        self._workers: list[threading.Thread] = []
+        self._sweeper: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._wakeup:
+            while len(self._workers) < self.max_workers:
+                t = threading.Thread(target=self._worker_loop, name=f"job-worker-{len(self._workers)}", daemon=True)
+                self._workers.append(t)
+                t.start()
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name="job-sweeper", daemon=True)
+                self._sweeper.start()
+
+    def create(
+        self,
+        target: Callable[[str, dict], None],
+        params: Optional[dict] = None,
+        *,
+        tenant_id: Optional[int] = None,
+        timeout: Optional[float] = None,
+        fingerprint: Optional[str] = None,
+        dedupe_key: Optional[str] = None,
+    ) -> Job:
+        """Queue ``target``; with ``dedupe_key``, a queued/running job with the same key is returned instead.
+
+        The check is the unique partial index on ``dedupe_key``, so concurrent identical
+        submits from any process end up on one job.
+        """
+        path = _target_path(target)
+        with SessionLocal() as db:
+            while True:
+                row = OptimizeJob(
+                    fingerprint=fingerprint,
+                    dedupe_key=dedupe_key,
+                    id=str(uuid.uuid4()),
+                    tenant_id=tenant_id,
+                    status="queued",
+                    target=path,
+                    params=params or {},
+                    timeout=timeout or self.job_timeout,
+                    created_at=datetime.utcnow(),
+                )
+                db.add(row)
+                try:
+                    db.commit()
+                    break
+                except IntegrityError:
+                    db.rollback()
+                    if dedupe_key is None:
+                        raise
+                existing = db.execute(
+                    select(OptimizeJob).where(
+                        OptimizeJob.dedupe_key == dedupe_key, OptimizeJob.status.in_(ACTIVE_STATUSES)
+                    )
+                ).scalar_one_or_none()
+                if existing is not None:
+                    return self._to_job(db, existing)
+                # it finished between the conflict and the lookup: the key is free again
+            job = self._to_job(db, row)
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify()
         return job
 
     def get(self, job_id: str) -> Optional[Job]:
-        return self._jobs.get(job_id)
+        with SessionLocal() as db:
+            row = db.get(OptimizeJob, job_id)
+            return self._to_job(db, row) if row is not None else None
 
-    def update(self, job_id: str, *, status: Optional[str] = None, score: Optional[float] = None, explain: Optional[str] = None) -> None:
-        job = self._jobs[job_id]
+    def update(
+        self,
+        job_id: str,
+        *,
+        status: Optional[str] = None,
+        score: Optional[float] = None,
+        explain: Optional[str] = None,
+        metrics: Optional[dict[str, Any]] = None,
+        fingerprint: Optional[str] = None,
+        result: Optional[dict] = None,
+    ) -> None:
+        values: dict[str, Any] = {}
+        if fingerprint is not None:
+            values["fingerprint"] = fingerprint
+        if result is not None:
+            values["result"] = result
         if status is not None:
-            job.status = status
+            values["status"] = status
+            if status in TERMINAL_STATUSES:
+                values["finished_at"] = datetime.utcnow()
         if score is not None:
-            job.score = score
+            values["score"] = score
         if explain is not None:
-            job.explain = explain
+            values["explain"] = explain
+        if metrics is not None:
+            values["metrics"] = metrics
+        if not values:
+            return
+        with SessionLocal() as db:
+            # Already cancelled/timed out: late updates from the target are dropped
+            db.execute(
+                update(OptimizeJob)
+                .where(OptimizeJob.id == job_id, OptimizeJob.status.not_in(TERMINAL_STATUSES))
+                .values(**values)
+            )
+            db.commit()
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job immediately, or flag a running one for cooperative stop."""
+        with SessionLocal() as db:
+            result = db.execute(
+                update(OptimizeJob)
+                .where(OptimizeJob.id == job_id, OptimizeJob.status.in_(("queued", "running")))
+                .values(status="cancelled", finished_at=datetime.utcnow())
+            )
+            db.commit()
+            return result.rowcount == 1
+
+    def find(self, fingerprint: str) -> Optional[Job]:
+        """In-flight job with this fingerprint if any, else the most recently finished completed one."""
+        with SessionLocal() as db:
+            row = db.execute(
+                select(OptimizeJob)
+                .where(OptimizeJob.fingerprint == fingerprint, OptimizeJob.status.in_(("queued", "running")))
+                .order_by(OptimizeJob.created_at)
+                .limit(1)
+            ).scalar_one_or_none()
+            if row is None:
+                row = db.execute(
+                    select(OptimizeJob)
+                    .where(
+                        OptimizeJob.fingerprint == fingerprint,
+                        OptimizeJob.status == "completed",
+                        OptimizeJob.result.is_not(None),
+                    )
+                    .order_by(OptimizeJob.finished_at.desc())
+                    .limit(1)
+                ).scalar_one_or_none()
+            return self._to_job(db, row) if row is not None else None
+
+    def result(self, job_id: str) -> Optional[dict]:
+        with SessionLocal() as db:
+            return db.execute(select(OptimizeJob.result).where(OptimizeJob.id == job_id)).scalar_one_or_none()
+
+    def check(self, job_id: str) -> None:
+        with SessionLocal() as db:
+            row = db.execute(
+                select(OptimizeJob.status, OptimizeJob.started_at, OptimizeJob.timeout).where(OptimizeJob.id == job_id)
+            ).one_or_none()
+            if row is None or row.status in ("cancelled", "timed_out"):
+                raise JobCancelled(job_id)
+            # The job's own thread applies its timeout right away instead of waiting for the sweeper
+            if row.status == "running" and self._timed_out(db, job_id, row.started_at, row.timeout, datetime.utcnow()):
+                db.commit()
+                raise JobCancelled(job_id)
+
+    def _to_job(self, db, row: OptimizeJob) -> Job:
+        position = None
+        if row.status == "queued":
+            position = db.execute(
+                select(func.count())
+                .select_from(OptimizeJob)
+                .where(OptimizeJob.status == "queued", OptimizeJob.created_at < row.created_at)
+            ).scalar_one() + 1
+        return Job(
+            id=row.id,
+            status=row.status,
+            score=row.score,
+            explain=row.explain,
+            metrics=dict(row.metrics) if row.metrics else row.metrics,
+            tenant_id=row.tenant_id,
+            queue_position=position,
+            timeout=row.timeout,
+            fingerprint=row.fingerprint,
+            created_at=_epoch(row.created_at) or 0.0,
+            started_at=_epoch(row.started_at),
+            finished_at=_epoch(row.finished_at),
+        )
+
+    @staticmethod
+    def _timed_out(db, job_id: str, started_at: Optional[datetime], timeout: Optional[float], utcnow: datetime) -> bool:
+        """Mark a running job past its timeout as ``timed_out`` (caller commits)."""
+        if not (timeout and started_at and utcnow - started_at > timedelta(seconds=timeout)):
+            return False
+        db.execute(
+            update(OptimizeJob)
+            .where(OptimizeJob.id == job_id, OptimizeJob.status == "running")
+            .values(status="timed_out", finished_at=utcnow, explain=f"Exceeded timeout of {timeout:.0f}s")
+        )
+        return True
+
+    def _sweep(self) -> None:
+        utcnow = datetime.utcnow()
+        with SessionLocal() as db:
+            running = db.execute(
+                select(OptimizeJob.id, OptimizeJob.started_at, OptimizeJob.timeout).where(OptimizeJob.status == "running")
+            ).all()
+            for job_id, started_at, timeout in running:
+                self._timed_out(db, job_id, started_at, timeout, utcnow)
+            db.execute(
+                delete(OptimizeJob).where(
+                    OptimizeJob.status.in_(TERMINAL_STATUSES),
+                    OptimizeJob.finished_at < utcnow - timedelta(seconds=self.ttl_seconds),
+                )
+            )
+            db.commit()
+
+    def _claim_next(self) -> Optional[OptimizeJob]:
+        with SessionLocal() as db:
+            queued = db.execute(
+                select(OptimizeJob.id, OptimizeJob.tenant_id)
+                .where(OptimizeJob.status == "queued")
+                .order_by(OptimizeJob.created_at, OptimizeJob.id)
+                .limit(50)
+            ).all()
+            if not queued:
+                return None
+            running = Counter(
+                dict(
+                    db.execute(
+                        select(OptimizeJob.tenant_id, func.count())
+                        .where(OptimizeJob.status == "running")
+                        .group_by(OptimizeJob.tenant_id)
+                    ).all()
+                )
+            )
+            for job_id, tenant_id in queued:
+                # Jobs without an explicit tenant share one bucket (the default tenant)
+                if running[tenant_id] >= self.per_tenant_limit:
+                    continue
+                claimed = db.execute(
+                    update(OptimizeJob)
+                    .where(OptimizeJob.id == job_id, OptimizeJob.status == "queued")
+                    .values(status="running", started_at=datetime.utcnow(), worker=self.worker_name)
+                )
+                db.commit()
+                if claimed.rowcount == 1:
+                    row = db.get(OptimizeJob, job_id)
+                    db.expunge(row)
+                    return row
+                # Another process won the race for this one; try the next candidate
+            return None
+
+    def _sweep_loop(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self._sweep()
+            except Exception:
+                # database briefly unavailable/locked: the next pass retries
+                logger.exception("Job sweep failed")
+
+    def _worker_loop(self) -> None:
+        while True:
+            try:
+                row = self._claim_next()
+            except Exception:
+                row = None  # database briefly unavailable/locked: back off and retry
+            if row is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=self.poll_interval)
+                continue
+            try:
+                _resolve_target(row.target)(row.id, row.params or {})
+            except JobCancelled:
+                pass
+            except Exception as exc:
+                self.update(row.id, status="failed", explain=f"{type(exc).__name__}: {exc}")
+            # Targets that return without a terminal status are treated as done
+            self.update(row.id, status="completed")
+
 
+def _build_queue() -> Union[InMemoryJobQueue, SqlJobQueue]:
+    settings = get_settings()
+    kwargs = dict(
+        max_workers=settings.job_workers,
+        per_tenant_limit=settings.job_tenant_concurrency,
+        job_timeout=settings.job_timeout,
+        ttl_seconds=settings.job_ttl,
+    )
+    if settings.job_store == "memory":
+        return InMemoryJobQueue(**kwargs)
+    return SqlJobQueue(poll_interval=settings.job_poll_interval, **kwargs)
 
-queue = InMemoryJobQueue()
 
+queue = _build_queue()
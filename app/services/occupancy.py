@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models import Assignment, Blackout, Room, Tenant, Timeslot
+from .plans import plan_scope
+
+
+@dataclass
+class RoomInfo:
+    id: int
+    name: str
+    building: Optional[str]
+    capacity: int
+
+
+@dataclass
+class SlotInfo:
+    id: int
+    day: str
+    start: str
+    end: str
+    start_min: int = 0
+    end_min: int = 0
+
+
+DAY_MINUTES = 24 * 60
+_WEEKDAY_CODES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+# (starts, ends) of merged busy intervals in minutes since midnight, both sorted
+Intervals = tuple[list[int], list[int]]
+
+
+def to_minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def format_minutes(value: int) -> str:
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+def _merge(pairs: Iterable[tuple[int, int]]) -> Intervals:
+    starts: list[int] = []
+    ends: list[int] = []
+    for lo, hi in sorted(pairs):
+        if hi <= lo:
+            continue
+        if ends and lo <= ends[-1]:
+            ends[-1] = max(ends[-1], hi)
+        else:
+            starts.append(lo)
+            ends.append(hi)
+    return starts, ends
+
+
+def _covering_end(intervals: Intervals, t: int) -> Optional[int]:
+    """End of the busy interval containing minute ``t`` (None when ``t`` is free)."""
+    starts, ends = intervals
+    i = bisect_right(ends, t)
+    if i < len(starts) and starts[i] <= t:
+        return ends[i]
+    return None
+
+
+def _next_start(intervals: Intervals, t: int) -> int:
+    starts, _ = intervals
+    i = bisect_right(starts, t)
+    return starts[i] if i < len(starts) else DAY_MINUTES
+
+
+@dataclass
+class OccupancyMatrix:
+    """Room × timeslot occupancy for one tenant's active plan.
+
+    Each slot holds an integer bitmask over room indexes, and every building gets a
+    precomputed room mask, so "occupied rooms in building B at slot s" is one AND plus a
+    popcount. Built once per (plan, catalog) version.
+
+    A published matrix is never mutated: readers use it without locking (including the lazy
+    caches below, which only ever hold values derived from this exact state), and a publish
+    swaps in a patched copy (:meth:`patched`).
+    """
+
+    version: tuple
+    rooms: list[RoomInfo]
+    slots: list[SlotInfo]  # sorted by (day, start)
+    room_bit: dict[int, int]
+    slot_index: dict[int, int]
+    building_masks: dict[str, int]
+    all_rooms: int
+    occupied: list[int]
+    # (room_id, slot_id) -> assignment rows; several rows may share a cell
+    counts: Counter = field(default_factory=Counter)
+    built_at: float = field(default_factory=time.time)
+    # Blackout windows: room_id (None = every room) -> [(start, end)]
+    blackouts: dict[Optional[int], list[tuple[datetime, datetime]]] = field(default_factory=dict)
+    day_slots: dict[str, list[int]] = field(default_factory=dict)  # day -> slot indexes
+    # Lazily built per-room interval indexes; a patched copy drops the entries its delta touches
+    _weekly: dict[tuple[int, str], Intervals] = field(default_factory=dict)
+    _blackout_index: dict[tuple[int, date], Intervals] = field(default_factory=dict)
+    _capacity_masks: dict[int, int] = field(default_factory=dict)
+
+    def room_mask(self, building: Optional[str] = None, min_capacity: Optional[int] = None) -> int:
+        mask = self.building_masks.get(building, 0) if building else self.all_rooms
+        if min_capacity:
+            mask &= self.capacity_mask(min_capacity)
+        return mask
+
+    def capacity_mask(self, min_capacity: int) -> int:
+        cached = self._capacity_masks.get(min_capacity)
+        if cached is None:
+            cached = 0
+            for i, r in enumerate(self.rooms):
+                if r.capacity >= min_capacity:
+                    cached |= 1 << i
+            self._capacity_masks[min_capacity] = cached
+        return cached
+
+    def occupied_mask(self, slot_ids: Iterable[int]) -> int:
+        mask = 0
+        for slot_id in slot_ids:
+            i = self.slot_index.get(slot_id)
+            if i is not None:
+                mask |= self.occupied[i]
+        return mask
+
+    def rooms_in(self, mask: int) -> list[RoomInfo]:
+        out: list[RoomInfo] = []
+        while mask:
+            low = mask & -mask
+            out.append(self.rooms[low.bit_length() - 1])
+            mask ^= low
+        return out
+
+    def patched(self, version: tuple, removed: Iterable[tuple[int, int]], added: Iterable[tuple[int, int]]) -> "OccupancyMatrix":
+        """Copy of the matrix with (room_id, slot_id) cells that left / joined the plan.
+
+        Catalog data is shared; the occupancy rows, counts and interval caches are copied so
+        this matrix stays exactly as readers may still be using it.
+        """
+        copy = replace(
+            self,
+            version=version,
+            occupied=list(self.occupied),
+            counts=Counter(self.counts),
+            _weekly=dict(self._weekly),
+            _blackout_index=dict(self._blackout_index),
+            _capacity_masks=dict(self._capacity_masks),
+        )
+        copy._apply(removed, added)
+        return copy
+
+    def _apply(self, removed: Iterable[tuple[int, int]], added: Iterable[tuple[int, int]]) -> None:
+        # Only on a matrix nobody else sees yet (build, patched)
+        for room_id, slot_id in removed:
+            key = (room_id, slot_id)
+            if self.counts[key] <= 0:
+                continue
+            self.counts[key] -= 1
+            if self.counts[key] == 0:
+                del self.counts[key]
+                self._set(room_id, slot_id, False)
+        for room_id, slot_id in added:
+            key = (room_id, slot_id)
+            self.counts[key] += 1
+            if self.counts[key] == 1:
+                self._set(room_id, slot_id, True)
+
+    def weekly_intervals(self, room_id: int, day: str) -> Intervals:
+        """Merged busy intervals of a room on a weekday, from the active plan."""
+        key = (room_id, day)
+        cached = self._weekly.get(key)
+        if cached is None:
+            bit = 1 << self.room_bit[room_id]
+            cached = _merge(
+                (self.slots[i].start_min, self.slots[i].end_min)
+                for i in self.day_slots.get(day, [])
+                if self.occupied[i] & bit
+            )
+            self._weekly[key] = cached
+        return cached
+
+    def blackout_intervals(self, room_id: int, on: date) -> Intervals:
+        """Blackout minutes of a room on a calendar date (room-specific and tenant-wide rows)."""
+        key = (room_id, on)
+        cached = self._blackout_index.get(key)
+        if cached is None:
+            day_start = datetime.combine(on, datetime.min.time())
+            day_end = day_start + timedelta(days=1)
+            pairs = []
+            for owner in (room_id, None):
+                for lo, hi in self.blackouts.get(owner, []):
+                    if hi <= day_start or lo >= day_end:
+                        continue
+                    lo_min = 0 if lo <= day_start else int((lo - day_start).total_seconds() // 60)
+                    hi_min = DAY_MINUTES if hi >= day_end else -(-int((hi - day_start).total_seconds()) // 60)
+                    pairs.append((lo_min, hi_min))
+            cached = _merge(pairs)
+            self._blackout_index[key] = cached
+        return cached
+
+    def room_window(
+        self, room_id: int, day: str, start: int, end: int, on: Optional[date] = None
+    ) -> tuple[bool, Optional[tuple[int, int]]]:
+        """Is ``room_id`` free for [start, end) and which free window answers the request.
+
+        Each index lookup is a bisect, so a room costs O(log n). For a free room the window is
+        the maximal free stretch containing the request; for a busy one it is the first gap at
+        or after ``start`` long enough for the same duration (None if the day has none).
+        """
+        indexes = [self.weekly_intervals(room_id, day)]
+        if on is not None:
+            indexes.append(self.blackout_intervals(room_id, on))
+        lo, hi = 0, DAY_MINUTES
+        for starts, ends in indexes:
+            # First interval ending after ``start``; merged, so it is the only one that can overlap
+            i = bisect_right(ends, start)
+            if i < len(starts):
+                if starts[i] < end:
+                    break
+                hi = min(hi, starts[i])
+            if i:
+                lo = max(lo, ends[i - 1])
+        else:
+            return True, (lo, hi)
+        duration = end - start
+        t = start
+        while t + duration <= DAY_MINUTES:
+            covered = [e for e in (_covering_end(ix, t) for ix in indexes) if e is not None]
+            if covered:
+                t = max(covered)
+                continue
+            gap_end = min(_next_start(ix, t) for ix in indexes)
+            if gap_end - t >= duration:
+                return False, (t, gap_end)
+            t = gap_end
+        return False, None
+
+    def _set(self, room_id: int, slot_id: int, value: bool) -> None:
+        bit = self.room_bit.get(room_id)
+        i = self.slot_index.get(slot_id)
+        if bit is None or i is None:
+            return
+        self._weekly.pop((room_id, self.slots[i].day), None)
+        if value:
+            self.occupied[i] |= 1 << bit
+        else:
+            self.occupied[i] &= ~(1 << bit)
+
+
+# tenant_id -> matrix
+_MATRICES: dict[int, OccupancyMatrix] = {}
+_MATRIX_LOCK = threading.Lock()
+
+
+def _catalog_version(db: Session, tenant: Tenant) -> tuple:
+    # Room/timeslot/blackout edits that keep ids are caught by VACANCY_CACHE_TTL instead
+    room_count, room_max = db.execute(
+        select(func.count(Room.id), func.max(Room.id)).where(Room.tenant_id == tenant.id)
+    ).one()
+    slot_count, slot_max = db.execute(
+        select(func.count(Timeslot.id), func.max(Timeslot.id)).where(Timeslot.tenant_id == tenant.id)
+    ).one()
+    blackout_count, blackout_max = db.execute(
+        select(func.count(Blackout.id), func.max(Blackout.id)).where(Blackout.tenant_id == tenant.id)
+    ).one()
+    return (tenant.active_plan_id, room_count, room_max, slot_count, slot_max, blackout_count, blackout_max)
+
+
+def _build(db: Session, tenant: Tenant, version: tuple) -> OccupancyMatrix:
+    rooms = [
+        RoomInfo(id=r.id, name=r.name, building=r.building, capacity=r.capacity or 0)
+        for r in db.execute(
+            select(Room.id, Room.name, Room.building, Room.capacity).where(Room.tenant_id == tenant.id)
+        )
+    ]
+    # Bit order = listing order of /available (building, then room name)
+    rooms.sort(key=lambda r: (r.building or "", r.name or ""))
+    slots = [
+        SlotInfo(id=s.id, day=s.day, start=s.start, end=s.end, start_min=to_minutes(s.start), end_min=to_minutes(s.end))
+        for s in db.execute(
+            select(Timeslot.id, Timeslot.day, Timeslot.start, Timeslot.end).where(Timeslot.tenant_id == tenant.id)
+        )
+    ]
+    slots.sort(key=lambda s: (s.day, s.start))
+    room_bit = {r.id: i for i, r in enumerate(rooms)}
+    building_masks: dict[str, int] = {}
+    for i, r in enumerate(rooms):
+        if r.building:
+            building_masks[r.building] = building_masks.get(r.building, 0) | (1 << i)
+    matrix = OccupancyMatrix(
+        version=version,
+        rooms=rooms,
+        slots=slots,
+        room_bit=room_bit,
+        slot_index={s.id: i for i, s in enumerate(slots)},
+        building_masks=building_masks,
+        all_rooms=(1 << len(rooms)) - 1,
+        occupied=[0] * len(slots),
+    )
+    for i, slot in enumerate(slots):
+        matrix.day_slots.setdefault(slot.day, []).append(i)
+    blackouts: dict[Optional[int], list[tuple[datetime, datetime]]] = defaultdict(list)
+    for room_id, lo, hi in db.execute(
+        select(Blackout.room_id, Blackout.start, Blackout.end).where(Blackout.tenant_id == tenant.id)
+    ):
+        blackouts[room_id].append((lo, hi))
+    matrix.blackouts = dict(blackouts)
+    cells = db.execute(
+        select(Assignment.room_id, Assignment.timeslot_id).where(
+            plan_scope(tenant), Assignment.room_id.isnot(None), Assignment.timeslot_id.isnot(None)
+        )
+    ).all()
+    matrix._apply((), [(room_id, slot_id) for room_id, slot_id in cells])
+    return matrix
+
+
+def get_occupancy(db: Session, tenant: Tenant) -> OccupancyMatrix:
+    """Cached matrix for the tenant's active plan; rebuilt when the plan or catalog changes."""
+    version = _catalog_version(db, tenant)
+    ttl = get_settings().vacancy_cache_ttl
+    with _MATRIX_LOCK:
+        matrix = _MATRICES.get(tenant.id)
+        if matrix is not None and matrix.version == version and time.time() - matrix.built_at < ttl:
+            return matrix
+    matrix = _build(db, tenant, version)
+    with _MATRIX_LOCK:
+        _MATRICES[tenant.id] = matrix
+    return matrix
+
+
+def apply_plan_delta(
+    tenant_id: int,
+    old_plan_id: Optional[int],
+    new_plan_id: Optional[int],
+    removed: Iterable[tuple[int, int]],
+    added: Iterable[tuple[int, int]],
+) -> None:
+    """Carry a cached matrix across a publish instead of rebuilding it.
+
+    Only applies when the cache holds exactly ``old_plan_id``; otherwise the next read
+    rebuilds from the database. The patched copy replaces the cached one (copy-on-write).
+    """
+    with _MATRIX_LOCK:
+        matrix = _MATRICES.get(tenant_id)
+        if matrix is None or matrix.version[0] != old_plan_id:
+            return
+        _MATRICES[tenant_id] = matrix.patched((new_plan_id, *matrix.version[1:]), removed, added)
+
+
+def weekday_code(on: date) -> str:
+    return _WEEKDAY_CODES[on.weekday()]
+
+
+def invalidate_occupancy(tenant_id: int) -> None:
+    with _MATRIX_LOCK:
+        _MATRICES.pop(tenant_id, None)
@@ -1,16 +1,28 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from typing import Literal, Optional
 
 from sqlalchemy import select
 
-from .jobs import queue
+from .jobs import Job, JobCancelled, queue
+from ..config import get_settings
 from ..db import SessionLocal
-from ..models import Tenant, Room, Timeslot, Course
-from .scheduler.greedy import warm_start_greedy, persist_assignments
-from .scheduler.pulp_solver import is_available as pulp_available, solve_with_pulp
-from .scheduler.ortools_solver import is_available as ort_available, solve_with_ortools
+from ..models import Assignment, Tenant, Room, Timeslot, Course
+from .executor import get_process_pool, process_mode
+from .plans import plan_scope
+from .scheduler.fingerprint import (
+    assignment_rows,
+    decode_assignments,
+    encode_assignments,
+    input_fingerprint,
+    plan_signature,
+)
+from .scheduler.greedy import load_lite, persist_assignments
+from .scheduler.worker import solve_snapshot
 
 
 def submit_optimize_job(
@@ -20,62 +32,226 @@ def submit_optimize_job(
     solver: Literal["greedy", "pulp", "ortools"] = "greedy",
     slot_group: int = 1,
     forbid_checks: bool = True,
+    time_limit: Optional[float] = None,
     tenant_id: Optional[int] = None,
 ) -> str:
-    def _worker(job_id: str) -> None:
-        queue.update(job_id, status="running")
-        started = time.time()
-        try:
-            # Use default tenant (first enabled) for MVP
-            with SessionLocal() as db:
-                if tenant_id is not None:
-                    tenant = db.get(Tenant, tenant_id)
-                else:
-                    tenant = db.execute(select(Tenant).where(Tenant.enabled == True)).scalars().first()  # noqa: E712
-                if tenant is None:
-                    tenant = Tenant(name="demo", enabled=True, locale="ko", timezone="Asia/Seoul")
-                    db.add(tenant)
-                    db.commit()
-                    db.refresh(tenant)
-
-                _ensure_seed_data(db, tenant)
-
-                # Branch by solver
-                used_solver = solver
-                result = None
-
-                if solver == "pulp" and pulp_available():
-                    result = solve_with_pulp()
-                    # If not implemented, fall back
-                    if result is None:
-                        used_solver = "greedy"
-
-                if solver == "ortools" and ort_available():
-                    result = solve_with_ortools()
-                    if result is None:
-                        used_solver = "greedy"
-
-                if result is None:  # greedy fallback or explicit
-                    assignments, stats = warm_start_greedy(db, tenant.id, group_size=slot_group, use_forbidden=forbid_checks)
-                    # If nothing assigned because of strict forbidden-set, retry ignoring forbidden to surface a plan
-                    if stats.get("assigned_courses", 0) == 0 and forbid_checks:
-                        assignments, stats = warm_start_greedy(db, tenant.id, group_size=slot_group, use_forbidden=False)
-                        used_solver = f"{used_solver}+relaxed"
-                    persist_assignments(db, tenant.id, assignments)
-                    score = _score_from_stats(stats)
-                    elapsed = time.time() - started
-                    explain = (
-                        f"{used_solver} scheduled {stats['assigned_courses']}/{stats['total_courses']} courses "
-                        f"into {stats['assignment_count']} blocks in {elapsed:.2f}s (policy v{policy_version}, week {week})."
+    """Queue an optimize job, or return the queued/running one submitted with the same parameters.
+
+    Nothing is loaded here: the job fingerprints the tenant's inputs itself and reuses the
+    cached plan of a completed job with identical inputs instead of solving again.
+    """
+    params = {
+        "policy_version": policy_version,
+        "week": week,
+        "solver": solver,
+        "slot_group": slot_group,
+        "forbid_checks": forbid_checks,
+        "time_limit": time_limit,
+        "tenant_id": tenant_id,
+    }
+    job = queue.create(run_optimize_job, params, tenant_id=tenant_id, dedupe_key=_request_key(params))
+    return job.id
+
+
+def run_optimize_job(job_id: str, params: dict) -> None:
+    settings = get_settings()
+    policy_version = params["policy_version"]
+    week = params["week"]
+    solver = params.get("solver") or "greedy"
+    slot_group = params.get("slot_group") or 1
+    forbid_checks = params.get("forbid_checks", True)
+    time_limit = params.get("time_limit")
+    tenant_id = params.get("tenant_id")
+
+    started = time.time()
+    try:
+        with SessionLocal() as db:
+            tenant = _find_tenant(db, tenant_id)
+            if tenant is None:
+                tenant = Tenant(name="demo", enabled=True, locale="ko", timezone="Asia/Seoul")
+                db.add(tenant)
+                db.commit()
+                db.refresh(tenant)
+
+            _ensure_seed_data(db, tenant)
+
+            courses, rooms, slots = load_lite(db, tenant.id)
+            fingerprint = _input_fingerprint(courses, rooms, slots, tenant.id, params)
+            queue.check(job_id)
+            source = queue.find(fingerprint)
+            cached = queue.result(source.id) if source is not None and source.status == "completed" else None
+            if cached is not None:
+                _reuse_cached(job_id, db, tenant, source, cached, started)
+                return
+            solve_kwargs = dict(
+                solver=solver,
+                group_size=slot_group,
+                use_forbidden=forbid_checks,
+                seed=tenant.id,
+                time_limit=_solve_budget(job_id, time_limit or settings.solver_time_limit),
+                num_workers=settings.solver_workers,
+                max_rooms_per_course=settings.solver_max_rooms_per_course,
+            )
+            if process_mode():
+                # Solve off the API process: only the lite snapshot goes out, only assignments come back
+                future = get_process_pool().submit(solve_snapshot, courses, rooms, slots, **solve_kwargs)
+                solved = _wait_for_solve(job_id, future)
+            else:
+                solved = solve_snapshot(courses, rooms, slots, checkpoint=lambda: queue.check(job_id), **solve_kwargs)
+            used_solver = solved["used_solver"]
+            assignments, stats, result = solved["assignments"], solved["stats"], solved["result"]
+            if result is None:
+                metrics = {"solver": used_solver, **stats}
+                if solver != "greedy":
+                    metrics["fallback_from"] = solver
+            else:
+                metrics = {"solver": used_solver, **stats, **result}
+            metrics["execution"] = "process" if process_mode() else "thread"
+            # Last cooperative checkpoint: a cancelled or timed-out job must not overwrite the plan
+            queue.check(job_id)
+            persisted = persist_assignments(db, tenant.id, assignments, job_id=job_id)
+            score = _score_from_stats(stats)
+            elapsed = time.time() - started
+            explain = (
+                f"{used_solver} scheduled {stats['assigned_courses']}/{stats['total_courses']} courses "
+                f"into {stats['assignment_count']} blocks in {elapsed:.2f}s (policy v{policy_version}, week {week})."
+            )
+            if result is not None:
+                explain += f" Solution {result['solver_status']}"
+                if "gap" in result:
+                    explain += f", objective gap {result['gap'] * 100:.2f}%"
+                if result.get("pruned_rooms"):
+                    explain += (
+                        f", {result['pruned_rooms']} room candidates pruned "
+                        f"(SOLVER_MAX_ROOMS_PER_COURSE={settings.solver_max_rooms_per_course})"
                     )
-                    queue.update(job_id, status="completed", score=score, explain=explain)
-                    return
-        except Exception as exc:
-            queue.update(job_id, status="failed", explain=f"{type(exc).__name__}: {exc}")
+                explain += (
+                    f". Model {result['variables']} vars"
+                    + (f" / {result['constraints']} constraints" if "constraints" in result else "")
+                    + f", built in {result['build_seconds']:.2f}s, solved in {result['solve_seconds']:.2f}s."
+                )
+            metrics["elapsed_seconds"] = round(elapsed, 3)
+            metrics["persisted"] = persisted
+            metrics["fingerprint"] = fingerprint
+            cached = {
+                "assignments": encode_assignments(assignments),
+                "plan_signature": plan_signature(assignment_rows(assignments)),
+            }
+            queue.update(
+                job_id,
+                status="completed",
+                score=score,
+                explain=explain,
+                metrics=metrics,
+                fingerprint=fingerprint,
+                result=cached,
+            )
             return
+    except JobCancelled:
+        raise
+    except Exception as exc:
+        queue.update(job_id, status="failed", explain=f"{type(exc).__name__}: {exc}")
+        return
 
-    job = queue.create(_worker)
-    return job.id
+
+def _reuse_cached(job_id: str, db, tenant: Tenant, source: Job, cached: dict, started: float) -> None:
+    """Finish ``job_id`` with the plan of ``source`` (identical inputs), re-persisting it if needed."""
+    replayed = cached.get("plan_signature") != _persisted_signature(db, tenant)
+    persisted = None
+    if replayed:
+        persisted = persist_assignments(
+            db, tenant.id, decode_assignments(cached["assignments"]), job_id=job_id, source="replay"
+        )
+    elapsed = time.time() - started
+    metrics = {
+        **(source.metrics or {}),
+        "cached_from": source.id,
+        "replayed": replayed,
+        "persisted": persisted,
+        "elapsed_seconds": round(elapsed, 3),
+    }
+    explain = (
+        f"Reused job {source.id} (identical inputs); "
+        + ("re-persisted its plan" if replayed else "plan already persisted")
+        + f" in {elapsed:.2f}s. {source.explain or ''}"
+    ).strip()
+    queue.update(
+        job_id,
+        status="completed",
+        score=source.score,
+        explain=explain,
+        metrics=metrics,
+        fingerprint=source.fingerprint,
+        result=cached,
+    )
+
+
+def _solve_budget(job_id: str, time_limit: float) -> float:
+    """Solver time limit capped by what is left of the job's timeout."""
+    job = queue.get(job_id)
+    if job is None or not job.timeout or job.started_at is None:
+        return time_limit
+    remaining = job.timeout - (time.time() - job.started_at)
+    if remaining <= 0:
+        queue.check(job_id)  # marks it timed out and raises
+    return max(0.1, min(time_limit, remaining))
+
+
+def _wait_for_solve(job_id: str, future: Future) -> dict:
+    # The pool worker cannot reach this process's queue, so cancellation/timeouts are
+    # checked here; the solve itself ends by its (budget-capped) time limit.
+    while True:
+        try:
+            return future.result(timeout=get_settings().job_poll_interval)
+        except FutureTimeout:
+            try:
+                queue.check(job_id)
+            except JobCancelled:
+                future.cancel()
+                raise
+
+
+def _find_tenant(db, tenant_id: Optional[int]) -> Optional[Tenant]:
+    # Use default tenant (first enabled) for MVP
+    if tenant_id is not None:
+        return db.get(Tenant, tenant_id)
+    return db.execute(select(Tenant).where(Tenant.enabled == True)).scalars().first()  # noqa: E712
+
+
+def _request_key(params: dict) -> str:
+    """Identity of a submit (tenant + solver parameters), without reading the catalog."""
+    key = _solve_key(params.get("tenant_id"), params)
+    return "optimize:" + hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _input_fingerprint(courses, rooms, slots, tenant_id: int, params: dict) -> str:
+    return input_fingerprint(courses, rooms, slots, _solve_key(tenant_id, params))
+
+
+def _solve_key(tenant_id: Optional[int], params: dict) -> dict:
+    settings = get_settings()
+    solver = params.get("solver") or "greedy"
+    key = {
+        "tenant_id": tenant_id,
+        "policy_version": params["policy_version"],
+        "week": params["week"],
+        "solver": solver,
+        "slot_group": params.get("slot_group") or 1,
+        "forbid_checks": params.get("forbid_checks", True),
+    }
+    if solver in ("pulp", "ortools"):
+        key["time_limit"] = params.get("time_limit") or settings.solver_time_limit
+        key["max_rooms_per_course"] = settings.solver_max_rooms_per_course
+    return key
+
+
+def _persisted_signature(db, tenant: Tenant) -> str:
+    rows = db.execute(
+        select(Assignment.course_id, Assignment.room_id, Assignment.timeslot_id).where(
+            plan_scope(tenant), Assignment.status == "auto"
+        )
+    ).all()
+    return plan_signature(tuple(r) for r in rows)
 
 
 def _score_from_stats(stats: dict) -> float:
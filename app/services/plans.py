@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import and_, delete, exists, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models import Assignment, Plan, Tenant
+from .scheduler.types import AssignmentLite
+
+_CHUNK = 500  # stay under SQLite's bound-parameter limit
+_STALE_STAGING = timedelta(hours=1)
+
+
+def plan_members(plan_id):
+    """Rows belonging to plan ``plan_id`` (a value or a scalar subquery).
+
+    A row is written once, by the plan that introduced it (``plan_id``), and stays in every
+    later plan until one retires it (``retired_plan_id``, exclusive), so plan versions share
+    their unchanged rows.
+    """
+    return and_(
+        Assignment.plan_id <= plan_id,
+        or_(Assignment.retired_plan_id.is_(None), Assignment.retired_plan_id > plan_id),
+    )
+
+
+def plan_scope(tenant: Tenant):
+    """Filter clause selecting the tenant's active plan (legacy NULL-plan rows before the first publish)."""
+    if tenant.active_plan_id is not None:
+        return and_(Assignment.tenant_id == tenant.id, plan_members(tenant.active_plan_id))
+    return and_(Assignment.tenant_id == tenant.id, Assignment.plan_id.is_(None))
+
+
+def active_assignments_clause():
+    """Tenant-agnostic variant of :func:`plan_scope` for queries spanning tenants."""
+    active = select(Tenant.active_plan_id).where(Tenant.id == Assignment.tenant_id).correlate(Assignment).scalar_subquery()
+    return or_(plan_members(active), and_(Assignment.plan_id.is_(None), active.is_(None)))
+
+
+def publish_plan(
+    db: Session,
+    tenant_id: int,
+    assignments: list[AssignmentLite],
+    *,
+    job_id: Optional[str] = None,
+    source: str = "optimize",
+) -> dict[str, Any]:
+    """Publish ``assignments`` as a new plan version and make it the active one.
+
+    Only the diff against the active plan is written: new rows are inserted with the new
+    plan id, and dropped rows get it as ``retired_plan_id``. Unchanged rows and
+    ``locked``/``edited`` rows stay as they are and simply remain members. The writes and the
+    flip of ``tenants.active_plan_id`` commit together, so readers see either plan whole.
+    When the auto rows would not change, nothing is written and the current plan stays
+    active. The plan's utilization rollup is computed from the in-memory rows before the flip.
+    """
+    tenant = db.get(Tenant, tenant_id)
+    if tenant is None:
+        raise ValueError(f"Tenant {tenant_id} not found")
+    _adopt_legacy_rows(db, tenant)
+    current_id = tenant.active_plan_id
+
+    kept: list[dict] = []  # rows of the current plan that stay
+    existing: dict[tuple, list[dict]] = defaultdict(list)
+    if current_id is not None:
+        for row in db.execute(
+            select(
+                Assignment.id,
+                Assignment.course_id,
+                Assignment.room_id,
+                Assignment.timeslot_id,
+                Assignment.status,
+                Assignment.reason,
+                Assignment.version,
+                Assignment.retired_plan_id,
+            ).where(Assignment.tenant_id == tenant_id, plan_members(current_id))
+        ).mappings():
+            if row["status"] == "auto":
+                existing[(row["course_id"], row["room_id"], row["timeslot_id"])].append(dict(row))
+            else:
+                kept.append(dict(row))
+
+    added: list[dict] = []
+    unchanged = 0
+    for a in assignments:
+        # Store every timeslot in the block so 공실/중복 검증이 정확해진다.
+        slot_ids = a.slot_ids or [None]
+        for idx, slot_id in enumerate(slot_ids, start=1):
+            previous = existing.get((a.course_id, a.room_id, slot_id))
+            if previous:
+                kept.append(previous.pop())
+                unchanged += 1
+                continue
+            added.append(
+                {
+                    "course_id": a.course_id,
+                    "room_id": a.room_id,
+                    "timeslot_id": slot_id,
+                    "status": "auto",
+                    "reason": f"warm_start_greedy_block{idx}",
+                    "version": 1,
+                }
+            )
+    removed = [row for left in existing.values() for row in left]
+    summary = {"inserted": len(added), "deleted": len(removed), "unchanged": unchanged}
+    if current_id is not None and not added and not removed:
+        return {"plan_id": current_id, "previous_plan_id": current_id, "published": False, **summary}
+
+    plan = Plan(tenant_id=tenant_id, status="staging", source=source, job_id=job_id)
+    db.add(plan)
+    db.flush()
+    retire = [row["id"] for row in removed if row["retired_plan_id"] is None]
+    copies: list[dict] = []
+    if current_id is not None:
+        # After a rollback the active plan is not the newest one: rows that later plans added
+        # leave, and rows they retired come back as copies (ranges cannot have holes)
+        retire += db.execute(
+            select(Assignment.id).where(
+                Assignment.tenant_id == tenant_id,
+                Assignment.plan_id > current_id,
+                Assignment.retired_plan_id.is_(None),
+            )
+        ).scalars().all()
+        copies = [
+            {key: value for key, value in row.items() if key not in ("id", "retired_plan_id")}
+            for row in kept
+            if row["retired_plan_id"] is not None
+        ]
+    for start in range(0, len(retire), _CHUNK):
+        db.execute(
+            update(Assignment)
+            .where(Assignment.id.in_(retire[start : start + _CHUNK]))
+            .values(retired_plan_id=plan.id)
+            .execution_options(synchronize_session=False)
+        )
+    inserts = added + copies
+    for row in inserts:
+        row["tenant_id"] = tenant_id
+        row["plan_id"] = plan.id
+    for start in range(0, len(inserts), _CHUNK):
+        db.execute(insert(Assignment), inserts[start : start + _CHUNK])
+    plan.assignment_count = len(kept) + len(added)
+    # Local import: utilization reads plans through plan_scope
+    from .utilization import build_rollup
+
+    plan.rollup = build_rollup(db, tenant_id, ((row["room_id"], row["timeslot_id"]) for row in kept + added))
+    _flip(db, tenant, plan)
+    # Local import: the occupancy cache reads plans through plan_scope
+    from .occupancy import apply_plan_delta
+    from .vacancy_stream import notify_plan_change
+
+    apply_plan_delta(
+        tenant_id,
+        current_id,
+        plan.id,
+        [(row["room_id"], row["timeslot_id"]) for row in removed if row["room_id"] and row["timeslot_id"]],
+        [(row["room_id"], row["timeslot_id"]) for row in added if row["room_id"] and row["timeslot_id"]],
+    )
+    notify_plan_change(tenant_id)
+    prune_plans(db, tenant_id)
+    return {"plan_id": plan.id, "previous_plan_id": current_id, "published": True, "copied": len(copies), **summary}
+
+
+def activate_plan(db: Session, tenant: Tenant, plan_id: int) -> Plan:
+    """Point the tenant back (or forward) at a kept plan — rollback without re-solving."""
+    plan = db.get(Plan, plan_id)
+    if plan is None or plan.tenant_id != tenant.id or plan.status == "staging":
+        raise LookupError(f"Plan {plan_id} not found")
+    if tenant.active_plan_id != plan.id:
+        from .occupancy import invalidate_occupancy
+        from .vacancy_stream import notify_plan_change
+
+        _flip(db, tenant, plan)
+        invalidate_occupancy(tenant.id)
+        notify_plan_change(tenant.id)
+    return plan
+
+
+def list_plans(db: Session, tenant_id: int) -> list[Plan]:
+    return (
+        db.execute(
+            select(Plan).where(Plan.tenant_id == tenant_id, Plan.status != "staging").order_by(Plan.id.desc())
+        )
+        .scalars()
+        .all()
+    )
+
+
+def prune_plans(db: Session, tenant_id: int, keep: Optional[int] = None) -> int:
+    """Drop all but the newest ``keep`` plans (PLAN_HISTORY) plus abandoned staging plans.
+
+    Rows go once no remaining plan falls inside their [plan_id, retired_plan_id) range.
+    """
+    keep = max(1, keep if keep is not None else get_settings().plan_history)
+    tenant = db.get(Tenant, tenant_id)
+    plans = db.execute(
+        select(Plan.id, Plan.status, Plan.created_at).where(Plan.tenant_id == tenant_id).order_by(Plan.id.desc())
+    ).all()
+    cutoff = datetime.utcnow() - _STALE_STAGING
+    kept = 0
+    doomed: list[int] = []
+    for plan_id, status, created_at in plans:
+        if tenant is not None and plan_id == tenant.active_plan_id:
+            kept += 1
+            continue
+        if status == "staging":
+            if created_at < cutoff:
+                doomed.append(plan_id)
+            continue
+        if kept < keep:
+            kept += 1
+        else:
+            doomed.append(plan_id)
+    for start in range(0, len(doomed), _CHUNK):
+        db.execute(delete(Plan).where(Plan.id.in_(doomed[start : start + _CHUNK])))
+    if doomed:
+        db.execute(
+            delete(Assignment)
+            .where(
+                Assignment.tenant_id == tenant_id,
+                Assignment.retired_plan_id.is_not(None),
+                ~exists().where(
+                    Plan.tenant_id == tenant_id,
+                    Plan.id >= Assignment.plan_id,
+                    Plan.id < Assignment.retired_plan_id,
+                ),
+            )
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return len(doomed)
+
+
+def _flip(db: Session, tenant: Tenant, plan: Plan) -> None:
+    db.execute(
+        update(Plan)
+        .where(Plan.tenant_id == tenant.id, Plan.status == "published", Plan.id != plan.id)
+        .values(status="archived")
+    )
+    plan.status = "published"
+    plan.published_at = datetime.utcnow()
+    tenant.active_plan_id = plan.id
+    db.commit()
+
+
+def _adopt_legacy_rows(db: Session, tenant: Tenant) -> None:
+    # Rows written before plans existed become plan #1 so they can be diffed and rolled back to
+    if tenant.active_plan_id is not None:
+        return
+    count = db.query(Assignment.id).filter(Assignment.tenant_id == tenant.id, Assignment.plan_id.is_(None)).count()
+    if count == 0:
+        return
+    legacy = Plan(
+        tenant_id=tenant.id,
+        status="published",
+        source="legacy",
+        assignment_count=count,
+        published_at=datetime.utcnow(),
+    )
+    db.add(legacy)
+    db.flush()
+    db.execute(
+        update(Assignment)
+        .where(Assignment.tenant_id == tenant.id, Assignment.plan_id.is_(None))
+        .values(plan_id=legacy.id)
+    )
+    from .utilization import build_rollup
+
+    legacy.rollup = build_rollup(
+        db,
+        tenant.id,
+        db.execute(
+            select(Assignment.room_id, Assignment.timeslot_id).where(
+                Assignment.tenant_id == tenant.id, Assignment.plan_id == legacy.id
+            )
+        ).all(),
+    )
+    tenant.active_plan_id = legacy.id
+    db.commit()
@@ -1,161 +1,110 @@
 from __future__ import annotations
 
-from typing import List, Optional, Dict, Any
+import re
+from typing import List, Optional
 
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from ..models import Course, CourseReview, Enrollment, Student
+from ..models import Enrollment, Student
 from ..schemas import CourseInsight, CourseRecommendation
+from .co_enrollment import co_enrollment_scores
+from .course_scoring import CourseFeatures, ScoredCourse, get_course_features, score_courses
 
 
-def _personalization_boost(student: Student, course: Course, recent_requests: Dict[int, int]) -> float:
-    """Simple personalization heuristics:
-    - Major match +0.8 (existing)
-    - Recent popularity boost from recent_requests (normalized)
-    - If student has preferences in profile, consider them (placeholder)
-    """
-    boost = 0.0
-    try:
-        if student.major and course.cohort and student.major.lower() in (course.cohort or '').lower():
-            boost += 0.8
-        # recent_requests is a map course_id->count
-        if recent_requests and course.id in recent_requests:
-            # normalize by arbitrary scale (recent count / 10)
-            boost += min(0.5, recent_requests.get(course.id, 0) / 10.0)
-        # profile preferences: example keys: preferred_tags: list[str]
-        prefs: Dict[str, Any] = getattr(student, 'profile', {}) or {}
-        tags = prefs.get('preferred_tags') if isinstance(prefs, dict) else None
-        if tags and isinstance(tags, list) and getattr(course, 'tags', None):
-            # small boost for tag overlap
-            overlap = len(set(tags).intersection(set(getattr(course, 'tags', []))))
-            boost += 0.1 * min(overlap, 3)
-    except Exception:
-        # never fail personalization
-        pass
-    return boost
+def _build_recommendations(features: CourseFeatures, picks: list[ScoredCourse], reason_for) -> list[CourseRecommendation]:
+    """Pydantic objects for the top-k picks only."""
+    recommendations: list[CourseRecommendation] = []
+    for pick in picks:
+        i = pick.position
+        avg_rating = float(features.avg_rating[i])
+        reasons: list[str] = reason_for(pick, avg_rating)
+        if not reasons:
+            reasons.append("새로 개설된 강의를 경험해보세요")
+        recommendations.append(
+            CourseRecommendation(
+                course_id=int(features.ids[i]),
+                course_code=features.codes[i],
+                course_name=features.names[i],
+                score=pick.score,
+                reasons=reasons,
+                average_rating=avg_rating if avg_rating else None,
+                review_summary=_summarize_reviews(avg_rating if avg_rating else None, int(features.review_count[i])),
+            )
+        )
+    return recommendations
+
+
+def _enrolled_course_ids(db: Session, student: Student) -> set[int]:
+    return {row.course_id for row in db.query(Enrollment.course_id).filter(Enrollment.student_id == student.id).all()}
 
 
 def generate_personalized_recommendations(db: Session, student_id: int, limit: int = 6) -> List[CourseRecommendation]:
     """Enhanced recommendations mixing popularity, ratings and simple personalization.
     This function is intentionally lightweight and uses heuristics rather than heavy ML so it runs without extra deps.
+
+    Personalization: major in cohort +0.8, popularity min(0.5, enrollments / 10) and
+    co-enrollment with the student's own courses (services/co_enrollment.py) up to +1.0.
     """
     student = db.get(Student, student_id)
     if student is None:
         raise ValueError("student_not_found")
 
-    courses = db.query(Course).filter(Course.tenant_id == student.tenant_id).all()
-    if not courses:
-        return []
-
-    # recent requests: placeholder - count enrollments in last N days (simple proxy)
-    recent_rows = (
-        db.query(Enrollment.course_id, func.count(Enrollment.id).label('cnt'))
-        .filter(Enrollment.tenant_id == student.tenant_id)
-        .group_by(Enrollment.course_id)
-        .all()
-    )
-    recent_map: Dict[int, int] = {r.course_id: int(r.cnt) for r in recent_rows}
-
-    rating_rows = (
-        db.query(
-            CourseReview.course_id,
-            func.avg(CourseReview.rating_overall).label("avg_rating"),
-            func.count(CourseReview.id).label("review_count"),
-        )
-        .filter(CourseReview.tenant_id == student.tenant_id)
-        .group_by(CourseReview.course_id)
-        .all()
+    features = get_course_features(db, student.tenant_id)
+    taken = _enrolled_course_ids(db, student)
+    picks = score_courses(
+        features,
+        major=student.major,
+        exclude_ids=taken,
+        limit=limit,
+        popularity=True,
+        co_enrollment=co_enrollment_scores(db, student.tenant_id, taken) if taken else None,
     )
-    rating_map: dict[int, tuple[float, int]] = {
-        row.course_id: (float(row.avg_rating), int(row.review_count)) for row in rating_rows if row.avg_rating is not None
-    }
-
-    enrolled_course_ids = {
-        row.course_id for row in db.query(Enrollment.course_id).filter(Enrollment.student_id == student.id).all()
-    }
 
-    recommendations: list[CourseRecommendation] = []
-    for course in courses:
-        if course.id in enrolled_course_ids:
-            continue
-        avg_rating, review_count = rating_map.get(course.id, (0.0, 0))
-        base_score = (avg_rating * 0.6) + ((course.expected_enrollment or 0) * 0.01)
-        # personalization
-        pboost = _personalization_boost(student, course, recent_map)
-        score = base_score + pboost
-        reasons: list[str] = []
+    def reasons(pick: ScoredCourse, avg_rating: float) -> list[str]:
+        out: list[str] = []
         if avg_rating:
-            reasons.append(f"후기 평점 {avg_rating:.1f}")
-        if pboost > 0:
-            reasons.append("개인화 추천")
-        if not reasons:
-            reasons.append("새로 개설된 강의를 경험해보세요")
-        insight = _summarize_reviews(avg_rating if avg_rating else None, review_count)
-        recommendations.append(
-            CourseRecommendation(
-                course_id=course.id,
-                course_code=course.code,
-                course_name=course.name,
-                score=round(score, 2),
-                reasons=reasons,
-                average_rating=avg_rating if avg_rating else None,
-                review_summary=insight,
-            )
-        )
+            out.append(f"후기 평점 {avg_rating:.1f}")
+        if pick.co_enrollment >= 0.1:
+            out.append("함께 수강한 학생이 많은 강의")
+        if pick.personal_boost - pick.co_enrollment > 0:
+            out.append("개인화 추천")
+        return out
 
-    recommendations.sort(key=lambda r: r.score, reverse=True)
-    return recommendations[:limit]
+    return _build_recommendations(features, picks, reasons)
 
 
-def analyze_review_and_update_profile(db: Session, student_id: int, course_id: int, answers: list[int], comment: str | None) -> dict:
-    """Simple analysis:
-    - Aggregate Likert answers to a preference vector
-    - Extract keywords from comment (very naive word-count) and store top keywords in student.profile
-    - Return analysis summary used by downstream recommenders
-    This is intentionally lightweight; for production you may replace with an NLP model.
-    """
-    from ..models import Student
-    import re
+_KEYWORD_RE = re.compile(r"[가-힣a-zA-Z0-9]{2,}")
 
-    student = db.get(Student, student_id)
-    if student is None:
-        raise ValueError("student_not_found")
 
-    # normalize answers (1..5) and compute average
+def extract_review_signals(answers: Optional[list[int]], comment: Optional[str]) -> dict:
+    """Likert answers (first 4) with their average, plus the top 5 comment words by count."""
     vec = [int(a) for a in answers[:4]] if answers else []
     avg = sum(vec) / len(vec) if vec else None
 
     keywords = []
     if comment:
-        words = re.findall(r"[가-힣a-zA-Z0-9]{2,}", comment)
         freq: dict[str, int] = {}
-        for w in words:
+        for w in _KEYWORD_RE.findall(comment):
             w2 = w.lower()
             freq[w2] = freq.get(w2, 0) + 1
         sorted_kw = sorted(freq.items(), key=lambda kv: kv[1], reverse=True)
         keywords = [k for k, _ in sorted_kw[:5]]
+    return {'answers': vec, 'avg': avg, 'keywords': keywords}
+
 
-    # store in student.profile under 'review_signals'
-    meta = student.profile or {}
-    review_signals = meta.get('review_signals', {})
-    review_signals[str(course_id)] = {
-        'answers': vec,
-        'avg': avg,
-        'keywords': keywords,
-    }
+def apply_review_signals(profile: Optional[dict], course_id: int, signals: dict) -> dict:
+    """New profile dict with ``signals`` stored under review_signals and keywords added to preferred_tags."""
+    meta = dict(profile or {})
+    review_signals = dict(meta.get('review_signals', {}))
+    review_signals[str(course_id)] = signals
     meta['review_signals'] = review_signals
     # also add preferred_tags from keywords for personalization
-    prefs = meta.get('preferred_tags', [])
-    for k in keywords:
+    prefs = list(meta.get('preferred_tags', []))
+    for k in signals['keywords']:
         if k not in prefs:
             prefs.append(k)
     meta['preferred_tags'] = prefs
-    student.profile = meta
-    db.add(student)
-    db.commit()
-    return {'avg': avg, 'keywords': keywords}
-
+    return meta
 
 
 def _summarize_reviews(score: Optional[float], count: int) -> CourseInsight:
@@ -181,54 +130,21 @@ def generate_course_recommendations(db: Session, student_id: int, limit: int = 6
     if student is None:
         raise ValueError("student_not_found")
 
-    courses = db.query(Course).filter(Course.tenant_id == student.tenant_id).all()
-    if not courses:
-        return []
-
-    rating_rows = (
-        db.query(
-            CourseReview.course_id,
-            func.avg(CourseReview.rating_overall).label("avg_rating"),
-            func.count(CourseReview.id).label("review_count"),
-        )
-        .filter(CourseReview.tenant_id == student.tenant_id)
-        .group_by(CourseReview.course_id)
-        .all()
+    features = get_course_features(db, student.tenant_id)
+    picks = score_courses(
+        features,
+        major=student.major,
+        exclude_ids=_enrolled_course_ids(db, student),
+        limit=limit,
+        popularity=False,
     )
-    rating_map: dict[int, tuple[float, int]] = {
-        row.course_id: (float(row.avg_rating), int(row.review_count)) for row in rating_rows if row.avg_rating is not None
-    }
-
-    enrolled_course_ids = {
-        row.course_id for row in db.query(Enrollment.course_id).filter(Enrollment.student_id == student.id).all()
-    }
 
-    recommendations: list[CourseRecommendation] = []
-    for course in courses:
-        if course.id in enrolled_course_ids:
-            continue
-        avg_rating, review_count = rating_map.get(course.id, (0.0, 0))
-        score = avg_rating * 0.6 + (course.expected_enrollment or 0) * 0.01
-        reasons: list[str] = []
-        if student.major and course.cohort and student.major.lower() in course.cohort.lower():
-            score += 0.8
-            reasons.append("전공 필수/연계 과목")
+    def reasons(pick: ScoredCourse, avg_rating: float) -> list[str]:
+        out: list[str] = []
+        if pick.major_match:
+            out.append("전공 필수/연계 과목")
         if avg_rating:
-            reasons.append(f"후기 평점 {avg_rating:.1f}")
-        if not reasons:
-            reasons.append("새로 개설된 강의를 경험해보세요")
-        insight = _summarize_reviews(avg_rating if avg_rating else None, review_count)
-        recommendations.append(
-            CourseRecommendation(
-                course_id=course.id,
-                course_code=course.code,
-                course_name=course.name,
-                score=round(score, 2),
-                reasons=reasons,
-                average_rating=avg_rating if avg_rating else None,
-                review_summary=insight,
-            )
-        )
+            out.append(f"후기 평점 {avg_rating:.1f}")
+        return out
 
-    recommendations.sort(key=lambda r: r.score, reverse=True)
-    return recommendations[:limit]
+    return _build_recommendations(features, picks, reasons)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..db import SessionLocal
+from ..models import CourseReview, Student
+from .recommendation import apply_review_signals, extract_review_signals
+
+logger = logging.getLogger(__name__)
+
+_WAKE = threading.Event()
+_SWEEPER: Optional[threading.Thread] = None
+_SWEEPER_LOCK = threading.Lock()
+# tenant_id -> run accounting, kept apart from the optimize job queue
+_STATS: dict[int, dict[str, Any]] = {}
+_STATS_LOCK = threading.Lock()
+
+
+def analyze_pending_reviews(db: Session, tenant_id: int, *, batch_size: Optional[int] = None) -> dict[str, int]:
+    """Fold every not-yet-analyzed review of the tenant into its student's profile.
+
+    Reviews are taken oldest first in batches. Per batch, the rows are claimed (marked analyzed
+    only where still NULL), keywords are extracted for all of them, and each touched student's
+    profile is rewritten once, all in one commit. A batch another process claimed first is
+    rolled back and re-read. Reviews without a student are only marked.
+    """
+    batch_size = batch_size or get_settings().review_analysis_batch
+    totals = {"reviews": 0, "batches": 0, "profiles_updated": 0}
+    while True:
+        rows = db.execute(
+            select(CourseReview.id, CourseReview.student_id, CourseReview.course_id, CourseReview.answers, CourseReview.comment)
+            .where(CourseReview.tenant_id == tenant_id, CourseReview.analyzed_at.is_(None))
+            .order_by(CourseReview.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return totals
+        claimed = db.execute(
+            update(CourseReview)
+            .where(CourseReview.id.in_([row.id for row in rows]), CourseReview.analyzed_at.is_(None))
+            .values(analyzed_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if claimed != len(rows):
+            db.rollback()
+            continue
+        signals = [extract_review_signals(row.answers, row.comment) for row in rows]
+        student_ids = {row.student_id for row in rows if row.student_id is not None}
+        students = {
+            s.id: s
+            for s in db.execute(select(Student).where(Student.id.in_(student_ids)).with_for_update()).scalars()
+        } if student_ids else {}
+        profiles: dict[int, dict] = {}
+        for row, signal in zip(rows, signals):
+            student = students.get(row.student_id)
+            if student is not None:
+                profiles[student.id] = apply_review_signals(profiles.get(student.id, student.profile), row.course_id, signal)
+        for student_id, profile in profiles.items():
+            students[student_id].profile = profile
+        db.commit()
+        totals["reviews"] += len(rows)
+        totals["batches"] += 1
+        totals["profiles_updated"] += len(profiles)
+
+
+def _record_run(tenant_id: int, totals: dict[str, int], elapsed: float, error: Optional[str]) -> None:
+    with _STATS_LOCK:
+        stats = _STATS.setdefault(
+            tenant_id, {"runs": 0, "failures": 0, "reviews_total": 0, "last_run": None, "last_error": None}
+        )
+        stats["runs"] += 1
+        stats["reviews_total"] += totals["reviews"]
+        if error is not None:
+            stats["failures"] += 1
+            stats["last_error"] = error
+        stats["last_run"] = {
+            **totals,
+            "finished_at": datetime.utcnow().isoformat(),
+            "elapsed_seconds": round(elapsed, 3),
+            "reviews_per_sec": round(totals["reviews"] / max(elapsed, 1e-6), 1),
+        }
+
+
+def run_review_analysis(tenant_id: int) -> dict[str, int]:
+    """Analyze the tenant's pending reviews on the calling thread and record the run."""
+    started = time.time()
+    totals = {"reviews": 0, "batches": 0, "profiles_updated": 0}
+    try:
+        with SessionLocal() as db:
+            totals = analyze_pending_reviews(db, tenant_id)
+    except Exception as exc:
+        _record_run(tenant_id, totals, time.time() - started, f"{type(exc).__name__}: {exc}")
+        raise
+    _record_run(tenant_id, totals, time.time() - started, None)
+    return totals
+
+
+def review_analysis_status(db: Session, tenant_id: int) -> dict[str, Any]:
+    """Pending review count plus this process's run accounting for the tenant."""
+    pending = db.execute(
+        select(func.count(CourseReview.id)).where(
+            CourseReview.tenant_id == tenant_id, CourseReview.analyzed_at.is_(None)
+        )
+    ).scalar_one()
+    with _STATS_LOCK:
+        stats = dict(_STATS.get(tenant_id) or {"runs": 0, "failures": 0, "reviews_total": 0, "last_run": None, "last_error": None})
+    return {"pending": pending, **stats}
+
+
+def _sweep_once() -> None:
+    with SessionLocal() as db:
+        tenant_ids = db.execute(
+            select(CourseReview.tenant_id).where(CourseReview.analyzed_at.is_(None)).distinct()
+        ).scalars().all()
+    for tenant_id in tenant_ids:
+        try:
+            run_review_analysis(tenant_id)
+        except Exception:
+            # the reviews stay pending; the next pass retries
+            logger.exception("review analysis failed for tenant %s", tenant_id)
+
+
+def _sweep_loop() -> None:
+    while True:
+        _WAKE.wait(timeout=get_settings().review_analysis_interval)
+        _WAKE.clear()
+        try:
+            _sweep_once()
+        except Exception:
+            logger.exception("review analysis sweep failed")
+
+
+def start_review_analysis() -> None:
+    """Start the sweeper thread that analyzes pending reviews tenant by tenant (idempotent)."""
+    global _SWEEPER
+    with _SWEEPER_LOCK:
+        if _SWEEPER is not None and _SWEEPER.is_alive():
+            return
+        _SWEEPER = threading.Thread(target=_sweep_loop, name="review-analysis-sweeper", daemon=True)
+        _SWEEPER.start()
+
+
+def notify_review_submitted() -> None:
+    """Run the sweep now instead of at the next interval (no database work on the caller's thread)."""
+    _WAKE.set()
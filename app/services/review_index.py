@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models import CourseReview, CourseTermCount, ReviewTerm
+
+KINDS = ("tag", "keyword")
+MAX_TERM = 64  # ReviewTerm.term length
+
+_WORD_RE = re.compile(r"[가-힣a-zA-Z0-9]{2,}")  # same words the review analysis counts
+
+
+def normalize_term(term: str) -> str:
+    return term.strip().lower()[:MAX_TERM]
+
+
+def review_terms(tags: Optional[Iterable[str]], comment: Optional[str]) -> dict[str, set[str]]:
+    """kind -> distinct terms of one review: its tags and every word of its comment."""
+    return {
+        "tag": {t for t in (normalize_term(str(tag)) for tag in (tags or [])) if t},
+        "keyword": {normalize_term(word) for word in _WORD_RE.findall(comment or "")},
+    }
+
+
+def _bump_counts(db: Session, tenant_id: int, course_id: int, counts: Counter) -> None:
+    for (kind, term), delta in counts.items():
+        key = (CourseTermCount.course_id == course_id, CourseTermCount.kind == kind, CourseTermCount.term == term)
+        stmt = (
+            update(CourseTermCount)
+            .where(*key)
+            .values(count=CourseTermCount.count + delta)
+            .execution_options(synchronize_session=False)
+        )
+        if db.execute(stmt).rowcount:
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(
+                    insert(CourseTermCount).values(
+                        course_id=course_id, kind=kind, term=term, tenant_id=tenant_id, count=delta
+                    )
+                )
+        except IntegrityError:
+            db.execute(stmt)
+
+
+def index_review(db: Session, review: CourseReview) -> None:
+    """Add a new review's postings and facet counts; call in the transaction that inserts it."""
+    if review.id is None:
+        db.flush()
+    terms = review_terms(review.tags, review.comment)
+    rows = [
+        {"review_id": review.id, "kind": kind, "term": term, "course_id": review.course_id, "tenant_id": review.tenant_id}
+        for kind, values in terms.items()
+        for term in values
+    ]
+    if not rows:
+        return
+    db.execute(insert(ReviewTerm), rows)
+    _bump_counts(db, review.tenant_id, review.course_id, Counter((row["kind"], row["term"]) for row in rows))
+
+
+def rebuild_review_index(db: Session, tenant_id: Optional[int] = None) -> int:
+    """Re-create postings and counts from the reviews (one tenant or all); returns the posting count."""
+    for model in (ReviewTerm, CourseTermCount):
+        stmt = delete(model)
+        if tenant_id is not None:
+            stmt = stmt.where(model.tenant_id == tenant_id)
+        db.execute(stmt)
+    query = select(CourseReview.id, CourseReview.tenant_id, CourseReview.course_id, CourseReview.tags, CourseReview.comment)
+    if tenant_id is not None:
+        query = query.where(CourseReview.tenant_id == tenant_id)
+    postings: list[dict[str, Any]] = []
+    counts: Counter = Counter()
+    for row in db.execute(query):
+        for kind, values in review_terms(row.tags, row.comment).items():
+            for term in values:
+                postings.append(
+                    {"review_id": row.id, "kind": kind, "term": term, "course_id": row.course_id, "tenant_id": row.tenant_id}
+                )
+                counts[(row.tenant_id, row.course_id, kind, term)] += 1
+    if postings:
+        db.execute(insert(ReviewTerm), postings)
+        db.execute(
+            insert(CourseTermCount),
+            [
+                {"tenant_id": tid, "course_id": cid, "kind": kind, "term": term, "count": n}
+                for (tid, cid, kind, term), n in counts.items()
+            ],
+        )
+    db.commit()
+    return len(postings)
+
+
+def course_facets(db: Session, course_id: int, *, limit: int = 20) -> dict[str, list[dict[str, Any]]]:
+    """Most frequent tags and comment words of a course's reviews."""
+    facets: dict[str, list[dict[str, Any]]] = {}
+    for kind in KINDS:
+        rows = db.execute(
+            select(CourseTermCount.term, CourseTermCount.count)
+            .where(CourseTermCount.course_id == course_id, CourseTermCount.kind == kind, CourseTermCount.count > 0)
+            .order_by(CourseTermCount.count.desc(), CourseTermCount.term)
+            .limit(limit)
+        ).all()
+        facets[kind + "s"] = [{"term": term, "count": count} for term, count in rows]
+    return facets
+
+
+def review_term_filters(
+    course_id: int,
+    *,
+    tags: Iterable[str] = (),
+    keyword: Optional[str] = None,
+) -> list[Any]:
+    """WHERE clauses on ``CourseReview`` for reviews of the course having every tag in ``tags`` and
+    a comment word starting with ``keyword``.
+
+    Each filter is a ``review_terms`` subquery, so matches are never pulled into Python; an empty
+    list means no filter (every review matches).
+    """
+    filters = [("tag", normalize_term(tag), False) for tag in tags if tag.strip()]
+    if keyword and keyword.strip():
+        filters.append(("keyword", normalize_term(keyword), True))
+    clauses = []
+    for kind, term, prefix in filters:
+        query = select(ReviewTerm.review_id).where(ReviewTerm.course_id == course_id, ReviewTerm.kind == kind)
+        if prefix:
+            # 과제 also finds 과제가 / 과제는: range scan on the (course_id, kind, term) index
+            query = query.where(ReviewTerm.term >= term, ReviewTerm.term < term + "\U0010ffff")
+        else:
+            query = query.where(ReviewTerm.term == term)
+        clauses.append(CourseReview.id.in_(query))
+    return clauses
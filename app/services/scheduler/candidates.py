@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .filters import allowed_rooms_for_course
+from .grouping import group_slots
+from .types import AssignmentLite, CourseLite, RoomLite, SlotLite
+
+# Objective weights shared by the exact backends (lower is better)
+UNPLACED_BLOCK_PENALTY = 1000
+PERIOD_PENALTY = 1
+
+
+@dataclass
+class Candidate:
+    course_id: int
+    room_id: int
+    block: int  # index into CandidateSet.blocks
+    cost: int  # seat slack + period penalty
+
+
+@dataclass
+class CandidateSet:
+    """Allowed (course, room, block) triples plus the slot coverage needed for conflicts."""
+
+    courses: list[CourseLite]
+    blocks: list[list[int]]
+    candidates: list[Candidate]
+    blocks_needed: dict[int, int]
+    by_course: dict[int, list[int]] = field(default_factory=dict)
+    # (room_id, slot_id) / (course_id, slot_id) / (cohort, slot_id) -> candidate indexes
+    room_slot: dict[tuple[int, int], list[int]] = field(default_factory=dict)
+    course_slot: dict[tuple[int, int], list[int]] = field(default_factory=dict)
+    cohort_slot: dict[tuple[str, int], list[int]] = field(default_factory=dict)
+    pruned_rooms: int = 0
+
+    def index_of(self, course_id: int, room_id: int, slot_ids: list[int]) -> Optional[int]:
+        key = tuple(slot_ids)
+        for idx in self.by_course.get(course_id, []):
+            cand = self.candidates[idx]
+            if cand.room_id == room_id and tuple(self.blocks[cand.block]) == key:
+                return idx
+        return None
+
+    def to_assignments(self, chosen: list[int]) -> tuple[list[AssignmentLite], dict]:
+        out = [
+            AssignmentLite(
+                course_id=self.candidates[i].course_id,
+                room_id=self.candidates[i].room_id,
+                slot_ids=list(self.blocks[self.candidates[i].block]),
+            )
+            for i in chosen
+        ]
+        stats = {
+            "total_courses": len(self.courses),
+            "assigned_courses": len({a.course_id for a in out}),
+            "assignment_count": len(out),
+        }
+        return out, stats
+
+
+def optimal_status(pruned_rooms: int) -> str:
+    """A proven optimum only covers the full problem when no room was pruned."""
+    return "optimal_within_pruned" if pruned_rooms else "optimal"
+
+
+def build_candidates(
+    courses: list[CourseLite],
+    rooms: list[RoomLite],
+    slots: list[SlotLite],
+    *,
+    group_size: int = 1,
+    use_forbidden: bool = True,
+    max_rooms_per_course: int = 0,
+    hint: Optional[list[AssignmentLite]] = None,
+) -> CandidateSet:
+    """Enumerate only the triples that survive forbidden-set filtering.
+
+    ``max_rooms_per_course`` (0 = unlimited) keeps the tightest-fitting rooms per course;
+    rooms used by ``hint`` are always kept so the warm start stays representable.
+    """
+    slot_lookup = {s.id: s for s in slots}
+    blocks = group_slots(slots, group_size)
+    block_periods = [slot_lookup[b[0]].period for b in blocks]
+    hinted_rooms: dict[int, set[int]] = defaultdict(set)
+    for a in hint or []:
+        hinted_rooms[a.course_id].add(a.room_id)
+
+    cset = CandidateSet(courses=list(courses), blocks=blocks, candidates=[], blocks_needed={})
+    for course in courses:
+        hours_required = max(1, course.hours_per_week)
+        cset.blocks_needed[course.id] = max(1, (hours_required + group_size - 1) // group_size)
+        allowed = allowed_rooms_for_course(course, rooms, use_forbidden=use_forbidden)
+        allowed.sort(key=lambda r: (r.type != ("lab" if course.needs_lab else r.type), r.capacity, r.id))
+        if max_rooms_per_course > 0 and len(allowed) > max_rooms_per_course:
+            keep = allowed[:max_rooms_per_course]
+            keep_ids = {r.id for r in keep}
+            keep += [r for r in allowed if r.id in hinted_rooms[course.id] and r.id not in keep_ids]
+            cset.pruned_rooms += len(allowed) - len(keep)
+            allowed = keep
+        # Cohort labels such as "1-A" repeat across departments, so scope them per department
+        cohort = (course.cohort or "").strip()
+        if cohort:
+            cohort = f"{(course.department or '').strip()}/{cohort}"
+        for room in allowed:
+            slack = max(0, room.capacity - course.expected_enrollment)
+            for b, block in enumerate(blocks):
+                idx = len(cset.candidates)
+                cset.candidates.append(
+                    Candidate(course_id=course.id, room_id=room.id, block=b, cost=slack + PERIOD_PENALTY * block_periods[b])
+                )
+                cset.by_course.setdefault(course.id, []).append(idx)
+                for slot_id in block:
+                    cset.room_slot.setdefault((room.id, slot_id), []).append(idx)
+                    if cohort:
+                        cset.cohort_slot.setdefault((cohort, slot_id), []).append(idx)
+                    else:
+                        cset.course_slot.setdefault((course.id, slot_id), []).append(idx)
+    return cset
+
+
+def repair_hint(cset: CandidateSet, hint: list[AssignmentLite]) -> set[int]:
+    """Map hint blocks onto candidates, dropping ones that break cohort/room/count limits,
+    then greedily fill the gaps.
+
+    Greedy ignores cohort conflicts; an infeasible warm start is discarded by CP-SAT and CBC,
+    while a repaired complete one gives the search a feasible incumbent right away.
+    """
+    conflict_keys: dict[int, list[tuple]] = {}
+    for name, conflict_map in (("room", cset.room_slot), ("cohort", cset.cohort_slot), ("course", cset.course_slot)):
+        for key, idxs in conflict_map.items():
+            for i in idxs:
+                conflict_keys.setdefault(i, []).append((name, key))
+    chosen: set[int] = set()
+    taken: set[tuple] = set()
+    placed: dict[int, int] = {}
+    for a in hint:
+        idx = cset.index_of(a.course_id, a.room_id, a.slot_ids)
+        if idx is None or placed.get(a.course_id, 0) >= cset.blocks_needed.get(a.course_id, 0):
+            continue
+        keys = conflict_keys.get(idx, [])
+        if any(k in taken for k in keys):
+            continue
+        taken.update(keys)
+        chosen.add(idx)
+        placed[a.course_id] = placed.get(a.course_id, 0) + 1
+    # Fill what the repair dropped with the cheapest conflict-free candidates
+    for course in cset.courses:
+        missing = cset.blocks_needed.get(course.id, 0) - placed.get(course.id, 0)
+        if missing <= 0:
+            continue
+        for idx in sorted(cset.by_course.get(course.id, []), key=lambda i: cset.candidates[i].cost):
+            keys = conflict_keys.get(idx, [])
+            if any(k in taken for k in keys):
+                continue
+            taken.update(keys)
+            chosen.add(idx)
+            missing -= 1
+            if missing <= 0:
+                break
+    return chosen
@@ -17,3 +17,14 @@ def is_forbidden(course: CourseLite, room: RoomLite) -> bool:
 def filter_rooms_for_course(course: CourseLite, rooms: Iterable[RoomLite]) -> list[RoomLite]:
     return [r for r in rooms if not is_forbidden(course, r)]
 
+
+
+def allowed_rooms_for_course(course: CourseLite, rooms: list[RoomLite], *, use_forbidden: bool = True) -> list[RoomLite]:
+    allowed = filter_rooms_for_course(course, rooms) if use_forbidden else list(rooms)
+    # Department-specific constraint: 빅데이터과는 창조관만 사용
+    if course.department and course.department.strip() == "빅데이터과":
+        allowed = [r for r in allowed if "창조관" in (r.building or "").strip()]
+        # If none, relax to 모든 창조관 강의실(초기 시드 포함)
+        if not allowed:
+            allowed = [r for r in rooms if "창조관" in (r.building or "").strip()]
+    return allowed
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import astuple
+from typing import Any, Iterable, Optional
+
+from .types import AssignmentLite, CourseLite, RoomLite, SlotLite
+
+
+def input_fingerprint(
+    courses: list[CourseLite],
+    rooms: list[RoomLite],
+    slots: list[SlotLite],
+    params: dict[str, Any],
+) -> str:
+    """Stable sha256 over the solver inputs; equal fingerprints mean an identical solve.
+
+    Rows are sorted by id so query order does not matter.
+    """
+    payload = {
+        "courses": sorted(astuple(c) for c in courses),
+        "rooms": sorted(astuple(r) for r in rooms),
+        "slots": sorted(astuple(s) for s in slots),
+        "params": params,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def plan_signature(rows: Iterable[tuple[int, Optional[int], Optional[int]]]) -> str:
+    """Hash of persisted (course_id, room_id, timeslot_id) rows, used to skip no-op re-persists."""
+    ordered = sorted(rows, key=lambda r: (r[0], r[1] or 0, r[2] or 0))
+    return hashlib.sha256(json.dumps(ordered, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def assignment_rows(assignments: list[AssignmentLite]) -> list[tuple[int, Optional[int], Optional[int]]]:
+    # Same expansion persist_assignments performs: one row per slot in the block
+    return [(a.course_id, a.room_id, slot_id) for a in assignments for slot_id in (a.slot_ids or [None])]
+
+
+def encode_assignments(assignments: list[AssignmentLite]) -> list[list]:
+    return [[a.course_id, a.room_id, list(a.slot_ids)] for a in assignments]
+
+
+def decode_assignments(raw: list[list]) -> list[AssignmentLite]:
+    return [AssignmentLite(course_id=c, room_id=r, slot_ids=list(s)) for c, r, s in raw]
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from typing import Hashable, Iterable, Optional, Sequence
+
+
+class BitsetOccupancy:
+    """Slot occupancy held as one integer bitmask per resource (room, course, cohort ...).
+
+    Slots are mapped to dense bit indexes and every candidate block gets a precomputed
+    slot mask, so "is this block free for that room" is a single AND. Each resource also
+    keeps a mask over *block* indexes (blocks that overlap anything it already holds),
+    which turns "first free block" into a lowest-set-bit lookup over all blocks at once.
+    Block index order is the preference order: lower index wins.
+    """
+
+    def __init__(self, slot_ids: Sequence[int], blocks: Sequence[Sequence[int]]) -> None:
+        self.slot_index: dict[int, int] = {slot_id: i for i, slot_id in enumerate(slot_ids)}
+        self.blocks: list[list[int]] = [list(block) for block in blocks]
+        self.block_masks: list[int] = []
+        # slot bit -> mask of blocks containing that slot
+        self._slot_blocks: list[int] = [0] * len(self.slot_index)
+        for b, block in enumerate(self.blocks):
+            mask = 0
+            for slot_id in block:
+                i = self.slot_index[slot_id]
+                mask |= 1 << i
+                self._slot_blocks[i] |= 1 << b
+            self.block_masks.append(mask)
+        self._overlaps: list[int] = [self._blocks_touching(mask) for mask in self.block_masks]
+        self.all_blocks: int = (1 << len(self.blocks)) - 1
+        self._used: dict[Hashable, int] = {}
+        self._blocked: dict[Hashable, int] = {}
+
+    def _blocks_touching(self, slot_mask: int) -> int:
+        out = 0
+        while slot_mask:
+            low = slot_mask & -slot_mask
+            out |= self._slot_blocks[low.bit_length() - 1]
+            slot_mask ^= low
+        return out
+
+    def slot_mask(self, slot_ids: Iterable[int]) -> int:
+        mask = 0
+        for slot_id in slot_ids:
+            i = self.slot_index.get(slot_id)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def used_mask(self, key: Hashable) -> int:
+        return self._used.get(key, 0)
+
+    def is_free(self, key: Hashable, block: int) -> bool:
+        return not (self._used.get(key, 0) & self.block_masks[block])
+
+    def occupy(self, key: Hashable, block: int) -> None:
+        self._used[key] = self._used.get(key, 0) | self.block_masks[block]
+        self._blocked[key] = self._blocked.get(key, 0) | self._overlaps[block]
+
+    def occupy_slots(self, key: Hashable, slot_ids: Iterable[int]) -> None:
+        """Mark arbitrary slots as taken (e.g. locked assignments outside the block grid)."""
+        mask = self.slot_mask(slot_ids)
+        if not mask:
+            return
+        self._used[key] = self._used.get(key, 0) | mask
+        self._blocked[key] = self._blocked.get(key, 0) | self._blocks_touching(mask)
+
+    def free_blocks(self, *keys: Hashable) -> int:
+        """Bitmask over block indexes that are free for every given resource."""
+        blocked = 0
+        for key in keys:
+            blocked |= self._blocked.get(key, 0)
+        return self.all_blocks & ~blocked
+
+    def first_free_block(self, *keys: Hashable) -> Optional[int]:
+        free = self.free_blocks(*keys)
+        if not free:
+            return None
+        return (free & -free).bit_length() - 1
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from typing import Optional
+import os
+import time
+from typing import Callable, Optional
+
+from .candidates import UNPLACED_BLOCK_PENALTY, build_candidates, optimal_status, repair_hint
+from .types import AssignmentLite, CourseLite, RoomLite, SlotLite
 
 
 def _import_cp_model():  # pragma: no cover
@@ -15,9 +20,99 @@ def is_available() -> bool:
     return _import_cp_model() is not None
 
 
-def solve_with_ortools(*args, **kwargs) -> Optional[dict]:
+def solve_with_ortools(
+    courses: list[CourseLite],
+    rooms: list[RoomLite],
+    slots: list[SlotLite],
+    *,
+    group_size: int = 1,
+    use_forbidden: bool = True,
+    hint: Optional[list[AssignmentLite]] = None,
+    time_limit: float = 30.0,
+    num_workers: int = 0,
+    max_rooms_per_course: int = 0,
+    checkpoint: Optional[Callable[[], None]] = None,
+) -> Optional[dict]:
+    """CP-SAT model: boolean x[c,r,b] for allowed triples, at-most-one per room/cohort slot.
+
+    Minimizes seat slack + late-period penalty + a large penalty per unplaced block.
+    ``hint`` (usually the warm_start_greedy plan) is passed as solution hints.
+    ``time_limit`` is wall-clock from this call: the search gets what is left after candidate
+    enumeration and model construction. ``checkpoint`` runs after the candidate enumeration
+    and once the model is built.
+    Returns None when OR-Tools is missing or no feasible solution was found in time.
+    """
     cp_model = _import_cp_model()
     if cp_model is None:
         return None
-    # TODO: Implement CP-SAT model: boolean x[c,r,b] for allowed triples; no-overlap constraints; objective weights
-    return None
+
+    build_started = time.time()
+    cset = build_candidates(
+        courses,
+        rooms,
+        slots,
+        group_size=group_size,
+        use_forbidden=use_forbidden,
+        max_rooms_per_course=max_rooms_per_course,
+        hint=hint,
+    )
+    if not cset.candidates:
+        return None
+    if checkpoint is not None:
+        checkpoint()
+
+    model = cp_model.CpModel()
+    x = [model.NewBoolVar(f"x{i}") for i in range(len(cset.candidates))]
+
+    for course_id, idxs in cset.by_course.items():
+        model.Add(cp_model.LinearExpr.Sum([x[i] for i in idxs]) <= cset.blocks_needed[course_id])
+    for conflict_map in (cset.room_slot, cset.cohort_slot, cset.course_slot):
+        for idxs in conflict_map.values():
+            if len(idxs) > 1:
+                model.AddAtMostOne([x[i] for i in idxs])
+
+    # Unplaced penalty rewritten as a constant minus a per-placement reward
+    unplaced_const = UNPLACED_BLOCK_PENALTY * sum(cset.blocks_needed.values())
+    model.Minimize(
+        cp_model.LinearExpr.WeightedSum(x, [cand.cost - UNPLACED_BLOCK_PENALTY for cand in cset.candidates])
+        + unplaced_const
+    )
+
+    hinted = 0
+    if hint:
+        chosen = repair_hint(cset, hint)
+        for i, var in enumerate(x):
+            model.AddHint(var, 1 if i in chosen else 0)
+        hinted = len(chosen)
+    build_seconds = time.time() - build_started
+    if checkpoint is not None:
+        checkpoint()
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max(0.1, float(time_limit) - build_seconds)
+    solver.parameters.num_search_workers = int(num_workers) or (os.cpu_count() or 1)
+    # Probing/symmetry detection dominate presolve on timetable-sized models; the hint matters more
+    solver.parameters.cp_model_probing_level = 0
+    solver.parameters.symmetry_level = 0
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+
+    chosen_idxs = [i for i, var in enumerate(x) if solver.BooleanValue(var)]
+    assignments, stats = cset.to_assignments(chosen_idxs)
+    objective = solver.ObjectiveValue()
+    bound = solver.BestObjectiveBound()
+    gap = abs(objective - bound) / max(1.0, abs(objective))
+    return {
+        "assignments": assignments,
+        "stats": stats,
+        "solver_status": optimal_status(cset.pruned_rooms) if status == cp_model.OPTIMAL else "feasible",
+        "objective": objective,
+        "best_bound": bound,
+        "gap": round(gap, 6),
+        "variables": len(x),
+        "hinted": hinted,
+        "pruned_rooms": cset.pruned_rooms,
+        "build_seconds": round(build_seconds, 3),
+        "solve_seconds": round(solver.WallTime(), 3),
+    }
@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from typing import Optional
+import os
+import time
+from typing import Callable, Optional
+
+from .candidates import UNPLACED_BLOCK_PENALTY, build_candidates, optimal_status, repair_hint
+from .types import AssignmentLite, CourseLite, RoomLite, SlotLite
 
 
 def _import_pulp():  # pragma: no cover
@@ -15,11 +20,108 @@ def is_available() -> bool:
     return _import_pulp() is not None
 
 
-# Placeholder for a future PuLP MILP model. For now we return None to fall back to greedy.
-def solve_with_pulp(*args, **kwargs) -> Optional[dict]:
+def solve_with_pulp(
+    courses: list[CourseLite],
+    rooms: list[RoomLite],
+    slots: list[SlotLite],
+    *,
+    group_size: int = 1,
+    use_forbidden: bool = True,
+    hint: Optional[list[AssignmentLite]] = None,
+    time_limit: float = 30.0,
+    num_workers: int = 0,
+    max_rooms_per_course: int = 0,
+    checkpoint: Optional[Callable[[], None]] = None,
+) -> Optional[dict]:
+    """Sparse MILP solved with CBC: x[c,r,b] only for triples that pass is_forbidden.
+
+    Minimizes seat slack + late-period penalty + a large penalty per unplaced block, subject
+    to at-most-one per room slot, cohort slot and course slot. Returns None when PuLP is
+    missing or CBC found no integer solution in time. ``time_limit`` is wall-clock from this
+    call: CBC gets what is left after the model build (at least 1s). ``checkpoint`` runs after
+    the candidate enumeration and once the model is built.
+    """
     pulp = _import_pulp()
     if pulp is None:
         return None
-    # TODO: implement MILP model: variables x[c,r,t] only for allowed triples (forbidden-set)
-    # objective: minimize seat slack + preference penalties; constraints: capacity, conflicts
-    return None
+
+    build_started = time.time()
+    cset = build_candidates(
+        courses,
+        rooms,
+        slots,
+        group_size=group_size,
+        use_forbidden=use_forbidden,
+        max_rooms_per_course=max_rooms_per_course,
+        hint=hint,
+    )
+    if not cset.candidates:
+        return None
+    if checkpoint is not None:
+        checkpoint()
+
+    prob = pulp.LpProblem("timetable", pulp.LpMinimize)
+    x = [pulp.LpVariable(f"x{i}", cat=pulp.LpBinary) for i in range(len(cset.candidates))]
+
+    # Unplaced penalty rewritten as a constant minus a per-placement reward
+    unplaced_const = UNPLACED_BLOCK_PENALTY * sum(cset.blocks_needed.values())
+    prob += pulp.LpAffineExpression(
+        [(x[i], cand.cost - UNPLACED_BLOCK_PENALTY) for i, cand in enumerate(cset.candidates)],
+        constant=unplaced_const,
+    )
+    for course_id, idxs in cset.by_course.items():
+        prob += pulp.LpAffineExpression([(x[i], 1) for i in idxs]) <= cset.blocks_needed[course_id]
+    for conflict_map in (cset.room_slot, cset.cohort_slot, cset.course_slot):
+        for idxs in conflict_map.values():
+            if len(idxs) > 1:
+                prob += pulp.LpAffineExpression([(x[i], 1) for i in idxs]) <= 1
+
+    warm = False
+    if hint:
+        chosen = repair_hint(cset, hint)
+        for i, var in enumerate(x):
+            var.setInitialValue(1 if i in chosen else 0)
+        warm = bool(chosen)
+    build_seconds = time.time() - build_started
+    if checkpoint is not None:
+        checkpoint()
+
+    cmd = pulp.PULP_CBC_CMD(
+        msg=False,
+        # The wall-clock budget covers model construction as well
+        timeLimit=max(1.0, float(time_limit) - build_seconds),
+        threads=int(num_workers) or (os.cpu_count() or 1),
+        warmStart=warm,
+        # CBC preprocessing is slow on set-packing rows and can report "infeasible" when the
+        # time limit interrupts it; the LP relaxation here is tight enough without it.
+        options=["preprocess off"],
+    )
+    solve_started = time.time()
+    try:
+        prob.solve(cmd)
+    except pulp.PulpSolverError:
+        return None
+    solve_seconds = time.time() - solve_started
+
+    # sol_status distinguishes a proven optimum from an incumbent cut off by the time limit
+    sol_status = getattr(prob, "sol_status", None)
+    if sol_status == pulp.LpSolutionOptimal:
+        solver_status = optimal_status(cset.pruned_rooms)
+    elif sol_status == pulp.LpSolutionIntegerFeasible:
+        solver_status = "feasible"
+    else:
+        return None
+
+    chosen_idxs = [i for i, var in enumerate(x) if (var.varValue or 0) > 0.5]
+    assignments, stats = cset.to_assignments(chosen_idxs)
+    return {
+        "assignments": assignments,
+        "stats": stats,
+        "solver_status": solver_status,
+        "objective": pulp.value(prob.objective),
+        "variables": len(x),
+        "constraints": len(prob.constraints),
+        "pruned_rooms": cset.pruned_rooms,
+        "build_seconds": round(build_seconds, 3),
+        "solve_seconds": round(solve_seconds, 3),
+    }
@@ -13,6 +13,8 @@ class CourseLite:
     hours_per_week: int
     needs_lab: bool
     expected_enrollment: int
+    department: Optional[str] = None
+    cohort: Optional[str] = None
 
 
 @dataclass
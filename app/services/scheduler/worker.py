@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import Callable, Optional
+
+from .greedy import greedy_assign
+from .ortools_solver import is_available as ort_available, solve_with_ortools
+from .pulp_solver import is_available as pulp_available, solve_with_pulp
+from .types import CourseLite, RoomLite, SlotLite
+
+
+def solve_snapshot(
+    courses: list[CourseLite],
+    rooms: list[RoomLite],
+    slots: list[SlotLite],
+    *,
+    solver: str = "greedy",
+    group_size: int = 1,
+    use_forbidden: bool = True,
+    seed: int = 0,
+    time_limit: float = 30.0,
+    num_workers: int = 0,
+    max_rooms_per_course: int = 0,
+    checkpoint: Optional[Callable[[], None]] = None,
+) -> dict:
+    """Solve a tenant snapshot without touching the database.
+
+    Runs in the API process (thread mode) or in a pool worker (process mode), so inputs and
+    the returned dict must stay picklable. Returns ``used_solver``, ``assignments``,
+    ``stats`` and ``result`` (exact-solver metadata, None when greedy produced the plan).
+    ``checkpoint`` (thread mode only, it is not picklable) is called between phases and may
+    raise to abandon the solve. For pulp/ortools, ``time_limit`` is the wall-clock budget of
+    the whole exact solve: the greedy hint, the model build and the search.
+    """
+    result: Optional[dict] = None
+    used_solver = solver
+    if solver in ("pulp", "ortools"):
+        started = time.time()
+        # Greedy plan doubles as the warm start / solution hints
+        hint, _ = greedy_assign(courses, rooms, slots, group_size=group_size, use_forbidden=use_forbidden, seed=seed)
+        solver_kwargs = dict(
+            group_size=group_size,
+            use_forbidden=use_forbidden,
+            hint=hint,
+            time_limit=max(0.1, time_limit - (time.time() - started)),
+            num_workers=num_workers,
+            max_rooms_per_course=max_rooms_per_course,
+            checkpoint=checkpoint,
+        )
+        if checkpoint is not None:
+            checkpoint()
+        if solver == "pulp" and pulp_available():
+            result = solve_with_pulp(courses, rooms, slots, **solver_kwargs)
+        if solver == "ortools" and ort_available():
+            result = solve_with_ortools(courses, rooms, slots, **solver_kwargs)
+
+    if result is None:  # greedy fallback or explicit
+        used_solver = "greedy"
+        assignments, stats = greedy_assign(
+            courses, rooms, slots, group_size=group_size, use_forbidden=use_forbidden, seed=seed
+        )
+        # If nothing assigned because of strict forbidden-set, retry ignoring forbidden to surface a plan
+        if stats.get("assigned_courses", 0) == 0 and use_forbidden:
+            assignments, stats = greedy_assign(courses, rooms, slots, group_size=group_size, use_forbidden=False, seed=seed)
+            used_solver = f"{used_solver}+relaxed"
+    else:
+        assignments, stats = result.pop("assignments"), result.pop("stats")
+    return {"used_solver": used_solver, "assignments": assignments, "stats": stats, "result": result}
+
+
+def warmup() -> int:
+    """Pool initializer/no-op task: solver modules are imported at module load, so a worker
+    that ran this is ready to solve without per-job import cost."""
+    ort_available()
+    pulp_available()
+    return os.getpid()
@@ -1,15 +1,33 @@
 from __future__ import annotations
 
 import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
 from typing import Any, Iterable
 
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from ..models import Course, CourseReview, Room, Student, Timeslot
+from ..models import Assignment, Course, Room, Student, Tenant, Timeslot
+from .course_search import get_search_index
+from .course_stats import course_stats_map
+from .plans import plan_scope
 from .scheduler.calendar_rules import ALLOWED_DAYS, day_display, normalize_day, normalize_slot
 from .scheduler.greedy import warm_start_greedy
 from .scheduler.types import AssignmentLite
+from .timetable_search import (
+    Candidate,
+    Selection,
+    avoid_mask,
+    build_candidates,
+    resolve_weights,
+    score_candidates,
+    top_subsets,
+)
+
+DEFAULT_ALTERNATIVES = 2  # extra timetables returned next to the best one
+MAX_ALTERNATIVES = 5
 
 
 def _as_list(value: Any) -> list[Any]:
@@ -41,66 +59,166 @@ def _resolve_preferred_course_ids(db: Session, tenant_id: int, raw_items: Iterab
                 preferred_codes.add(token.upper())
 
     if preferred_codes:
-        rows = (
-            db.query(Course.id, Course.code)
-            .filter(Course.tenant_id == tenant_id)
-            .all()
-        )
-        code_to_id = {code.upper(): course_id for course_id, code in rows if code}
+        index = get_search_index(db, tenant_id)
         for code in preferred_codes:
-            course_id = code_to_id.get(code.upper())
+            course_id = index.course_id_for_code(code)
             if course_id is not None:
                 preferred_ids.add(course_id)
 
     return preferred_ids
 
 
-def _select_assignments(
-    assignments: Iterable[AssignmentLite],
-    slot_catalog: dict[int, dict[str, Any]],
-    *,
-    course_filter: set[int] | None,
-    max_courses: int,
-    avoid_days: set[str],
-    avoid_periods: set[int],
-):
-    selected: list[tuple[AssignmentLite, list[tuple[int, dict[str, Any]]]]] = []
-    used_slots: set[tuple[str, int]] = set()
+# tenant_id -> (plan version key, assignments, stats)
+_PLAN_SNAPSHOTS: dict[int, tuple[tuple[int, int], list[AssignmentLite], dict[str, Any]]] = {}
+_PLAN_SNAPSHOT_LOCK = threading.Lock()
+
+
+def _plan_version(db: Session, tenant_id: int) -> tuple[int, int]:
+    # (row count, active plan id): a published plan never changes, so its id names the content.
+    # Before the first publish only legacy rows exist, and their max id stands in for it.
+    tenant = db.get(Tenant, tenant_id)
+    if tenant is None:
+        return 0, 0
+    count, max_id = db.query(func.count(Assignment.id), func.max(Assignment.id)).filter(plan_scope(tenant)).one()
+    return int(count or 0), int(tenant.active_plan_id or max_id or 0)
+
+
+def _build_plan_snapshot(db: Session, tenant_id: int) -> tuple[list[AssignmentLite], dict[str, Any]]:
+    """Rebuild solver-shaped blocks from the persisted plan.
+
+    Rows are stored one per timeslot, so consecutive periods of the same course/room/day
+    are merged back into a single block. Ordering mirrors warm_start_greedy (lab first,
+    larger enrollment first); the timetable search uses it to break score ties.
+    """
+    rows = (
+        db.query(
+            Assignment.course_id,
+            Assignment.room_id,
+            Assignment.timeslot_id,
+            Timeslot.day,
+            Timeslot.start,
+            Timeslot.end,
+            Course.needs_lab,
+            Course.expected_enrollment,
+        )
+        .join(Timeslot, Assignment.timeslot_id == Timeslot.id)
+        .join(Course, Assignment.course_id == Course.id)
+        .filter(plan_scope(db.get(Tenant, tenant_id)), Assignment.room_id.isnot(None))
+        .all()
+    )
 
-    for assignment in assignments:
-        if course_filter and assignment.course_id not in course_filter:
+    by_key: dict[tuple[int, int, str], list[tuple[int, int]]] = defaultdict(list)
+    order_key: dict[int, tuple[bool, int]] = {}
+    for course_id, room_id, slot_id, day, start, end, needs_lab, expected in rows:
+        window = normalize_slot(day, start, end)
+        if window is None:
             continue
+        by_key[(course_id, room_id, window.day)].append((window.period, slot_id))
+        order_key[course_id] = (not needs_lab, -(expected or 0))
+
+    assignments: list[AssignmentLite] = []
+    for (course_id, room_id, _day), periods in by_key.items():
+        periods.sort()
+        block: list[int] = []
+        last_period: int | None = None
+        for period, slot_id in periods:
+            if period == last_period:
+                continue
+            if last_period is not None and period != last_period + 1:
+                assignments.append(AssignmentLite(course_id=course_id, room_id=room_id, slot_ids=block))
+                block = []
+            block.append(slot_id)
+            last_period = period
+        if block:
+            assignments.append(AssignmentLite(course_id=course_id, room_id=room_id, slot_ids=block))
+    assignments.sort(key=lambda a: (order_key[a.course_id], a.course_id))
+
+    total_courses = db.query(func.count(Course.id)).filter(Course.tenant_id == tenant_id).scalar() or 0
+    stats = {
+        "source": "plan",
+        "total_courses": int(total_courses),
+        "assigned_courses": len(order_key),
+        "assignment_count": len(assignments),
+    }
+    return assignments, stats
+
 
-        slot_infos: list[tuple[int, dict[str, Any]]] = []
-        conflict = False
-        for slot_id in assignment.slot_ids:
-            info = slot_catalog.get(slot_id)
-            if info is None:
-                conflict = True
-                break
-            if info["day"] in avoid_days or info["period"] in avoid_periods:
-                conflict = True
-                break
-            key = (info["day"], info["period"])
-            if key in used_slots:
-                conflict = True
-                break
-            slot_infos.append((slot_id, info))
-
-        if conflict or not slot_infos:
+def load_plan_assignments(db: Session, tenant_id: int) -> tuple[list[AssignmentLite], dict[str, Any]] | None:
+    """Return the tenant's persisted plan as blocks, cached per plan version.
+
+    Returns None when no plan has been persisted yet.
+    """
+    version = _plan_version(db, tenant_id)
+    if version[0] == 0:
+        return None
+    with _PLAN_SNAPSHOT_LOCK:
+        cached = _PLAN_SNAPSHOTS.get(tenant_id)
+    if cached is not None and cached[0] == version:
+        return cached[1], dict(cached[2])
+    assignments, stats = _build_plan_snapshot(db, tenant_id)
+    with _PLAN_SNAPSHOT_LOCK:
+        _PLAN_SNAPSHOTS[tenant_id] = (version, assignments, stats)
+    return assignments, dict(stats)
+
+
+def _slot_catalog(db: Session, tenant_id: int) -> dict[int, dict[str, Any]]:
+    # Monday–Friday 09:00~18:00 (9교시) slots only
+    slot_catalog: dict[int, dict[str, Any]] = {}
+    for slot in db.query(Timeslot).filter(Timeslot.tenant_id == tenant_id).all():
+        window = normalize_slot(slot.day, slot.start, slot.end)
+        if window is None:
             continue
+        slot_catalog[slot.id] = {
+            "day": window.day,
+            "day_display": day_display(window.day),
+            "period": window.period,
+            "start": window.start,
+            "end": window.end,
+            "label": window.label,
+        }
+    return slot_catalog
+
 
-        selected.append((assignment, slot_infos))
-        for _, info in slot_infos:
-            used_slots.add((info["day"], info["period"]))
+# tenant_id -> (plan version key, slot catalog key, candidates): shared by every student of the plan
+_CANDIDATE_INDEXES: dict[int, tuple[tuple[int, int], tuple[int, int], list[Candidate]]] = {}
 
-        if len(selected) >= max_courses:
-            break
 
-    return selected
+def _candidate_index(
+    db: Session,
+    tenant_id: int,
+    assignments: list[AssignmentLite],
+    slot_catalog: dict[int, dict[str, Any]],
+    *,
+    from_plan: bool,
+) -> list[Candidate]:
+    """Course bitmask candidates of the plan, built once per plan version.
+
+    Per-student filters (avoid_days/avoid_periods) are applied later as a mask, so the
+    index itself never depends on preferences. Fresh solves are not cached.
+    """
+    if not from_plan:
+        return build_candidates(assignments, slot_catalog)
+    version = _plan_version(db, tenant_id)
+    catalog_key = (len(slot_catalog), max(slot_catalog, default=0))
+    with _PLAN_SNAPSHOT_LOCK:
+        cached = _CANDIDATE_INDEXES.get(tenant_id)
+    if cached is not None and cached[0] == version and cached[1] == catalog_key:
+        return cached[2]
+    candidates = build_candidates(assignments, slot_catalog)
+    with _PLAN_SNAPSHOT_LOCK:
+        _CANDIDATE_INDEXES[tenant_id] = (version, catalog_key, candidates)
+    return candidates
+
+
+def _course_ratings(db: Session, tenant_id: int) -> dict[int, float]:
+    return {
+        course_id: stats.avg_rating
+        for course_id, stats in course_stats_map(db, tenant_id).items()
+        if stats.avg_rating is not None
+    }
 
 
-def _infer_department_label(course_meta: dict[str, Any], student: Student) -> str:
+def _infer_department_label(course_meta: dict[str, Any], student: Student | StudentProfile) -> str:
     department = str(course_meta.get("department") or "").strip()
     if department:
         return department
@@ -112,7 +230,7 @@ def _infer_department_label(course_meta: dict[str, Any], student: Student) -> st
     return "미분류"
 
 
-def _infer_year_label(course_meta: dict[str, Any], student: Student) -> str:
+def _infer_year_label(course_meta: dict[str, Any], student: Student | StudentProfile) -> str:
     cohort = str(course_meta.get("cohort") or "")
     match = re.search(r"(\d{1,2})", cohort)
     if match:
@@ -159,27 +277,37 @@ def _group_by(
     return sorted(groups.values(), key=lambda item: item["course_count"], reverse=True)
 
 
-def recommend_timetable_for_student(
-    db: Session,
-    student_id: int,
-    max_courses: int = 6,
-    preferences: dict[str, Any] | None = None,
-):
-    """Return a conflict-free timetable recommendation for a student.
+@dataclass
+class StudentProfile:
+    """The only student fields a default timetable depends on (grouping labels)."""
 
-    Rules applied:
-    - only Monday–Friday slots are considered (09:00~18:00, 9 교시 기준)
-    - one course per period for the student; overlaps are skipped automatically
-    - preferences can limit courses/days/periods and are honoured when possible
+    major: str | None = None
+    year: int | None = None
+
+
+@dataclass
+class RecommendationContext:
+    """Everything of a recommendation that is the same for every student of the tenant.
+
+    Plain data only, so the precompute job can ship it to worker processes.
     """
 
-    preferences = preferences or {}
+    selections: list[Selection]
+    stats: dict[str, Any]
+    course_map: dict[int, dict[str, Any]]
+    room_map: dict[int, dict[str, Any]]
+    review_map: dict[int, dict[str, Any]]
+    from_plan: bool
 
-    student = db.get(Student, student_id)
-    if student is None:
-        raise ValueError("student_not_found")
 
-    tenant_id = student.tenant_id
+def build_recommendation_context(
+    db: Session,
+    tenant_id: int,
+    max_courses: int = 6,
+    preferences: dict[str, Any] | None = None,
+) -> RecommendationContext:
+    """Search for the tenant's best timetables under ``preferences`` and load their metadata."""
+    preferences = preferences or {}
 
     group_size = int(preferences.get("slot_group", 1) or 1)
     ignore_forbidden = bool(preferences.get("ignore_forbidden", False))
@@ -191,27 +319,21 @@ def recommend_timetable_for_student(
         except (TypeError, ValueError):
             pass
 
-    assignments, stats = warm_start_greedy(
-        db,
-        tenant_id,
-        group_size=group_size,
-        use_forbidden=not ignore_forbidden,
-    )
+    plan = None
+    if str(preferences.get("source") or "plan").lower() != "solve":
+        plan = load_plan_assignments(db, tenant_id)
+    if plan is not None:
+        assignments, stats = plan
+    else:
+        assignments, stats = warm_start_greedy(
+            db,
+            tenant_id,
+            group_size=group_size,
+            use_forbidden=not ignore_forbidden,
+        )
+        stats["source"] = "solve"
 
-    # Build slot catalog restricted to Monday–Friday 09:00~18:00 (9교시)
-    slot_catalog: dict[int, dict[str, Any]] = {}
-    for slot in db.query(Timeslot).filter(Timeslot.tenant_id == tenant_id).all():
-        window = normalize_slot(slot.day, slot.start, slot.end)
-        if window is None:
-            continue
-        slot_catalog[slot.id] = {
-            "day": window.day,
-            "day_display": day_display(window.day),
-            "period": window.period,
-            "start": window.start,
-            "end": window.end,
-            "label": window.label,
-        }
+    slot_catalog = _slot_catalog(db, tenant_id)
 
     preferred_ids = _resolve_preferred_course_ids(
         db, tenant_id, _as_list(preferences.get("preferred_courses"))
@@ -231,29 +353,37 @@ def recommend_timetable_for_student(
     }
 
     max_courses = max(1, min(int(max_courses or 1), 9))
-
-    selected = _select_assignments(
-        assignments,
-        slot_catalog,
-        course_filter=preferred_ids if preferred_ids else None,
+    weights = resolve_weights(preferences.get("weights") if isinstance(preferences.get("weights"), dict) else None)
+    try:
+        alternatives = max(0, min(int(preferences.get("alternatives", DEFAULT_ALTERNATIVES)), MAX_ALTERNATIVES))
+    except (TypeError, ValueError):
+        alternatives = DEFAULT_ALTERNATIVES
+    try:
+        min_difference = max(1, int(preferences.get("min_difference", 2)))
+    except (TypeError, ValueError):
+        min_difference = 2
+
+    index = _candidate_index(db, tenant_id, assignments, slot_catalog, from_plan=plan is not None)
+    candidates = score_candidates(
+        index,
+        preferred_ids=preferred_ids,
+        ratings=_course_ratings(db, tenant_id) if index and weights["rating"] else {},
+        weights=weights,
+        exclude=avoid_mask(avoid_days, avoid_periods),
+    )
+    selections = top_subsets(
+        candidates,
         max_courses=max_courses,
-        avoid_days=avoid_days,
-        avoid_periods=avoid_periods,
+        day_weight=weights["day"],
+        k=1 + alternatives,
+        min_difference=min_difference,
     )
+    selection = selections[0]
 
-    if not selected and preferred_ids:
-        # Fallback: ignore course filter if strict filtering produced nothing
-        selected = _select_assignments(
-            assignments,
-            slot_catalog,
-            course_filter=None,
-            max_courses=max_courses,
-            avoid_days=avoid_days,
-            avoid_periods=avoid_periods,
-        )
-
-    course_ids = {assignment.course_id for assignment, _ in selected}
-    room_ids = {assignment.room_id for assignment, _ in selected if assignment.room_id is not None}
+    course_ids = {c.course_id for sel in selections for c in sel.candidates}
+    room_ids = {
+        assignment.room_id for sel in selections for assignment, _ in sel.blocks if assignment.room_id is not None
+    }
 
     course_rows = (
         db.query(Course)
@@ -294,30 +424,73 @@ def recommend_timetable_for_student(
         for room in room_rows
     }
 
-    review_map: dict[int, dict[str, Any]] = {}
-    if course_ids:
-        review_rows = (
-            db.query(
-                CourseReview.course_id,
-                func.avg(CourseReview.rating_overall),
-                func.count(CourseReview.id),
-            )
-            .filter(CourseReview.course_id.in_(course_ids))
-            .group_by(CourseReview.course_id)
-            .all()
-        )
-        for course_id, avg_rating, count in review_rows:
-            review_map[course_id] = {
-                "average_overall": round(avg_rating, 2) if avg_rating is not None else None,
-                "review_count": count,
-            }
+    review_map: dict[int, dict[str, Any]] = {
+        course_id: {
+            "average_overall": round(stats.avg_rating, 2) if stats.avg_rating is not None else None,
+            "review_count": stats.review_count,
+        }
+        for course_id, stats in course_stats_map(db, tenant_id, course_ids).items()
+        if stats.review_count
+    }
 
     day_order = {day: index for index, day in enumerate(ALLOWED_DAYS)}
 
+    filters_applied: dict[str, Any] = {}
+    if preferred_ids:
+        filters_applied["preferred_course_ids"] = sorted(preferred_ids)
+    if avoid_days:
+        filters_applied["avoid_days"] = [day_display(day) for day in sorted(avoid_days, key=lambda d: day_order[d])]
+    if avoid_periods:
+        filters_applied["avoid_periods"] = sorted(avoid_periods)
+
+    stats.update(
+        {
+            "selected_courses": len(selection.candidates),
+            "max_courses": max_courses,
+            "selection": {
+                **_summarize(selection),
+                "optimal": selection.optimal,
+                "nodes": selection.nodes,
+                "candidates": len(candidates),
+                "weights": weights,
+            },
+            "rules": {
+                "allowed_days": list(ALLOWED_DAYS),
+                "min_period": 1,
+                "max_period": 9,
+                "period_length_minutes": 60,
+            },
+        }
+    )
+    if filters_applied:
+        stats["applied_filters"] = filters_applied
+
+    return RecommendationContext(
+        selections=selections,
+        stats=stats,
+        course_map=course_map,
+        room_map=room_map,
+        review_map=review_map,
+        from_plan=plan is not None,
+    )
+
+
+def _summarize(selected: Selection) -> dict[str, Any]:
+    return {
+        "score": selected.score,
+        "selected_courses": len(selected.candidates),
+        "days_on_campus": len({info["day"] for _, slot_infos in selected.blocks for _, info in slot_infos}),
+    }
+
+
+def _build_rows(
+    ctx: RecommendationContext, selected: Selection, student: Student | StudentProfile
+) -> list[dict[str, Any]]:
+    day_order = {day: index for index, day in enumerate(ALLOWED_DAYS)}
     rows = []
-    for assignment, slot_infos in selected:
-        course_meta = course_map.get(assignment.course_id, {"id": assignment.course_id})
-        room_meta = room_map.get(assignment.room_id) if assignment.room_id else None
+    for assignment, slot_infos in selected.blocks:
+        course_meta = ctx.course_map.get(assignment.course_id, {"id": assignment.course_id})
+        room_meta = ctx.room_map.get(assignment.room_id) if assignment.room_id else None
         slot_entries = [
             {
                 "timeslot_id": slot_id,
@@ -340,7 +513,7 @@ def recommend_timetable_for_student(
                 "course": course_meta,
                 "room": room_meta,
                 "slots": slot_entries,
-                "review": review_map.get(assignment.course_id, {"average_overall": None, "review_count": 0}),
+                "review": ctx.review_map.get(assignment.course_id, {"average_overall": None, "review_count": 0}),
                 "grouping": {
                     "department": dept_label,
                     "year": year_label,
@@ -354,33 +527,65 @@ def recommend_timetable_for_student(
             row["slots"][0]["period"] if row["slots"] else 0,
         )
     )
+    return rows
 
-    filters_applied: dict[str, Any] = {}
-    if preferred_ids:
-        filters_applied["preferred_course_ids"] = sorted(preferred_ids)
-    if avoid_days:
-        filters_applied["avoid_days"] = [day_display(day) for day in sorted(avoid_days, key=lambda d: day_order[d])]
-    if avoid_periods:
-        filters_applied["avoid_periods"] = sorted(avoid_periods)
-
-    stats.update(
-        {
-            "selected_courses": len(rows),
-            "max_courses": max_courses,
-            "rules": {
-                "allowed_days": list(ALLOWED_DAYS),
-                "min_period": 1,
-                "max_period": 9,
-                "period_length_minutes": 60,
-            },
-        }
-    )
-    if filters_applied:
-        stats["applied_filters"] = filters_applied
 
+def render_recommendation(ctx: RecommendationContext, student: Student | StudentProfile) -> dict[str, Any]:
+    """Turn a shared context into one student's response (only grouping labels differ)."""
+    selection = ctx.selections[0]
+    rows = _build_rows(ctx, selection, student)
     breakdown = {
         "by_department": _group_by(rows, key="department"),
         "by_year": _group_by(rows, key="year"),
     }
+    best_ids = {c.course_id for c in selection.candidates}
+    alternative_rows = [
+        {
+            "rank": rank,
+            **_summarize(alt),
+            "changed_courses": len({c.course_id for c in alt.candidates} - best_ids),
+            "timetable": _build_rows(ctx, alt, student),
+        }
+        for rank, alt in enumerate(ctx.selections[1:], start=2)
+    ]
+    return {"timetable": rows, "stats": dict(ctx.stats), "breakdown": breakdown, "alternatives": alternative_rows}
+
+
+def recommend_timetable_for_student(
+    db: Session,
+    student_id: int,
+    max_courses: int = 6,
+    preferences: dict[str, Any] | None = None,
+    *,
+    use_cache: bool = True,
+):
+    """Return a conflict-free timetable recommendation for a student.
+
+    Rules applied:
+    - only Monday–Friday slots are considered (09:00~18:00, 9 교시 기준)
+    - one course per period for the student; a course is taken with all of its blocks or not at all
+    - the subset maximizes a weighted score (see ``timetable_search.DEFAULT_WEIGHTS``, override via
+      ``preferences["weights"]``): preferred courses, review ratings and filled periods count up,
+      every day on campus counts down
+    - avoid_days/avoid_periods are hard constraints
+    - ``alternatives`` (default 2) more timetables come from the same search, each differing from
+      the others by at least ``min_difference`` (default 2) courses
+    - the tenant's persisted plan is used when one exists; ``preferences["source"] = "solve"``
+      forces a fresh warm_start_greedy run (slot_group/ignore_forbidden only apply then)
+    - without preferences the answer comes from the precomputed per-student cache when it is
+      current (see ``timetable_cache``)
+    """
+    student = db.get(Student, student_id)
+    if student is None:
+        raise ValueError("student_not_found")
+
+    if use_cache and not preferences and max_courses == 6:
+        # Local import: timetable_cache builds on this module
+        from .timetable_cache import cached_recommendation
+
+        cached = cached_recommendation(db, student)
+        if cached is not None:
+            return cached
 
-    return {"timetable": rows, "stats": stats, "breakdown": breakdown}
+    ctx = build_recommendation_context(db, student.tenant_id, max_courses, preferences)
+    return render_recommendation(ctx, student)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..db import SessionLocal
+from ..models import Student, TimetableCache, TimetablePayload, Timeslot
+from .executor import get_process_pool, process_mode
+from .jobs import JobCancelled, queue
+from .timetable import (
+    RecommendationContext,
+    StudentProfile,
+    _plan_version,
+    build_recommendation_context,
+    render_recommendation,
+)
+
+_CHUNK = 250  # students per worker task / insert batch
+_DECODED_MAX = 64
+
+# digest -> decoded payload; payloads are immutable, so hits skip zlib + json entirely
+_DECODED: dict[str, dict[str, Any]] = {}
+_DECODED_LOCK = threading.Lock()
+
+
+def cache_version(db: Session, tenant_id: int) -> str:
+    """Version of the inputs a default timetable is built from: active plan and timeslots.
+
+    Review averages are deliberately left out so a review burst during enrollment does not
+    invalidate every entry; they refresh with the next precompute or TIMETABLE_CACHE_TTL.
+    """
+    plan_count, plan_max = _plan_version(db, tenant_id)
+    slot_count, slot_max = db.execute(
+        select(func.count(Timeslot.id), func.max(Timeslot.id)).where(Timeslot.tenant_id == tenant_id)
+    ).one()
+    return f"p{plan_count}.{plan_max}:s{slot_count}.{slot_max or 0}"
+
+
+def cached_recommendation(db: Session, student: Student) -> Optional[dict[str, Any]]:
+    """Default-preference recommendation from the cache, or None on a miss / stale entry."""
+    row = db.get(TimetableCache, student.id)
+    if row is None:
+        return None
+    if row.created_at < datetime.utcnow() - timedelta(seconds=get_settings().timetable_cache_ttl):
+        return None
+    if row.version != cache_version(db, student.tenant_id):
+        return None
+    with _DECODED_LOCK:
+        payload = _DECODED.get(row.digest)
+    if payload is None:
+        blob = db.get(TimetablePayload, row.digest)
+        if blob is None:
+            return None
+        payload = json.loads(zlib.decompress(blob.payload))
+        with _DECODED_LOCK:
+            if len(_DECODED) >= _DECODED_MAX:
+                _DECODED.pop(next(iter(_DECODED)))
+            _DECODED[row.digest] = payload
+    return {**payload, "stats": {**payload["stats"], "cache": {"hit": True, "built_at": row.created_at.isoformat()}}}
+
+
+def render_chunk(
+    ctx: RecommendationContext, profiles: list[tuple[int, Optional[str], Optional[int]]]
+) -> tuple[list[tuple[int, str]], dict[str, bytes]]:
+    """Render (student_id, major, year) rows into (student_id, digest) pairs plus the distinct
+    compressed payloads; runs in worker processes."""
+    by_profile: dict[tuple[Optional[str], Optional[int]], str] = {}
+    blobs: dict[str, bytes] = {}
+    out: list[tuple[int, str]] = []
+    for student_id, major, year in profiles:
+        # Only grouping labels depend on the student, so major/year decide the answer
+        digest = by_profile.get((major, year))
+        if digest is None:
+            payload = render_recommendation(ctx, StudentProfile(major=major, year=year))
+            raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            blob = zlib.compress(raw, 6)
+            digest = by_profile[(major, year)] = hashlib.sha1(blob).hexdigest()
+            blobs[digest] = blob
+        out.append((student_id, digest))
+    return out, blobs
+
+
+def submit_timetable_precompute(tenant_id: int) -> str:
+    """Queue a precompute for the tenant, or return the one already queued/running."""
+    return queue.create(
+        run_timetable_precompute,
+        {"tenant_id": tenant_id},
+        tenant_id=tenant_id,
+        dedupe_key=f"timetable-precompute:{tenant_id}",
+    ).id
+
+
+def run_timetable_precompute(job_id: str, params: dict) -> None:
+    """Precompute default timetables for every student of the tenant into ``timetable_cache``.
+
+    The search runs once; rendering + compression is split into chunks that go to the
+    process pool under OPTIMIZE_EXECUTION=process and run in the job thread otherwise.
+    """
+    tenant_id = params["tenant_id"]
+    started = time.time()
+    try:
+        with SessionLocal() as db:
+            version = cache_version(db, tenant_id)
+            ctx = build_recommendation_context(db, tenant_id)
+            if not ctx.from_plan:
+                queue.update(job_id, status="completed", explain="No published plan yet; nothing cached.")
+                return
+            profiles = [
+                (student_id, major, year)
+                for student_id, major, year in db.execute(
+                    select(Student.id, Student.major, Student.year).where(Student.tenant_id == tenant_id)
+                )
+            ]
+            search_seconds = time.time() - started
+            chunks = [profiles[i : i + _CHUNK] for i in range(0, len(profiles), _CHUNK)]
+            queue.check(job_id)
+
+            render_started = time.time()
+            digests: list[tuple[int, str]] = []
+            blobs: dict[str, bytes] = {}
+            if process_mode() and len(chunks) > 1:
+                pool = get_process_pool()
+                results = (f.result() for f in [pool.submit(render_chunk, ctx, chunk) for chunk in chunks])
+            else:
+                results = (render_chunk(ctx, chunk) for chunk in chunks)
+            for chunk_digests, chunk_blobs in results:
+                digests.extend(chunk_digests)
+                blobs.update(chunk_blobs)
+                queue.check(job_id)
+            render_seconds = time.time() - render_started
+
+            now = datetime.utcnow()
+            db.execute(delete(TimetableCache).where(TimetableCache.tenant_id == tenant_id))
+            db.execute(delete(TimetablePayload).where(TimetablePayload.tenant_id == tenant_id))
+            db.execute(
+                insert(TimetablePayload),
+                [{"digest": d, "tenant_id": tenant_id, "payload": blob} for d, blob in blobs.items()],
+            )
+            for i in range(0, len(digests), _CHUNK):
+                db.execute(
+                    insert(TimetableCache),
+                    [
+                        {"student_id": sid, "tenant_id": tenant_id, "version": version, "digest": d, "created_at": now}
+                        for sid, d in digests[i : i + _CHUNK]
+                    ],
+                )
+            db.commit()
+
+        elapsed = time.time() - started
+        throughput = round(len(digests) / max(elapsed, 1e-6), 1)
+        queue.update(
+            job_id,
+            status="completed",
+            score=throughput,
+            explain=f"Cached default timetables for {len(digests)} students in {elapsed:.2f}s ({throughput} students/sec).",
+            metrics={
+                "students": len(digests),
+                "distinct_payloads": len(blobs),
+                "payload_bytes": sum(len(blob) for blob in blobs.values()),
+                "chunks": len(chunks),
+                "execution": "process" if process_mode() and len(chunks) > 1 else "thread",
+                "search_seconds": round(search_seconds, 3),
+                "render_seconds": round(render_seconds, 3),
+                "elapsed_seconds": round(elapsed, 3),
+                "students_per_sec": throughput,
+                "version": version,
+            },
+        )
+    except JobCancelled:
+        raise
+    except Exception as exc:
+        queue.update(job_id, status="failed", explain=f"{type(exc).__name__}: {exc}")
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Any, Iterable, Optional
+
+from .scheduler.calendar_rules import ALLOWED_DAYS
+from .scheduler.types import AssignmentLite
+
+PERIODS_PER_DAY = 9  # 09:00~18:00
+DEFAULT_WEIGHTS: dict[str, float] = {
+    "course": 1.0,  # per selected course
+    "hour": 0.1,  # per occupied period, so fuller weeks win ties
+    "rating": 0.5,  # × average overall rating / 5
+    "preferred": 5.0,  # per course listed in preferred_courses
+    "day": 0.3,  # penalty per day on campus
+}
+NODE_LIMIT = 20_000
+
+_DAY_INDEX = {day: i for i, day in enumerate(ALLOWED_DAYS)}
+
+SlotInfos = list[tuple[int, dict[str, Any]]]
+
+
+def slot_bit(day: str, period: int) -> int:
+    """Bit of (day, period) in a student's 45-bit week (5 days × 9 periods)."""
+    return 1 << (_DAY_INDEX[day] * PERIODS_PER_DAY + period - 1)
+
+
+@dataclass(slots=True)
+class Candidate:
+    """Every block of one course: a student takes all of them or none."""
+
+    course_id: int
+    blocks: list[tuple[AssignmentLite, SlotInfos]]
+    mask: int
+    days: int  # bit per weekday
+    order: int  # position in the plan listing, used as tie-break
+    weight: float = 0.0
+
+
+@dataclass
+class Selection:
+    candidates: list[Candidate]
+    score: float
+    optimal: bool
+    nodes: int
+
+    @property
+    def blocks(self) -> list[tuple[AssignmentLite, SlotInfos]]:
+        return [block for c in self.candidates for block in c.blocks]
+
+
+def build_candidates(
+    assignments: Iterable[AssignmentLite],
+    slot_catalog: dict[int, dict[str, Any]],
+) -> list[Candidate]:
+    """Group plan blocks by course and encode each course as a slot bitmask.
+
+    Courses with a block outside the catalog (weekends, non-hourly slots) or whose own blocks
+    partly overlap are dropped. A block repeating periods the course already has is the same
+    meeting in another room and is skipped. Per-student avoid filters are not applied here but
+    as a mask (:func:`avoid_mask`), so one candidate list serves every student.
+    """
+    by_course: dict[int, Candidate] = {}
+    invalid: set[int] = set()
+    for assignment in assignments:
+        course_id = assignment.course_id
+        if course_id in invalid:
+            continue
+        slot_infos: SlotInfos = []
+        mask = days = 0
+        ok = bool(assignment.slot_ids)
+        for slot_id in assignment.slot_ids:
+            info = slot_catalog.get(slot_id)
+            if info is None:
+                ok = False
+                break
+            bit = slot_bit(info["day"], info["period"])
+            if mask & bit:
+                ok = False
+                break
+            mask |= bit
+            days |= 1 << _DAY_INDEX[info["day"]]
+            slot_infos.append((slot_id, info))
+        candidate = by_course.get(course_id)
+        if ok and candidate is not None and candidate.mask & mask:
+            if candidate.mask & mask == mask:
+                continue  # same periods in another room (split section): the first room is listed
+            ok = False
+        if not ok:
+            invalid.add(course_id)
+            by_course.pop(course_id, None)
+            continue
+        if candidate is None:
+            by_course[course_id] = Candidate(
+                course_id=course_id, blocks=[(assignment, slot_infos)], mask=mask, days=days, order=len(by_course)
+            )
+        else:
+            candidate.blocks.append((assignment, slot_infos))
+            candidate.mask |= mask
+            candidate.days |= days
+    return list(by_course.values())
+
+
+def avoid_mask(avoid_days: Iterable[str], avoid_periods: Iterable[int]) -> int:
+    """Week mask of the periods a student excluded; candidates touching it are filtered out."""
+    periods = [p for p in avoid_periods if 1 <= p <= PERIODS_PER_DAY]
+    mask = 0
+    for day in ALLOWED_DAYS:
+        if day in avoid_days:
+            mask |= ((1 << PERIODS_PER_DAY) - 1) << (_DAY_INDEX[day] * PERIODS_PER_DAY)
+        else:
+            for period in periods:
+                mask |= slot_bit(day, period)
+    return mask
+
+
+def score_candidates(
+    candidates: Iterable[Candidate],
+    *,
+    preferred_ids: set[int],
+    ratings: dict[int, float],
+    weights: dict[str, float],
+    exclude: int = 0,
+) -> list[Candidate]:
+    """Per-student weighted copies of the (shared) candidates not touching ``exclude``."""
+    scored: list[Candidate] = []
+    for c in candidates:
+        if c.mask & exclude:
+            continue
+        weight = weights["course"] + weights["hour"] * c.mask.bit_count()
+        rating = ratings.get(c.course_id)
+        if rating is not None:
+            weight += weights["rating"] * rating / 5
+        if c.course_id in preferred_ids:
+            weight += weights["preferred"]
+        scored.append(Candidate(c.course_id, c.blocks, c.mask, c.days, c.order, weight))
+    return scored
+
+
+def resolve_weights(raw: Optional[dict[str, Any]]) -> dict[str, float]:
+    weights = dict(DEFAULT_WEIGHTS)
+    for key, value in (raw or {}).items():
+        if key in weights:
+            try:
+                weights[key] = float(value)
+            except (TypeError, ValueError):
+                pass
+    return weights
+
+
+def _dedupe(candidates: list[Candidate], keep: int) -> list[Candidate]:
+    # Courses with the same mask exclude each other, so only the best ``keep`` of them can ever
+    # appear among ``keep`` alternatives
+    by_mask: dict[int, list[Candidate]] = {}
+    for c in candidates:
+        by_mask.setdefault(c.mask, []).append(c)
+    pool = [c for group in by_mask.values() for c in sorted(group, key=lambda c: (-c.weight, c.order))[:keep]]
+    return sorted(pool, key=lambda c: (-c.weight, c.order))
+
+
+def _distance(a: frozenset, b: frozenset) -> int:
+    return max(len(a - b), len(b - a))
+
+
+class _Search:
+    """Depth-first branch and bound that keeps the ``k`` best mutually diverse subsets."""
+
+    def __init__(self, max_courses: int, node_limit: int, k: int, min_difference: int) -> None:
+        self.max_courses = max_courses
+        self.node_limit = node_limit
+        self.k = k
+        self.min_difference = min_difference
+        self.nodes = 0
+        self.kept: list[tuple[float, list[Candidate], frozenset]] = []  # best first
+        self.exhausted = False
+
+    @property
+    def threshold(self) -> float:
+        # A branch must beat the k-th kept subset to matter; the best one stays exact
+        return self.kept[-1][0] if len(self.kept) >= self.k else float("-inf")
+
+    def run(self, pool: list[Candidate], penalty: float) -> None:
+        self._dfs(pool, 0.0, [], penalty)
+
+    def _offer(self, score: float, chosen: list[Candidate]) -> None:
+        if score <= self.threshold:
+            return
+        ids = frozenset(c.course_id for c in chosen)
+        similar = [i for i, (_, _, other) in enumerate(self.kept) if _distance(ids, other) < self.min_difference]
+        if any(self.kept[i][0] >= score for i in similar):
+            return
+        for i in reversed(similar):
+            del self.kept[i]
+        pos = next((i for i, kept in enumerate(self.kept) if kept[0] < score), len(self.kept))
+        self.kept.insert(pos, (score, list(chosen), ids))
+        del self.kept[self.k :]
+
+    def _dfs(self, pool: list[Candidate], score: float, chosen: list[Candidate], penalty: float) -> None:
+        self.nodes += 1
+        self._offer(score - penalty, chosen)
+        room = self.max_courses - len(chosen)
+        if room == 0 or not pool:
+            return
+        # pool only holds courses compatible with ``chosen``, sorted by weight, so its head bounds any extension
+        for i, c in enumerate(pool):
+            if self.nodes >= self.node_limit:
+                self.exhausted = True
+                return
+            if score + sum(x.weight for x in pool[i : i + room]) - penalty <= self.threshold:
+                return
+            rest = [x for x in pool[i + 1 :] if not x.mask & c.mask]
+            chosen.append(c)
+            self._dfs(rest, score + c.weight, chosen, penalty)
+            chosen.pop()
+
+
+def top_subsets(
+    candidates: list[Candidate],
+    *,
+    max_courses: int,
+    day_weight: float,
+    k: int = 1,
+    min_difference: int = 2,
+    node_limit: int = NODE_LIMIT,
+) -> list[Selection]:
+    """The ``k`` best conflict-free subsets of at most ``max_courses`` courses, best first.
+
+    score = Σ weight − ``day_weight`` × days on campus. The day term is handled by
+    enumerating the (≤ 31) allowed day sets D, each restricted to courses inside D and
+    charged |D| days, best bound first; within a day set a depth-first branch and bound
+    over slot bitmasks uses the sorted-weight prefix as its upper bound.
+
+    All alternatives come out of that single search: any two returned subsets differ by
+    at least ``min_difference`` courses (a close, lower-scoring variant of a kept subset is
+    discarded). The first subset is exact, and is empty when every course would cost more
+    days than it is worth; the empty subset is never listed as an alternative. ``optimal``
+    is False only if ``node_limit`` cut the search short.
+    """
+    k = max(1, k)
+    pool = _dedupe([c for c in candidates if c.weight > 0], k)
+    search = _Search(max_courses, node_limit, k, min_difference)
+    # Taking nothing scores 0 and costs no days; day-set roots charge their days even when empty
+    search._offer(0.0, [])
+    all_days = 0
+    for c in pool:
+        all_days |= c.days
+    day_bits = [1 << i for i in range(len(ALLOWED_DAYS)) if all_days >> i & 1]
+    plans: list[tuple[float, int, list[Candidate]]] = []
+    for size in range(1, len(day_bits) + 1):
+        for combo in combinations(day_bits, size):
+            mask = sum(combo)
+            inside = [c for c in pool if not c.days & ~mask]
+            if not inside:
+                continue
+            bound = sum(c.weight for c in inside[:max_courses]) - day_weight * size
+            plans.append((bound, size, inside))
+    plans.sort(key=lambda p: (-p[0], p[1]))
+    for bound, size, inside in plans:
+        if bound <= search.threshold or search.exhausted:
+            continue
+        search.run(inside, day_weight * size)
+
+    selections: list[Selection] = []
+    for rank, (_, chosen, _) in enumerate(search.kept):
+        if rank and not chosen:
+            continue
+        chosen = sorted(chosen, key=lambda c: c.order)
+        used_days = 0
+        for c in chosen:
+            used_days |= c.days
+        score = sum(c.weight for c in chosen) - day_weight * used_days.bit_count()
+        selections.append(
+            Selection(candidates=chosen, score=round(score, 4), optimal=not search.exhausted, nodes=search.nodes)
+        )
+    selections.sort(key=lambda sel: -sel.score)
+    return selections
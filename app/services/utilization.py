@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..models import Assignment, Plan, Room, Tenant, Timeslot
+from .plans import plan_members, plan_scope
+from .scheduler.calendar_rules import compute_period
+
+UNSPECIFIED = "미지정"  # rooms without building/floor
+
+# tenant_id -> (plan_id, catalog, rollup): skips re-reading the JSON column on every poll
+_CACHE: dict[int, tuple[Optional[int], list, dict]] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _catalog(db: Session, tenant_id: int) -> list:
+    room_count, room_max = db.execute(
+        select(func.count(Room.id), func.max(Room.id)).where(Room.tenant_id == tenant_id)
+    ).one()
+    slot_count, slot_max = db.execute(
+        select(func.count(Timeslot.id), func.max(Timeslot.id)).where(Timeslot.tenant_id == tenant_id)
+    ).one()
+    return [room_count, room_max, slot_count, slot_max]
+
+
+def _period_key(start: str, end: str) -> str:
+    period = compute_period(start, end)
+    return str(period) if period is not None else start
+
+
+def _node(room_count: int, total_slots: int) -> dict[str, Any]:
+    return {"room_count": room_count, "cells": room_count * total_slots, "occupied": 0, "by_day": {}}
+
+
+def _bump(node: dict, day: str, period: str) -> None:
+    node["occupied"] += 1
+    periods = node["by_day"].setdefault(day, {})
+    periods[period] = periods.get(period, 0) + 1
+
+
+def _finish(node: dict) -> None:
+    node["utilization"] = round(node["occupied"] / max(1, node["cells"]), 4)
+
+
+def build_rollup(db: Session, tenant_id: int, cells: Iterable[tuple[Optional[int], Optional[int]]]) -> dict[str, Any]:
+    """Aggregate (room_id, timeslot_id) cells into building → floor → room → day → period counts.
+
+    Only the room/timeslot catalog is read; the cells come from the caller (the rows being
+    published), so assignments are never scanned. A cell shared by several rows counts once.
+    """
+    rooms = db.execute(
+        select(Room.id, Room.name, Room.building, Room.floor).where(Room.tenant_id == tenant_id)
+    ).all()
+    slots = {
+        s.id: (s.day, _period_key(s.start, s.end))
+        for s in db.execute(
+            select(Timeslot.id, Timeslot.day, Timeslot.start, Timeslot.end).where(Timeslot.tenant_id == tenant_id)
+        )
+    }
+    total_slots = len(slots)
+
+    per_building: dict[str, int] = {}
+    per_floor: dict[tuple[str, str], int] = {}
+    for r in rooms:
+        b, f = r.building or UNSPECIFIED, r.floor or UNSPECIFIED
+        per_building[b] = per_building.get(b, 0) + 1
+        per_floor[(b, f)] = per_floor.get((b, f), 0) + 1
+
+    root = _node(len(rooms), total_slots)
+    root["buildings"] = {}
+    room_nodes: dict[int, tuple[dict, dict, dict]] = {}
+    for r in sorted(rooms, key=lambda r: (r.building or "", r.floor or "", r.name or "")):
+        b, f = r.building or UNSPECIFIED, r.floor or UNSPECIFIED
+        building = root["buildings"].get(b)
+        if building is None:
+            building = root["buildings"][b] = {**_node(per_building[b], total_slots), "floors": {}}
+        floor = building["floors"].get(f)
+        if floor is None:
+            floor = building["floors"][f] = {**_node(per_floor[(b, f)], total_slots), "rooms": {}}
+        room = floor["rooms"][str(r.id)] = {"name": r.name, **_node(1, total_slots)}
+        room_nodes[r.id] = (building, floor, room)
+
+    for room_id, slot_id in {(room_id, slot_id) for room_id, slot_id in cells}:
+        nodes = room_nodes.get(room_id)
+        slot = slots.get(slot_id)
+        if nodes is None or slot is None:
+            continue
+        for node in (root, *nodes):
+            _bump(node, *slot)
+
+    _finish(root)
+    for building in root["buildings"].values():
+        _finish(building)
+        for floor in building["floors"].values():
+            _finish(floor)
+            for room in floor["rooms"].values():
+                _finish(room)
+    root["total_timeslots"] = total_slots
+    root["catalog"] = [len(rooms), max((r.id for r in rooms), default=None), total_slots, max(slots, default=None)]
+    root["computed_at"] = datetime.utcnow().isoformat() + "Z"
+    return root
+
+
+def _plan_cells(db: Session, tenant_id: int, clause) -> list[tuple[int, int]]:
+    return db.execute(
+        select(Assignment.room_id, Assignment.timeslot_id).where(
+            Assignment.tenant_id == tenant_id,
+            clause,
+            Assignment.room_id.isnot(None),
+            Assignment.timeslot_id.isnot(None),
+        )
+    ).all()
+
+
+def get_rollup(db: Session, tenant: Tenant) -> dict[str, Any]:
+    """Rollup of the tenant's active plan.
+
+    Normally this is the copy stored on the plan at publish time. When the plan has none or
+    rooms/timeslots were added or removed since, it is recomputed in memory and only cached in
+    this process; reads never write to the database.
+    """
+    catalog = _catalog(db, tenant.id)
+    plan_id = tenant.active_plan_id
+    with _CACHE_LOCK:
+        cached = _CACHE.get(tenant.id)
+    if cached is not None and cached[0] == plan_id and cached[1] == catalog:
+        return cached[2]
+
+    rollup = db.execute(select(Plan.rollup).where(Plan.id == plan_id)).scalar_one_or_none() if plan_id else None
+    if rollup is None or rollup.get("catalog") != catalog:
+        rollup = build_rollup(db, tenant.id, _plan_cells(db, tenant.id, plan_scope(tenant)))
+    with _CACHE_LOCK:
+        _CACHE[tenant.id] = (plan_id, catalog, rollup)
+    return rollup
+
+
+def backfill_rollups(db: Session) -> int:
+    """Store rollups on kept plans that predate them (run once at startup, not per request)."""
+    missing = db.execute(select(Plan).where(Plan.rollup.is_(None), Plan.status != "staging")).scalars().all()
+    for plan in missing:
+        plan.rollup = build_rollup(db, plan.tenant_id, _plan_cells(db, plan.tenant_id, plan_members(plan.id)))
+    if missing:
+        db.commit()
+    return len(missing)
+
+
+def invalidate_rollup(tenant_id: int) -> None:
+    with _CACHE_LOCK:
+        _CACHE.pop(tenant_id, None)
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
+from ..config import get_settings
+from ..db import SessionLocal
+from ..models import Tenant
+from .occupancy import DAY_MINUTES, format_minutes, get_occupancy, weekday_code
+
+logger = logging.getLogger(__name__)
+
+_QUEUE_SIZE = 32  # frames buffered per client before it is dropped (EventSource reconnects)
+_RETRY_MIN, _RETRY_MAX = 1.0, 30.0  # seconds between attempts after a failed refresh (doubling)
+
+
+def _frame(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+def _live_state(tenant_id: int, building: Optional[str]) -> tuple[Optional[dict[str, Any]], float]:
+    """Current period occupancy for one (tenant, building) plus seconds until the next period boundary."""
+    now = datetime.now()
+    with SessionLocal() as db:
+        tenant = db.get(Tenant, tenant_id)
+        if tenant is None:
+            return None, get_settings().vacancy_stream_poll
+        matrix = get_occupancy(db, tenant)
+        plan_id = tenant.active_plan_id
+    day = weekday_code(now.date())
+    now_min = now.hour * 60 + now.minute
+    today = [matrix.slots[i] for i in matrix.day_slots.get(day, [])]
+    live = [s for s in today if s.start_min <= now_min < s.end_min]
+    room_mask = matrix.room_mask(building)
+    occupied = matrix.occupied_mask(s.id for s in live) & room_mask
+    total = room_mask.bit_count()
+    count = occupied.bit_count()
+    period = None
+    if live:
+        period = {"start": format_minutes(min(s.start_min for s in live)), "end": format_minutes(max(s.end_min for s in live))}
+    state = {
+        "plan_id": plan_id,
+        "day": day,
+        "period": period,
+        "total_rooms": total,
+        "occupied_rooms": count,
+        "vacant_rooms": total - count,
+        "utilization_ratio": round(count / max(1, total), 4),
+        "rooms": {str(r.id): r.name for r in matrix.rooms_in(room_mask)},
+        "occupied": sorted(r.id for r in matrix.rooms_in(occupied)),
+    }
+    boundary = min((m for s in today for m in (s.start_min, s.end_min) if m > now_min), default=DAY_MINUTES)
+    wait = boundary * 60 - (now_min * 60 + now.second + now.microsecond / 1e6)
+    return state, max(0.0, wait)
+
+
+def _delta(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    delta = {
+        key: value
+        for key, value in new.items()
+        if key not in ("rooms", "occupied") and old.get(key) != value
+    }
+    before, after = set(old["occupied"]), set(new["occupied"])
+    if after - before:
+        delta["taken"] = sorted(after - before)
+    if before - after:
+        delta["freed"] = sorted(before - after)
+    return delta
+
+
+@dataclass
+class _Hub:
+    """One live computation per (tenant, building), fanned out to every connected client."""
+
+    tenant_id: int
+    building: Optional[str]
+    loop: asyncio.AbstractEventLoop
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    clients: set[asyncio.Queue] = field(default_factory=set)
+    state: Optional[dict[str, Any]] = None
+    snapshot: Optional[str] = None  # encoded once, replayed to clients that join later
+    task: Optional[asyncio.Task] = None
+
+    def broadcast(self, frame: str) -> None:
+        for client in list(self.clients):
+            try:
+                client.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Too slow to keep up: end its stream so it reconnects and gets a fresh snapshot
+                self.clients.discard(client)
+                client.get_nowait()
+                client.put_nowait(None)
+
+    async def run(self) -> None:
+        try:
+            await self._refresh_loop()
+        finally:
+            # However the loop ends, never leave a dead hub registered: clients end their
+            # stream (EventSource reconnects) and the next subscriber starts a fresh hub
+            with _HUBS_LOCK:
+                if _HUBS.get((self.tenant_id, self.building)) is self:
+                    del _HUBS[(self.tenant_id, self.building)]
+                clients, self.clients = list(self.clients), set()
+            for client in clients:
+                while True:
+                    try:
+                        client.put_nowait(None)
+                        break
+                    except asyncio.QueueFull:
+                        client.get_nowait()
+
+    async def _refresh_loop(self) -> None:
+        settings = get_settings()
+        retry = _RETRY_MIN
+        while True:
+            try:
+                state, until_boundary = await asyncio.to_thread(_live_state, self.tenant_id, self.building)
+            except Exception:
+                # e.g. database locked/unavailable: keep the hub and its clients, try again later
+                logger.exception(
+                    "Vacancy stream refresh failed (tenant %s, building %s); retrying in %.0fs",
+                    self.tenant_id,
+                    self.building,
+                    retry,
+                )
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, _RETRY_MAX)
+                continue
+            retry = _RETRY_MIN
+            if state is not None:
+                if self.state is None or state["rooms"] != self.state["rooms"]:
+                    self.snapshot = _frame("snapshot", state)
+                    self.broadcast(self.snapshot)
+                else:
+                    delta = _delta(self.state, state)
+                    if delta:
+                        self.snapshot = _frame("snapshot", state)
+                        self.broadcast(_frame("delta", delta))
+                self.state = state
+            self.wake.clear()
+            try:
+                # +50ms so the recompute lands inside the new period
+                await asyncio.wait_for(self.wake.wait(), timeout=min(until_boundary + 0.05, settings.vacancy_stream_poll))
+            except asyncio.TimeoutError:
+                pass
+
+
+# (tenant_id, building) -> hub; touched from the event loop and from job worker threads
+_HUBS: dict[tuple[int, Optional[str]], _Hub] = {}
+_HUBS_LOCK = threading.Lock()
+
+
+async def subscribe(tenant_id: int, building: Optional[str] = None) -> AsyncIterator[str]:
+    """SSE frames for one client: a ``snapshot`` first, then ``delta`` frames as things change."""
+    key = (tenant_id, building)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+    with _HUBS_LOCK:
+        hub = _HUBS.get(key)
+        if hub is None:
+            hub = _HUBS[key] = _Hub(tenant_id=tenant_id, building=building, loop=asyncio.get_running_loop())
+            hub.task = asyncio.create_task(hub.run())
+        hub.clients.add(queue)
+        if hub.snapshot is not None:
+            queue.put_nowait(hub.snapshot)
+    heartbeat = get_settings().vacancy_stream_heartbeat
+    try:
+        while True:
+            try:
+                frame = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if frame is None:
+                return
+            yield frame
+    finally:
+        with _HUBS_LOCK:
+            hub.clients.discard(queue)
+            if not hub.clients and _HUBS.get(key) is hub:
+                del _HUBS[key]
+                hub.task.cancel()
+
+
+def notify_plan_change(tenant_id: int) -> None:
+    """Wake the tenant's hubs right away after a publish/rollback (safe from any thread)."""
+    with _HUBS_LOCK:
+        hubs = [hub for (tid, _), hub in _HUBS.items() if tid == tenant_id]
+    for hub in hubs:
+        try:
+            hub.loop.call_soon_threadsafe(hub.wake.set)
+        except RuntimeError:  # loop already closed
+            pass
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import os
+
+# Never touch dev.db from the test run: app.db builds its engine from this at import time
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db import Base
+from app.models import Course, Room, Tenant, Timeslot  # registers every table on Base.metadata
+
+
+@pytest.fixture()
+def session_factory():
+    """sessionmaker over a fresh in-memory database with the full schema, one per test.
+
+    Services that open their own sessions (``SessionLocal``) can be pointed at it with
+    ``monkeypatch``.
+    """
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    try:
+        yield sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture()
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture()
+def campus(db):
+    """Tenant with 6 courses, 3 rooms and 6 slots; returns (tenant, course ids, room ids, slot ids)."""
+    tenant = Tenant(name="테스트대학")
+    db.add(tenant)
+    db.flush()
+    courses = [Course(tenant_id=tenant.id, code=f"C{i}", name=f"과목{i}") for i in range(6)]
+    rooms = [Room(tenant_id=tenant.id, name=f"R{i}") for i in range(3)]
+    slots = [Timeslot(tenant_id=tenant.id, day="Mon", start=f"{9 + i:02d}:00", end=f"{10 + i:02d}:00") for i in range(6)]
+    db.add_all(courses + rooms + slots)
+    db.commit()
+    return tenant, [c.id for c in courses], [r.id for r in rooms], [s.id for s in slots]
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app import db as app_db
+from app.models import ApiKey
+from app.services import auth
+from app.services.auth import flush_api_key_usage, pending_last_used, touch_api_key
+
+T0 = datetime(2026, 3, 2, 9, 0)
+
+
+class _Running:
+    """Stands in for the flusher thread so tests flush by hand."""
+
+    def is_alive(self) -> bool:
+        return True
+
+
+@pytest.fixture()
+def keys(db, campus, session_factory, monkeypatch):
+    monkeypatch.setattr(app_db, "SessionLocal", session_factory)
+    monkeypatch.setattr(auth, "_FLUSHER", _Running())
+    auth._LAST_USED.clear()
+    rows = [ApiKey(tenant_id=campus[0].id, name=f"k{i}", key_prefix=f"pk_{i}", key_hash="x") for i in range(3)]
+    db.add_all(rows)
+    db.commit()
+    yield [row.id for row in rows]
+    auth._LAST_USED.clear()
+
+
+def _last_used(db) -> dict[int, datetime]:
+    db.expire_all()
+    return dict(db.execute(select(ApiKey.id, ApiKey.last_used_at)).all())
+
+
+def test_touches_are_buffered_until_flushed(db, keys):
+    a, b, c = keys
+    touch_api_key(a, T0)
+    touch_api_key(a, T0 + timedelta(seconds=5))
+    touch_api_key(b, T0)
+    assert pending_last_used(a) == T0 + timedelta(seconds=5)
+    assert _last_used(db) == {a: None, b: None, c: None}
+
+    assert flush_api_key_usage() == 2
+    assert _last_used(db) == {a: T0 + timedelta(seconds=5), b: T0, c: None}
+    assert pending_last_used(a) is None
+    assert flush_api_key_usage() == 0
+
+
+def test_key_deleted_between_touch_and_flush_is_dropped(db, keys):
+    a, b, _ = keys
+    touch_api_key(a, T0)
+    touch_api_key(b, T0)
+    db.delete(db.get(ApiKey, a))
+    db.commit()
+
+    flush_api_key_usage()
+    assert _last_used(db)[b] == T0
+    # nothing re-queued: the next flush has no work
+    assert pending_last_used(a) is None
+    assert flush_api_key_usage() == 0
+
+
+def test_failed_flush_requeues_without_overwriting_newer_touches(db, keys, monkeypatch):
+    a, b, _ = keys
+    touch_api_key(a, T0)
+    touch_api_key(b, T0)
+
+    def broken():
+        touch_api_key(a, T0 + timedelta(minutes=1))  # a request lands while the flush runs
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(app_db, "SessionLocal", broken)
+    with pytest.raises(RuntimeError):
+        flush_api_key_usage()
+    assert pending_last_used(a) == T0 + timedelta(minutes=1)
+    assert pending_last_used(b) == T0
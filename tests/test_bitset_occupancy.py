@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import random
+
+from app.services.scheduler.occupancy import BitsetOccupancy
+
+SLOTS = [1, 2, 3, 4, 5, 6]
+BLOCKS = [[1, 2], [2, 3], [3, 4], [5, 6], [6]]
+
+
+def test_occupy_blocks_overlapping_blocks_only():
+    occ = BitsetOccupancy(SLOTS, BLOCKS)
+    occ.occupy("r1", 0)
+    assert not occ.is_free("r1", 0)
+    assert not occ.is_free("r1", 1)  # shares slot 2
+    assert occ.is_free("r1", 2)
+    assert occ.is_free("r2", 0)  # other resources are untouched
+    assert occ.first_free_block("r1") == 2
+    assert occ.free_blocks("r1") == 0b11100
+
+
+def test_free_blocks_intersects_every_key():
+    occ = BitsetOccupancy(SLOTS, BLOCKS)
+    occ.occupy("room", 2)
+    occ.occupy("cohort", 3)
+    assert occ.free_blocks("room", "cohort") == 0b00001
+    assert occ.first_free_block("room", "cohort") == 0
+    occ.occupy("course", 0)
+    assert occ.first_free_block("room", "cohort", "course") is None
+
+
+def test_occupy_slots_ignores_unknown_slots():
+    occ = BitsetOccupancy(SLOTS, BLOCKS)
+    occ.occupy_slots("r", [99])
+    assert occ.used_mask("r") == 0
+    occ.occupy_slots("r", [6, 99])
+    assert occ.used_mask("r") == occ.slot_mask([6])
+    assert [b for b in range(len(BLOCKS)) if occ.is_free("r", b)] == [0, 1, 2]
+    assert occ.first_free_block("r") == 0
+
+
+def test_matches_set_based_reference():
+    rng = random.Random(7)
+    slots = list(range(100, 130))
+    blocks = [rng.sample(slots, rng.randint(1, 3)) for _ in range(40)]
+    occ = BitsetOccupancy(slots, blocks)
+    used: dict[str, set[int]] = {}
+    for _ in range(60):
+        key = rng.choice("abc")
+        if rng.random() < 0.7:
+            b = rng.randrange(len(blocks))
+            occ.occupy(key, b)
+            used.setdefault(key, set()).update(blocks[b])
+        else:
+            extra = rng.sample(slots, 2)
+            occ.occupy_slots(key, extra)
+            used.setdefault(key, set()).update(extra)
+        keys = rng.sample("abc", rng.randint(1, 3))
+        taken = set().union(*(used.get(k, set()) for k in keys))
+        expected = [b for b, block in enumerate(blocks) if not taken & set(block)]
+        free = occ.free_blocks(*keys)
+        assert [b for b in range(len(blocks)) if free >> b & 1] == expected
+        assert occ.first_free_block(*keys) == (expected[0] if expected else None)
+        for b in range(len(blocks)):
+            assert occ.is_free(key, b) == (not used[key] & set(blocks[b]))
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+
+from app.models import Enrollment
+from app.services import co_enrollment
+from app.services.co_enrollment import CoEnrollmentIndex
+
+COURSES = [10, 11, 12, 13]
+
+
+def _enroll(db, *pairs: tuple[int, int]) -> None:
+    for student_id, course_id in pairs:
+        db.add(Enrollment(tenant_id=1, student_id=student_id, course_id=course_id))
+    db.commit()
+
+
+def _snapshot(index: CoEnrollmentIndex) -> dict[int, tuple[int, dict[int, int]]]:
+    return {cid: (index.count(cid), index.row(cid)) for cid in COURSES}
+
+
+def test_catch_up_matches_a_full_build(db):
+    _enroll(db, (1, 10), (1, 11), (2, 10), (2, 12))
+    index = CoEnrollmentIndex.build(db, tenant_id=1)
+    assert index.row(10) == {11: 1, 12: 1}
+
+    # new courses for known students, a new student, and a duplicate row of an old enrollment
+    _enroll(db, (1, 12), (3, 13), (3, 10), (2, 10))
+    assert index.catch_up(db) == 4
+    assert index.catch_up(db) == 0
+    assert _snapshot(index) == _snapshot(CoEnrollmentIndex.build(db, tenant_id=1))
+    assert index.count(10) == 3
+    assert index.row(12) == {10: 2, 11: 1}
+
+
+def test_compacted_folds_the_overlay(db):
+    _enroll(db, (1, 10), (1, 11))
+    index = CoEnrollmentIndex.build(db, tenant_id=1)
+    _enroll(db, (2, 11), (2, 13), (1, 13))
+    index.catch_up(db)
+    compacted = index.compacted()
+    assert compacted._extra_size == 0
+    assert compacted.watermark == index.watermark
+    assert _snapshot(compacted) == _snapshot(index)
+    assert _snapshot(compacted) == _snapshot(CoEnrollmentIndex.build(db, tenant_id=1))
+    assert compacted.similar([10]) == index.similar([10])
+
+    roundtrip = CoEnrollmentIndex.from_payload(1, compacted.watermark, compacted.to_payload())
+    assert _snapshot(roundtrip) == _snapshot(compacted)
+
+
+@pytest.fixture()
+def fresh_indexes():
+    co_enrollment._INDEXES.clear()
+    yield
+    co_enrollment._INDEXES.clear()
+
+
+def test_dropped_enrollments_are_not_counted(db):
+    _enroll(db, (1, 10), (1, 11), (2, 10))
+    db.add(Enrollment(tenant_id=1, student_id=2, course_id=11, status="dropped"))
+    db.commit()
+    index = CoEnrollmentIndex.build(db, tenant_id=1)
+    assert index.count(11) == 1 and index.row(10) == {11: 1}
+
+    # new dropped rows move the watermark but add nothing
+    db.add(Enrollment(tenant_id=1, student_id=3, course_id=10, status="dropped"))
+    _enroll(db, (3, 12))
+    assert index.catch_up(db) == 1
+    assert not index.stale(db)
+    assert _snapshot(index) == _snapshot(CoEnrollmentIndex.build(db, tenant_id=1))
+
+
+def test_removals_below_the_watermark_make_the_index_stale(db):
+    _enroll(db, (1, 10), (1, 11), (2, 10), (2, 11))
+    index = CoEnrollmentIndex.build(db, tenant_id=1)
+    _enroll(db, (3, 10))
+    index.catch_up(db)
+    assert not index.stale(db)
+
+    dropped = db.execute(select(Enrollment).where(Enrollment.student_id == 2, Enrollment.course_id == 11)).scalar_one()
+    dropped.status = "dropped"
+    db.commit()
+    assert index.stale(db)
+    dropped.status = "enrolled"  # re-activated: back in sync
+    db.commit()
+    assert not index.stale(db)
+
+    db.delete(dropped)
+    db.commit()
+    assert index.stale(db)
+
+
+def test_get_co_enrollment_rebuilds_after_a_drop(db, fresh_indexes, monkeypatch):
+    _enroll(db, (1, 10), (1, 11), (2, 10), (2, 11))
+    first = co_enrollment.get_co_enrollment(db, 1)
+    assert first.row(10) == {11: 2}
+
+    dropped = db.execute(select(Enrollment).where(Enrollment.student_id == 2, Enrollment.course_id == 11)).scalar_one()
+    dropped.status = "dropped"
+    db.commit()
+    # within VERIFY_EVERY of the last check the drop is not looked for yet
+    assert co_enrollment.get_co_enrollment(db, 1) is first
+    monkeypatch.setattr(co_enrollment, "VERIFY_EVERY", 0.0)
+    rebuilt = co_enrollment.get_co_enrollment(db, 1)
+    assert rebuilt is not first
+    assert rebuilt.row(10) == {11: 1} and rebuilt.count(11) == 1
+
+
+def test_snapshot_keeps_the_active_checksum(db):
+    _enroll(db, (1, 10), (1, 11))
+    index = CoEnrollmentIndex.build(db, tenant_id=1)
+    roundtrip = CoEnrollmentIndex.from_payload(1, index.watermark, index.to_payload())
+    assert roundtrip.active == index.active
+    assert not roundtrip.stale(db)
+
+    # snapshots persisted before the checksum existed are rebuilt on first use
+    legacy = CoEnrollmentIndex(1, index.watermark, index.course_ids, index.counts, index.indptr, index.indices, index.data)
+    assert legacy.stale(db)
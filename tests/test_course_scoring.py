@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.models import Course, CourseReview, CourseStats
+from app.services import course_scoring
+from app.services.course_scoring import get_course_features, score_courses
+from app.services.course_stats import rebuild_course_stats, record_enrollment, record_review
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    course_scoring.invalidate_course_features(None)
+    yield
+    course_scoring.invalidate_course_features(None)
+
+
+def _review(db, tenant_id, course_id, overall):
+    review = CourseReview(tenant_id=tenant_id, course_id=course_id, rating_overall=overall)
+    db.add(review)
+    db.flush()
+    record_review(db, review)
+    db.commit()
+
+
+def _at(features, course_id):
+    return features.positions([course_id])[0]
+
+
+def test_stats_changes_patch_a_copy_without_reloading(db, campus):
+    tenant, cs, _, _ = campus
+    _review(db, tenant.id, cs[0], 4)
+    before = get_course_features(db, tenant.id)
+    assert get_course_features(db, tenant.id) is before
+    assert before.avg_rating[_at(before, cs[0])] == 4.0
+
+    _review(db, tenant.id, cs[0], 2)
+    record_enrollment(db, tenant.id, cs[3], None, "enrolled", created=True)
+    db.commit()
+    after = get_course_features(db, tenant.id)
+    assert after is not before
+    # catalog columns are shared, not rebuilt
+    assert after.ids is before.ids and after.codes is before.codes and after.expected is before.expected
+    assert after.avg_rating[_at(after, cs[0])] == 3.0
+    assert after.review_count[_at(after, cs[0])] == 2
+    assert after.enrollments[_at(after, cs[3])] == 1.0
+    # the copy readers already hold is untouched
+    assert before.avg_rating[_at(before, cs[0])] == 4.0
+    assert before.enrollments[_at(before, cs[3])] == 0.0
+
+
+def test_late_commit_inside_the_slack_window_is_picked_up(db, campus):
+    tenant, cs, _, _ = campus
+    _review(db, tenant.id, cs[0], 5)
+    _review(db, tenant.id, cs[1], 5)
+    features = get_course_features(db, tenant.id)
+    # a writer stamped updated_at before the newest row we saw, and committed after our read
+    db.execute(
+        update(CourseStats)
+        .where(CourseStats.course_id == cs[1])
+        .values(rating_sum=6, rating_count=2, review_count=2, updated_at=features.stats_seen - timedelta(seconds=1))
+    )
+    db.commit()
+    assert get_course_features(db, tenant.id).avg_rating[_at(features, cs[1])] == 3.0
+
+
+def test_catalog_changes_rebuild(db, campus):
+    tenant, cs, _, _ = campus
+    before = get_course_features(db, tenant.id)
+    db.add(Course(tenant_id=tenant.id, code="NEW", name="신설과목", expected_enrollment=40))
+    db.commit()
+    after = get_course_features(db, tenant.id)
+    assert len(after) == len(before) + 1
+    assert after.ids is not before.ids
+
+    db.execute(update(Course).where(Course.id == cs[0]).values(expected_enrollment=99))
+    db.commit()
+    assert get_course_features(db, tenant.id).expected[_at(after, cs[0])] == 99.0
+
+
+def test_rebuild_drops_stats_rows_from_the_cache(db, campus):
+    tenant, cs, _, _ = campus
+    record_enrollment(db, tenant.id, cs[2], None, "enrolled", created=True)
+    db.commit()
+    features = get_course_features(db, tenant.id)
+    assert features.enrollments[_at(features, cs[2])] == 1.0
+    # there is no Enrollment row behind that counter, so a rebuild removes the stats row
+    rebuild_course_stats(db, tenant.id)
+    features = get_course_features(db, tenant.id)
+    assert features.enrollments[_at(features, cs[2])] == 0.0
+
+
+def test_numpy_and_python_scoring_agree(db, campus, monkeypatch):
+    tenant, cs, _, _ = campus
+    db.execute(update(Course).where(Course.id.in_(cs[:3])).values(cohort="간호학과 1"))
+    db.execute(update(Course).where(Course.id == cs[4]).values(expected_enrollment=50))
+    db.commit()
+    for course_id, rating in [(cs[0], 5), (cs[1], 3), (cs[5], 4)]:
+        _review(db, tenant.id, course_id, rating)
+    features = get_course_features(db, tenant.id)
+    kwargs = dict(major="간호학과", exclude_ids=[cs[1]], limit=4, popularity=True, co_enrollment={cs[3]: 0.5})
+    fast = score_courses(features, **kwargs)
+
+    plain = course_scoring.CourseFeatures(
+        version=features.version,
+        ids=[int(i) for i in features.ids],
+        codes=features.codes,
+        names=features.names,
+        cohorts=features.cohorts,
+        avg_rating=[float(v) for v in features.avg_rating],
+        review_count=[int(v) for v in features.review_count],
+        expected=[float(v) for v in features.expected],
+        enrollments=[float(v) for v in features.enrollments],
+    )
+    monkeypatch.setattr(course_scoring, "np", None)
+    slow = score_courses(plain, **kwargs)
+    assert [(s.position, s.score, s.major_match) for s in fast] == [(s.position, s.score, s.major_match) for s in slow]
+    # 5★+major 3.8, 4★ 2.4, major 0.8, then the 0.5 tie (co-enrollment vs size) in id order
+    assert [int(features.ids[s.position]) for s in fast] == [cs[0], cs[5], cs[2], cs[3]]
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from app.services.course_search import CourseSearchIndex
+
+
+def _index() -> CourseSearchIndex:
+    index = CourseSearchIndex(tenant_id=1)
+    index.upsert(1, "NUR101", "간호관리학", "간호학과", "1")
+    index.upsert(2, "NUR102", "간호관리학실습", "간호학과", "2")
+    index.upsert(3, "CS100", "자료구조", "컴퓨터공학과", "1")
+    index.upsert(4, "NUR1011", "기본간호학", "간호학과", "1")
+    return index
+
+
+def _ranked(index: CourseSearchIndex, query: str, **kw) -> list[tuple[int, str]]:
+    return [(hit["course_id"], hit["match"]) for hit in index.search(query, **kw)]
+
+
+def test_exact_code_ranks_above_prefix_above_fuzzy():
+    # NUR102 shares 4 of the 5 bigrams of nur101
+    assert _ranked(_index(), "nur101") == [(1, "exact"), (4, "prefix"), (2, "fuzzy")]
+
+
+def test_ties_break_on_lower_id_and_heavier_fields_rank_first():
+    assert _ranked(_index(), "간호관리") == [(1, "prefix"), (2, "prefix")]
+    # every 간호학과 course is a prefix hit; 기본간호학 also has the bigrams in its (heavier) name
+    assert _ranked(_index(), "간호학") == [(4, "prefix"), (1, "prefix"), (2, "prefix")]
+    assert _ranked(_index(), "관리학") == [(1, "contains"), (2, "contains")]
+
+
+def test_fuzzy_needs_half_the_bigrams():
+    index = _index()
+    assert _ranked(index, "관리실습") == [(2, "fuzzy")]
+    assert _ranked(index, "관리실습", fuzzy=False) == []
+
+
+def test_limit_and_empty_query():
+    index = _index()
+    assert len(index.search("간호", limit=2)) == 2
+    assert index.search("   ") == []
+    assert index.search("간호", limit=0) == []
+
+
+def test_upsert_replaces_and_remove_drops():
+    index = _index()
+    index.upsert(3, "CS100", "자료구조", "간호학과", "1")
+    assert 3 in [hit["course_id"] for hit in index.search("간호학과")]
+    index.remove(1)
+    assert [hit["course_id"] for hit in index.search("nur101", fuzzy=False)] == [4]
+    assert index.course_id_for_code("nur101") is None
+    assert len(index) == 3
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+from sqlalchemy import select
+
+from app.models import CourseReview, CourseStats, Enrollment, Student
+from app.services.course_stats import course_stats_map, rebuild_course_stats, record_enrollment, record_review
+
+COLUMNS = [c.name for c in CourseStats.__table__.columns if c.name != "updated_at"]
+
+
+def _snapshot(db) -> dict[int, dict]:
+    db.expire_all()
+    return {
+        stats.course_id: {name: getattr(stats, name) or 0 for name in COLUMNS}
+        for stats in db.execute(select(CourseStats)).scalars()
+    }
+
+
+def _students(db, tenant_id, n):
+    students = [Student(tenant_id=tenant_id, name=f"학생{i}") for i in range(n)]
+    db.add_all(students)
+    db.flush()
+    return [s.id for s in students]
+
+
+def _review(db, tenant_id, course_id, overall=None, difficulty=None):
+    review = CourseReview(tenant_id=tenant_id, course_id=course_id, rating_overall=overall, rating_difficulty=difficulty)
+    db.add(review)
+    db.flush()
+    record_review(db, review)
+    db.commit()
+
+
+def _enroll(db, tenant_id, student_id, course_id, status="enrolled"):
+    enrollment = Enrollment(tenant_id=tenant_id, student_id=student_id, course_id=course_id, status=status)
+    db.add(enrollment)
+    db.flush()
+    record_enrollment(db, tenant_id, course_id, None, status, created=True)
+    db.commit()
+    return enrollment
+
+
+def _move(db, enrollment, status):
+    old = enrollment.status
+    enrollment.status = status
+    record_enrollment(db, enrollment.tenant_id, enrollment.course_id, old, status)
+    db.commit()
+
+
+def test_incremental_counters_match_a_rebuild(db, campus):
+    tenant, cs, _, _ = campus
+    s1, s2, s3 = _students(db, tenant.id, 3)
+    _review(db, tenant.id, cs[0], overall=5, difficulty=2)
+    _review(db, tenant.id, cs[0], overall=3)
+    _review(db, tenant.id, cs[1])
+    first = _enroll(db, tenant.id, s1, cs[0])
+    _enroll(db, tenant.id, s2, cs[0], status="waitlisted")
+    _enroll(db, tenant.id, s3, cs[1], status="requested")
+    _move(db, first, "dropped")
+    incremental = _snapshot(db)
+
+    stats = incremental[cs[0]]
+    assert (stats["review_count"], stats["rating_sum"], stats["rating_count"]) == (2, 8, 2)
+    assert (stats["difficulty_sum"], stats["difficulty_count"]) == (2, 1)
+    counts = {name: stats[f"{name}_count"] for name in ("enrollment", "enrolled", "dropped", "waitlisted")}
+    assert counts == {"enrollment": 2, "enrolled": 0, "dropped": 1, "waitlisted": 1}
+    assert course_stats_map(db, tenant.id)[cs[0]].avg_rating == 4.0
+
+    assert rebuild_course_stats(db, tenant.id) == 2
+    assert _snapshot(db) == incremental
+
+
+def test_unknown_status_only_moves_the_total(db, campus):
+    tenant, cs, _, _ = campus
+    (s1,) = _students(db, tenant.id, 1)
+    enrollment = _enroll(db, tenant.id, s1, cs[2], status="auditing")
+    stats = _snapshot(db)[cs[2]]
+    assert stats["enrollment_count"] == 1 and stats["enrolled_count"] == 0
+    _move(db, enrollment, "enrolled")
+    assert _snapshot(db)[cs[2]]["enrolled_count"] == 1
+    rebuild_course_stats(db, tenant.id)
+    assert _snapshot(db)[cs[2]]["enrolled_count"] == 1
+
+
+def test_course_stats_map_filters(db, campus):
+    tenant, cs, _, _ = campus
+    _review(db, tenant.id, cs[0], overall=4)
+    _review(db, tenant.id, cs[1], overall=2)
+    assert set(course_stats_map(db, tenant.id)) == {cs[0], cs[1]}
+    assert set(course_stats_map(db, tenant.id, [cs[1], cs[5]])) == {cs[1]}
+    assert course_stats_map(db, tenant.id, []) == {}
+    assert course_stats_map(db, tenant.id + 1) == {}
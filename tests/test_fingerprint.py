@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from app.services.scheduler.fingerprint import input_fingerprint
+from app.services.scheduler.types import CourseLite, RoomLite, SlotLite
+
+COURSES = [
+    CourseLite(id=1, tenant_id=1, code="A101", name="자료구조", hours_per_week=3, needs_lab=False, expected_enrollment=30),
+    CourseLite(id=2, tenant_id=1, code="B202", name="간호학", hours_per_week=2, needs_lab=True, expected_enrollment=20, cohort="1"),
+]
+ROOMS = [
+    RoomLite(id=1, tenant_id=1, name="101", type="lecture", capacity=40, building="본관"),
+    RoomLite(id=2, tenant_id=1, name="Lab", type="lab", capacity=25, building=None),
+]
+SLOTS = [
+    SlotLite(id=1, tenant_id=1, day="Mon", start="09:00", end="10:00", granularity=60, period=1),
+    SlotLite(id=2, tenant_id=1, day="Mon", start="10:00", end="11:00", granularity=60, period=2),
+]
+PARAMS = {"solver": "greedy", "time_limit": 10}
+
+
+def test_stable_under_row_order():
+    a = input_fingerprint(COURSES, ROOMS, SLOTS, PARAMS)
+    b = input_fingerprint(COURSES[::-1], ROOMS[::-1], SLOTS[::-1], dict(reversed(list(PARAMS.items()))))
+    assert a == b
+    assert len(a) == 64
+
+
+def test_changes_with_any_input():
+    base = input_fingerprint(COURSES, ROOMS, SLOTS, PARAMS)
+    renamed = [COURSES[0], CourseLite(**{**COURSES[1].__dict__, "expected_enrollment": 21})]
+    assert input_fingerprint(renamed, ROOMS, SLOTS, PARAMS) != base
+    assert input_fingerprint(COURSES, ROOMS[:1], SLOTS, PARAMS) != base
+    assert input_fingerprint(COURSES, ROOMS, SLOTS, {**PARAMS, "time_limit": 11}) != base
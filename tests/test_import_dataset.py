@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from sqlalchemy import select
+
+from app.models import Course
+from app.routers.import_dataset import _process_rows
+
+
+def _row(code: str, name: str, department: str = "간호학과", section: str = "1A") -> dict[str, str]:
+    return {"개설학과": department, "교과목코드": code, "교과목명": name, "수강분반": section, "건물명": "본관", "강의실명": "101"}
+
+
+def test_only_created_or_changed_courses_are_touched(db, campus):
+    tenant = campus[0]
+    rows = [_row("NUR101", "간호관리학"), _row("NUR102", "기본간호학")]
+    created, touched = _process_rows(db, tenant, rows)
+    db.commit()
+    assert created["courses"] == 2
+    ids = dict(db.execute(select(Course.code, Course.id).where(Course.code.in_(["NUR101", "NUR102"]))).all())
+    assert touched == set(ids.values())
+
+    # the same file again changes nothing
+    created, touched = _process_rows(db, tenant, rows)
+    assert created["courses"] == 0 and touched == set()
+
+    # a new cohort for one course, a new department for the other, a blank cell keeps the value
+    created, touched = _process_rows(
+        db, tenant, [_row("NUR101", "간호관리학", section="2B"), _row("NUR102", "기본간호학", department="보건학과")]
+    )
+    db.commit()
+    assert touched == {ids["NUR101"], ids["NUR102"]}
+    assert db.get(Course, ids["NUR101"]).cohort == "2-B"
+    assert db.get(Course, ids["NUR102"]).department == "보건학과"
+
+    _, touched = _process_rows(db, tenant, [_row("NUR101", "간호관리학", department="", section="2B")])
+    assert touched == set()
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from app.services.jobs import InMemoryJobQueue, JobCancelled
+
+WAIT = 5.0
+
+
+def _wait_for(predicate, timeout: float = WAIT) -> None:
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+class Gate:
+    """Job target that records its start and blocks until released."""
+
+    def __init__(self) -> None:
+        self.started: list[str] = []
+        self.release = threading.Event()
+
+    def __call__(self, job_id: str, params: dict) -> None:
+        self.started.append(params["name"])
+        self.release.wait(WAIT)
+
+
+def test_per_tenant_limit_keeps_fifo_order_for_other_tenants():
+    q = InMemoryJobQueue(max_workers=2, per_tenant_limit=1)
+    gate = Gate()
+    a = q.create(gate, {"name": "a"}, tenant_id=1)
+    b = q.create(gate, {"name": "b"}, tenant_id=1)
+    c = q.create(gate, {"name": "c"}, tenant_id=2)
+    _wait_for(lambda: len(gate.started) == 2)
+    # b waits for tenant 1's slot, c overtakes it on the free worker
+    assert gate.started == ["a", "c"]
+    assert q.get(b.id).status == "queued"
+    assert q.get(b.id).queue_position == 1
+    gate.release.set()
+    _wait_for(lambda: all(q.get(j.id).status == "completed" for j in (a, b, c)))
+    assert gate.started == ["a", "c", "b"]
+
+
+def test_cancel_queued_job_never_runs():
+    q = InMemoryJobQueue(max_workers=1)
+    gate = Gate()
+    first = q.create(gate, {"name": "first"})
+    second = q.create(gate, {"name": "second"})
+    _wait_for(lambda: gate.started == ["first"])
+    assert q.cancel(second.id)
+    assert not q.cancel(second.id)
+    gate.release.set()
+    _wait_for(lambda: q.get(first.id).status == "completed")
+    assert q.get(second.id).status == "cancelled"
+    assert gate.started == ["first"]
+
+
+def test_cancel_running_job_stops_at_next_check_and_drops_late_updates():
+    q = InMemoryJobQueue(max_workers=1)
+    seen: list[str] = []
+
+    def target(job_id: str, params: dict) -> None:
+        while True:
+            try:
+                q.check(job_id)
+            except JobCancelled:
+                seen.append("cancelled")
+                q.update(job_id, status="completed", score=1.0)
+                raise
+            time.sleep(0.01)
+
+    job = q.create(target)
+    _wait_for(lambda: q.get(job.id).status == "running")
+    assert q.cancel(job.id)
+    _wait_for(lambda: seen == ["cancelled"])
+    final = q.get(job.id)
+    assert final.status == "cancelled"
+    assert final.score is None
+
+
+def test_running_job_times_out():
+    q = InMemoryJobQueue(max_workers=1, job_timeout=0.2)
+
+    def target(job_id: str, params: dict) -> None:
+        while True:
+            q.check(job_id)
+            time.sleep(0.02)
+
+    job = q.create(target)
+    _wait_for(lambda: q.get(job.id).status == "timed_out")
+    with pytest.raises(JobCancelled):
+        q.check(job.id)
+
+
+def test_dedupe_key_returns_the_active_job_only():
+    q = InMemoryJobQueue(max_workers=1)
+    gate = Gate()
+    first = q.create(gate, {"name": "x"}, dedupe_key="k")
+    assert q.create(gate, {"name": "y"}, dedupe_key="k").id == first.id
+    assert q.create(gate, {"name": "z"}, dedupe_key="other").id != first.id
+    gate.release.set()
+    _wait_for(lambda: q.get(first.id).status == "completed")
+    assert q.create(gate, {"name": "again"}, dedupe_key="k").id != first.id
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.models import OptimizeJob
+from app.services import jobs
+from app.services.jobs import JobCancelled, SqlJobQueue
+
+CALLS: list[tuple[str, dict]] = []
+
+
+def record(job_id: str, params: dict) -> None:
+    CALLS.append((job_id, params))
+
+
+@pytest.fixture()
+def make_queue(session_factory, monkeypatch):
+    """SqlJobQueue instances over the test database, with workers left stopped so claims run inline."""
+    monkeypatch.setattr(jobs, "SessionLocal", session_factory)
+    CALLS.clear()
+
+    def make(**kwargs) -> SqlJobQueue:
+        q = SqlJobQueue(**kwargs)
+        monkeypatch.setattr(q, "start", lambda: None)
+        return q
+
+    return make
+
+
+def _create(q: SqlJobQueue, **kwargs):
+    job = q.create(record, kwargs.pop("params", {}), **kwargs)
+    time.sleep(0.002)  # distinct created_at, so FIFO order is deterministic
+    return job
+
+
+def test_target_must_be_module_level(make_queue):
+    q = make_queue()
+    with pytest.raises(ValueError):
+        q.create(lambda job_id, params: None)
+
+
+def test_job_is_claimed_exactly_once_across_queues(make_queue):
+    first, second = make_queue(), make_queue()
+    job = _create(first, params={"x": 1})
+    assert job.status == "queued" and job.queue_position == 1
+
+    row = second._claim_next()
+    assert row is not None and row.id == job.id
+    assert first._claim_next() is None
+    assert second._claim_next() is None
+
+    jobs._resolve_target(row.target)(row.id, row.params)
+    assert CALLS == [(job.id, {"x": 1})]
+    assert first.get(job.id).status == "running"
+
+
+def test_claim_honours_per_tenant_limit_in_fifo_order(make_queue):
+    q = make_queue(per_tenant_limit=1)
+    a = _create(q, tenant_id=1)
+    b = _create(q, tenant_id=1)
+    c = _create(q, tenant_id=2)
+    assert [q.get(j.id).queue_position for j in (a, b, c)] == [1, 2, 3]
+
+    assert q._claim_next().id == a.id
+    # tenant 1 is at its limit, so tenant 2's later job goes first
+    assert q._claim_next().id == c.id
+    assert q._claim_next() is None
+    assert q.get(b.id).queue_position == 1
+
+    q.update(a.id, status="completed")
+    assert q._claim_next().id == b.id
+
+
+def test_dedupe_key_returns_active_job_until_it_finishes(make_queue):
+    q = make_queue()
+    first = _create(q, dedupe_key="opt:1")
+    assert _create(q, dedupe_key="opt:1").id == first.id
+    assert _create(q, dedupe_key="opt:2").id != first.id
+
+    q._claim_next()
+    assert _create(q, dedupe_key="opt:1").id == first.id  # still running
+
+    q.update(first.id, status="completed", result={"ok": True})
+    again = _create(q, dedupe_key="opt:1")
+    assert again.id != first.id
+    assert q.result(first.id) == {"ok": True}
+
+
+def test_find_prefers_in_flight_then_latest_completed(make_queue):
+    q = make_queue()
+    done = _create(q, fingerprint="fp")
+    q.update(done.id, status="completed", result={"n": 1})
+    assert q.find("fp").id == done.id
+
+    pending = _create(q, fingerprint="fp")
+    assert q.find("fp").id == pending.id
+    assert q.find("missing") is None
+
+
+def test_cancel_queued_and_running_jobs(make_queue):
+    q = make_queue()
+    queued = _create(q)
+    running = _create(q)
+    q._claim_next()  # claims `queued`, the oldest
+    q.update(queued.id, status="completed")
+    assert q._claim_next().id == running.id
+
+    assert q.cancel(running.id)
+    assert not q.cancel(running.id)
+    with pytest.raises(JobCancelled):
+        q.check(running.id)
+    # a late write from the cancelled target is dropped
+    q.update(running.id, status="completed", score=3.0)
+    final = q.get(running.id)
+    assert final.status == "cancelled" and final.score is None
+
+
+def _backdate_start(session_factory, job_id: str, seconds: float) -> None:
+    with session_factory() as s:
+        s.execute(
+            update(OptimizeJob)
+            .where(OptimizeJob.id == job_id)
+            .values(started_at=datetime.utcnow() - timedelta(seconds=seconds))
+        )
+        s.commit()
+
+
+def test_get_is_read_only_and_sweep_applies_timeouts(make_queue, session_factory):
+    q = make_queue()
+    job = _create(q, timeout=5)
+    q._claim_next()
+    _backdate_start(session_factory, job.id, 60)
+
+    assert q.get(job.id).status == "running"
+    q._sweep()
+    swept = q.get(job.id)
+    assert swept.status == "timed_out" and swept.finished_at is not None
+
+
+def test_check_times_out_the_running_job(make_queue, session_factory):
+    q = make_queue()
+    job = _create(q, timeout=5)
+    q._claim_next()
+    q.check(job.id)
+
+    _backdate_start(session_factory, job.id, 60)
+    with pytest.raises(JobCancelled):
+        q.check(job.id)
+    assert q.get(job.id).status == "timed_out"
+
+
+def test_sweep_evicts_finished_jobs_after_ttl(make_queue, session_factory):
+    q = make_queue(ttl_seconds=10)
+    old = _create(q)
+    fresh = _create(q)
+    q.update(old.id, status="completed")
+    q.update(fresh.id, status="completed")
+    with session_factory() as s:
+        s.execute(
+            update(OptimizeJob)
+            .where(OptimizeJob.id == old.id)
+            .values(finished_at=datetime.utcnow() - timedelta(seconds=60))
+        )
+        s.commit()
+
+    q._sweep()
+    assert q.get(old.id) is None
+    assert q.get(fresh.id).status == "completed"
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+import pytest
+
+from app.services import occupancy, plans
+from app.services.occupancy import OccupancyMatrix, RoomInfo, SlotInfo, _merge
+from app.services.scheduler.types import AssignmentLite
+
+
+MONDAY = date(2025, 9, 1)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    occupancy._MATRICES.clear()
+    yield
+    occupancy._MATRICES.clear()
+
+
+def test_merge_joins_overlapping_and_touching_intervals():
+    assert _merge([(600, 660), (540, 600), (650, 700), (800, 900)]) == ([540, 800], [700, 900])
+    assert _merge([(10, 10), (30, 20)]) == ([], [])
+    assert _merge([(0, 100), (10, 20)]) == ([0], [100])
+
+
+def _matrix(blackouts=None) -> OccupancyMatrix:
+    slots = [
+        SlotInfo(10, "Mon", "09:00", "10:00", 540, 600),
+        SlotInfo(11, "Mon", "10:00", "11:00", 600, 660),
+        SlotInfo(12, "Mon", "13:00", "14:00", 780, 840),
+    ]
+    empty = OccupancyMatrix(
+        version=(0,),
+        rooms=[RoomInfo(1, "101", "본관", 30)],
+        slots=slots,
+        room_bit={1: 0},
+        slot_index={s.id: i for i, s in enumerate(slots)},
+        building_masks={"본관": 1},
+        all_rooms=1,
+        occupied=[0, 0, 0],
+        blackouts=blackouts or {},
+        day_slots={"Mon": [0, 1, 2]},
+    )
+    return empty.patched((1,), [], [(1, 10), (1, 11), (1, 12)])
+
+
+def test_room_window_free_and_busy():
+    matrix = _matrix()
+    assert matrix.weekly_intervals(1, "Mon") == ([540, 780], [660, 840])
+    # free: the whole gap between the two busy stretches
+    assert matrix.room_window(1, "Mon", 690, 720) == (True, (660, 780))
+    # busy: first gap at or after the request that fits an hour
+    assert matrix.room_window(1, "Mon", 540, 600) == (False, (660, 780))
+    # 2h fits exactly in 11:00-13:00; 2h30 only after 14:00
+    assert matrix.room_window(1, "Mon", 600, 720) == (False, (660, 780))
+    assert matrix.room_window(1, "Mon", 600, 750) == (False, (840, 24 * 60))
+    assert matrix.room_window(1, "Tue", 540, 600) == (True, (0, 24 * 60))
+
+
+def test_room_window_includes_blackouts_on_the_date():
+    matrix = _matrix({1: [(datetime(2025, 9, 1, 11, 30), datetime(2025, 9, 1, 12, 0))]})
+    assert matrix.room_window(1, "Mon", 690, 720, MONDAY) == (False, (720, 780))
+    assert matrix.room_window(1, "Mon", 665, 685, MONDAY) == (True, (660, 690))
+    # another Monday has no blackout
+    assert matrix.room_window(1, "Mon", 690, 720, date(2025, 9, 8)) == (True, (660, 780))
+
+
+def test_patched_leaves_the_original_untouched():
+    matrix = _matrix()
+    before = matrix.weekly_intervals(1, "Mon")
+    freed = matrix.patched((2,), [(1, 12)], [])
+    assert freed.weekly_intervals(1, "Mon") == ([540], [660])
+    assert freed.room_window(1, "Mon", 780, 840) == (True, (660, 24 * 60))
+    assert matrix.weekly_intervals(1, "Mon") == before
+    assert freed.occupied == [1, 1, 0]
+    assert freed.version == (2,)
+    assert matrix.occupied == [1, 1, 1]
+    assert matrix.counts[(1, 12)] == 1
+    # removing a cell that is not occupied is a no-op, double bookings need two removals
+    doubled = matrix.patched((3,), [(1, 99)], [(1, 10)])
+    assert doubled.patched((4,), [(1, 10)], []).occupied == [1, 1, 1]
+    assert doubled.patched((4,), [(1, 10), (1, 10)], []).occupied == [0, 1, 1]
+
+
+def _assign(campus, *triples):
+    _, cs, rs, ss = campus
+    return [AssignmentLite(course_id=cs[c], room_id=rs[r], slot_ids=[ss[s]]) for c, r, s in triples]
+
+
+def _cells(matrix: OccupancyMatrix) -> set[tuple[int, int]]:
+    return {
+        (room.id, slot.id)
+        for i, slot in enumerate(matrix.slots)
+        for room in matrix.rooms_in(matrix.occupied[i])
+    }
+
+
+def test_publish_carries_the_cached_matrix_forward(db, campus):
+    tenant, _, rs, ss = campus
+    plans.publish_plan(db, tenant.id, _assign(campus, (0, 0, 0), (1, 1, 1)))
+    before = occupancy.get_occupancy(db, tenant)
+    assert _cells(before) == {(rs[0], ss[0]), (rs[1], ss[1])}
+
+    plans.publish_plan(db, tenant.id, _assign(campus, (0, 0, 0), (2, 2, 2)))
+    db.refresh(tenant)
+    after = occupancy.get_occupancy(db, tenant)
+    assert after is not before  # patched copy, not a rebuild of the old one in place
+    assert after.built_at == before.built_at  # and served from the cache
+    assert _cells(after) == {(rs[0], ss[0]), (rs[2], ss[2])}
+    assert _cells(before) == {(rs[0], ss[0]), (rs[1], ss[1])}
+
+    occupancy.invalidate_occupancy(tenant.id)
+    assert _cells(occupancy.get_occupancy(db, tenant)) == _cells(after)
+
+
+def test_rollback_rebuilds_for_the_restored_plan(db, campus):
+    tenant, _, rs, ss = campus
+    first = plans.publish_plan(db, tenant.id, _assign(campus, (0, 0, 0)))
+    plans.publish_plan(db, tenant.id, _assign(campus, (1, 1, 1)))
+    db.refresh(tenant)
+    assert _cells(occupancy.get_occupancy(db, tenant)) == {(rs[1], ss[1])}
+
+    plans.activate_plan(db, tenant, first["plan_id"])
+    assert _cells(occupancy.get_occupancy(db, tenant)) == {(rs[0], ss[0])}
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import Assignment, Plan, Tenant
+from app.services import plans
+from app.services.scheduler.types import AssignmentLite
+
+
+def _plan(campus, *triples):
+    _, cs, rs, ss = campus
+    return [AssignmentLite(course_id=cs[c], room_id=rs[r], slot_ids=[ss[s]]) for c, r, s in triples]
+
+
+def _key(campus, *triples):
+    _, cs, rs, ss = campus
+    return sorted((cs[c], rs[r], ss[s]) for c, r, s in triples)
+
+
+def _members(db, tenant, plan_id):
+    rows = db.execute(
+        select(Assignment.course_id, Assignment.room_id, Assignment.timeslot_id).where(
+            Assignment.tenant_id == tenant.id, plans.plan_members(plan_id)
+        )
+    ).all()
+    return sorted(tuple(row) for row in rows)
+
+
+def _row_count(db):
+    return db.execute(select(func.count()).select_from(Assignment)).scalar_one()
+
+
+P1 = [(0, 0, 0), (1, 1, 1), (2, 2, 2)]
+P2 = [(0, 0, 0), (1, 1, 3), (3, 0, 4)]
+P3 = [(0, 0, 0), (4, 2, 5)]
+
+
+def test_publish_writes_only_the_diff(db, campus):
+    tenant = campus[0]
+    first = plans.publish_plan(db, tenant.id, _plan(campus, *P1))
+    assert first["published"] and first["previous_plan_id"] is None
+    assert (first["inserted"], first["deleted"], first["unchanged"]) == (3, 0, 0)
+
+    second = plans.publish_plan(db, tenant.id, _plan(campus, *P2))
+    assert second["previous_plan_id"] == first["plan_id"]
+    assert (second["inserted"], second["deleted"], second["unchanged"]) == (2, 2, 1)
+    assert _row_count(db) == 5  # the shared (0, 0, 0) row is stored once
+
+    assert _members(db, tenant, first["plan_id"]) == _key(campus, *P1)
+    assert _members(db, tenant, second["plan_id"]) == _key(campus, *P2)
+    db.refresh(tenant)
+    assert tenant.active_plan_id == second["plan_id"]
+
+
+def test_unchanged_publish_keeps_the_active_plan(db, campus):
+    tenant = campus[0]
+    first = plans.publish_plan(db, tenant.id, _plan(campus, *P1))
+    again = plans.publish_plan(db, tenant.id, _plan(campus, *reversed(P1)))
+    assert not again["published"]
+    assert again["plan_id"] == first["plan_id"]
+    assert db.execute(select(func.count()).select_from(Plan)).scalar_one() == 1
+    assert _row_count(db) == 3
+
+
+def test_publish_after_rollback_keeps_every_plan_whole(db, campus):
+    tenant = campus[0]
+    first = plans.publish_plan(db, tenant.id, _plan(campus, *P1))
+    second = plans.publish_plan(db, tenant.id, _plan(campus, *P2))
+
+    plans.activate_plan(db, tenant, first["plan_id"])
+    assert tenant.active_plan_id == first["plan_id"]
+    rolled = db.execute(select(Assignment.course_id).where(plans.plan_scope(tenant))).scalars().all()
+    assert sorted(rolled) == sorted(c for c, _, _ in _key(campus, *P1))
+
+    third = plans.publish_plan(db, tenant.id, _plan(campus, *P3))
+    assert third["previous_plan_id"] == first["plan_id"]
+    assert _members(db, tenant, first["plan_id"]) == _key(campus, *P1)
+    assert _members(db, tenant, second["plan_id"]) == _key(campus, *P2)
+    assert _members(db, tenant, third["plan_id"]) == _key(campus, *P3)
+
+
+def test_locked_rows_survive_publishes(db, campus):
+    tenant, cs, rs, ss = campus
+    first = plans.publish_plan(db, tenant.id, _plan(campus, *P1))
+    row = db.execute(
+        select(Assignment).where(Assignment.course_id == cs[2], plans.plan_members(first["plan_id"]))
+    ).scalar_one()
+    row.status = "locked"
+    db.commit()
+
+    second = plans.publish_plan(db, tenant.id, _plan(campus, *P3))
+    assert second["deleted"] == 1  # (1, 1, 1); the locked row is not diffed
+    assert (cs[2], rs[2], ss[2]) in _members(db, tenant, second["plan_id"])
+
+
+def test_activate_rejects_unknown_and_foreign_plans(db, campus):
+    tenant = campus[0]
+    other = Tenant(name="다른대학")
+    db.add(other)
+    db.commit()
+    mine = plans.publish_plan(db, tenant.id, _plan(campus, *P1))
+    with pytest.raises(LookupError):
+        plans.activate_plan(db, other, mine["plan_id"])
+    with pytest.raises(LookupError):
+        plans.activate_plan(db, tenant, 999)
+
+
+def test_prune_drops_rows_outside_every_kept_range(db, campus):
+    tenant = campus[0]
+    first = plans.publish_plan(db, tenant.id, _plan(campus, *P1))
+    second = plans.publish_plan(db, tenant.id, _plan(campus, *P2))
+    third = plans.publish_plan(db, tenant.id, _plan(campus, *P3))
+    assert _row_count(db) == 6
+
+    assert plans.prune_plans(db, tenant.id, keep=2) == 1
+    assert [p.id for p in plans.list_plans(db, tenant.id)] == [third["plan_id"], second["plan_id"]]
+    # only plan 1's (1, 1, 1) and (2, 2, 2) were in no remaining plan
+    assert _row_count(db) == 4
+    assert _members(db, tenant, second["plan_id"]) == _key(campus, *P2)
+    assert _members(db, tenant, third["plan_id"]) == _key(campus, *P3)
+    assert first["plan_id"] not in [p.id for p in plans.list_plans(db, tenant.id)]
+
+
+def test_prune_keeps_the_active_plan_after_rollback(db, campus):
+    tenant = campus[0]
+    first = plans.publish_plan(db, tenant.id, _plan(campus, *P1))
+    plans.publish_plan(db, tenant.id, _plan(campus, *P2))
+    third = plans.publish_plan(db, tenant.id, _plan(campus, *P3))
+    plans.activate_plan(db, tenant, first["plan_id"])
+
+    plans.prune_plans(db, tenant.id, keep=1)
+    assert sorted(p.id for p in plans.list_plans(db, tenant.id)) == [first["plan_id"], third["plan_id"]]
+    assert _members(db, tenant, first["plan_id"]) == _key(campus, *P1)
+    assert _members(db, tenant, third["plan_id"]) == _key(campus, *P3)
+
+
+def test_legacy_rows_become_the_first_plan(db, campus):
+    tenant, cs, rs, ss = campus
+    db.add(Assignment(tenant_id=tenant.id, course_id=cs[0], room_id=rs[0], timeslot_id=ss[0]))
+    db.add(Assignment(tenant_id=tenant.id, course_id=cs[5], room_id=rs[1], timeslot_id=ss[5]))
+    db.commit()
+    assert len(db.execute(select(Assignment.id).where(plans.plan_scope(tenant))).all()) == 2
+
+    result = plans.publish_plan(db, tenant.id, _plan(campus, *P3))
+    legacy = result["previous_plan_id"]
+    assert db.get(Plan, legacy).source == "legacy"
+    assert (result["inserted"], result["deleted"], result["unchanged"]) == (1, 1, 1)
+    assert _members(db, tenant, legacy) == _key(campus, (0, 0, 0), (5, 1, 5))
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+
+from app.models import CourseReview, Student, Tenant
+from app.services import review_analysis
+from app.services.recommendation import extract_review_signals
+from app.services.review_analysis import analyze_pending_reviews, review_analysis_status, run_review_analysis
+
+
+@pytest.fixture()
+def sessions(session_factory, monkeypatch):
+    monkeypatch.setattr(review_analysis, "SessionLocal", session_factory)
+    review_analysis._STATS.clear()
+    yield session_factory
+    review_analysis._STATS.clear()
+
+
+def _student(db, tenant_id, **profile):
+    student = Student(tenant_id=tenant_id, name="학생", profile=profile)
+    db.add(student)
+    db.flush()
+    return student
+
+
+def _review(db, tenant_id, course_id, student=None, *, answers=None, comment=None):
+    db.add(
+        CourseReview(
+            tenant_id=tenant_id,
+            course_id=course_id,
+            student_id=student.id if student else None,
+            answers=answers,
+            comment=comment,
+        )
+    )
+
+
+def test_extract_review_signals():
+    signals = extract_review_signals([5, 4, 3, 4, 1], "과제 많음 과제 좋아요 Team team project")
+    assert signals["answers"] == [5, 4, 3, 4]
+    assert signals["avg"] == 4.0
+    assert signals["keywords"][:2] == ["과제", "team"]
+    assert extract_review_signals(None, None) == {"answers": [], "avg": None, "keywords": []}
+
+
+def test_pending_reviews_are_folded_in_batches(db, campus):
+    tenant, cs, _, _ = campus
+    alice = _student(db, tenant.id, preferred_tags=["실습"])
+    bob = _student(db, tenant.id)
+    _review(db, tenant.id, cs[0], alice, answers=[5, 5, 5, 5], comment="실습 재미 재미")
+    _review(db, tenant.id, cs[1], alice, comment="토론 토론 발표")
+    _review(db, tenant.id, cs[2], bob, answers=[2, 2, 2, 2])
+    _review(db, tenant.id, cs[3], None, comment="익명 후기")
+    _review(db, tenant.id, cs[4], bob, comment="코딩")
+    db.commit()
+
+    totals = analyze_pending_reviews(db, tenant.id, batch_size=2)
+    # batches: alice×2 (one profile write), bob + anonymous, bob
+    assert totals == {"reviews": 5, "batches": 3, "profiles_updated": 3}
+    assert analyze_pending_reviews(db, tenant.id, batch_size=2)["reviews"] == 0
+    assert db.execute(select(CourseReview.id).where(CourseReview.analyzed_at.is_(None))).all() == []
+
+    db.expire_all()
+    profile = db.get(Student, alice.id).profile
+    assert profile["preferred_tags"] == ["실습", "재미", "토론", "발표"]
+    assert set(profile["review_signals"]) == {str(cs[0]), str(cs[1])}
+    assert profile["review_signals"][str(cs[0])]["avg"] == 5.0
+    assert db.get(Student, bob.id).profile["preferred_tags"] == ["코딩"]
+
+
+def test_reviews_of_other_tenants_are_left_pending(db, campus):
+    tenant, cs, _, _ = campus
+    other = Tenant(name="다른대학")
+    db.add(other)
+    db.flush()
+    _review(db, tenant.id, cs[0], comment="좋아요")
+    _review(db, other.id, cs[0], comment="별로")
+    db.commit()
+    analyze_pending_reviews(db, tenant.id)
+    assert review_analysis_status(db, tenant.id)["pending"] == 0
+    assert review_analysis_status(db, other.id)["pending"] == 1
+
+
+def test_runs_are_recorded(sessions, db, campus, monkeypatch):
+    tenant, cs, _, _ = campus
+    student = _student(db, tenant.id)
+    _review(db, tenant.id, cs[0], student, comment="명강의")
+    db.commit()
+
+    assert run_review_analysis(tenant.id)["reviews"] == 1
+    status = review_analysis_status(db, tenant.id)
+    assert status["pending"] == 0 and status["runs"] == 1 and status["reviews_total"] == 1
+    assert status["last_run"]["batches"] == 1 and status["last_error"] is None
+
+    def broken(db, tenant_id, **kwargs):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(review_analysis, "analyze_pending_reviews", broken)
+    with pytest.raises(RuntimeError):
+        run_review_analysis(tenant.id)
+    status = review_analysis_status(db, tenant.id)
+    assert status["runs"] == 2 and status["failures"] == 1
+    assert status["last_error"] == "RuntimeError: database is locked"
+
+
+def test_sweep_covers_every_tenant_with_pending_reviews(sessions, db, campus):
+    tenant, cs, _, _ = campus
+    other = Tenant(name="다른대학")
+    db.add(other)
+    db.flush()
+    _review(db, tenant.id, cs[0], comment="하나")
+    _review(db, other.id, cs[1], comment="둘")
+    db.commit()
+
+    review_analysis._sweep_once()
+    assert review_analysis_status(db, tenant.id)["pending"] == 0
+    assert review_analysis_status(db, other.id)["pending"] == 0
+    assert review_analysis_status(db, other.id)["runs"] == 1
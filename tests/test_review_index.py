@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from sqlalchemy import select
+
+from app.models import CourseReview, CourseTermCount, ReviewTerm
+from app.services.review_index import course_facets, index_review, rebuild_review_index, review_term_filters, review_terms
+
+
+def _review(db, tenant_id, course_id, tags=(), comment=None) -> int:
+    review = CourseReview(tenant_id=tenant_id, course_id=course_id, tags=list(tags), comment=comment)
+    db.add(review)
+    db.flush()
+    index_review(db, review)
+    db.commit()
+    return review.id
+
+
+def _matching(db, course_id, **filters) -> list[int]:
+    return db.execute(
+        select(CourseReview.id)
+        .where(CourseReview.course_id == course_id, *review_term_filters(course_id, **filters))
+        .order_by(CourseReview.id)
+    ).scalars().all()
+
+
+def _table(db, model, *columns) -> set[tuple]:
+    return set(db.execute(select(*(getattr(model, c) for c in columns))).all())
+
+
+def test_review_terms_are_normalized_and_distinct():
+    terms = review_terms([" 과제많음 ", "과제많음", "", "TeamProject"], "과제가 많아요. 과제가 재밌어요! A b")
+    assert terms == {"tag": {"과제많음", "teamproject"}, "keyword": {"과제가", "많아요", "재밌어요"}}
+    assert review_terms(None, None) == {"tag": set(), "keyword": set()}
+
+
+def test_filters_match_tags_and_keyword_prefixes(db, campus):
+    tenant, cs, _, _ = campus
+    first = _review(db, tenant.id, cs[0], ["꿀강", "팀플"], "과제가 적어요")
+    second = _review(db, tenant.id, cs[0], ["꿀강"], "과제는 많지만 유익")
+    third = _review(db, tenant.id, cs[0], ["팀플"], "시험 어려움")
+    _review(db, tenant.id, cs[1], ["꿀강"], "과제 없음")  # other course
+
+    assert _matching(db, cs[0]) == [first, second, third]
+    assert _matching(db, cs[0], tags=["꿀강"]) == [first, second]
+    assert _matching(db, cs[0], tags=["꿀강", " 팀플 "]) == [first]
+    assert _matching(db, cs[0], keyword="과제") == [first, second]
+    assert _matching(db, cs[0], tags=["팀플"], keyword="과제") == [first]
+    assert _matching(db, cs[0], keyword="숙제") == []
+    assert _matching(db, cs[0], tags=["  "], keyword=" ") == [first, second, third]
+
+
+def test_facets_count_per_course(db, campus):
+    tenant, cs, _, _ = campus
+    _review(db, tenant.id, cs[0], ["꿀강", "팀플"], "과제 과제 적음")
+    _review(db, tenant.id, cs[0], ["꿀강"], "적음")
+    _review(db, tenant.id, cs[1], ["팀플"])
+    facets = course_facets(db, cs[0])
+    assert facets["tags"] == [{"term": "꿀강", "count": 2}, {"term": "팀플", "count": 1}]
+    assert facets["keywords"] == [{"term": "적음", "count": 2}, {"term": "과제", "count": 1}]
+    assert course_facets(db, cs[0], limit=1)["tags"] == [{"term": "꿀강", "count": 2}]
+    assert course_facets(db, cs[5]) == {"tags": [], "keywords": []}
+
+
+def test_rebuild_matches_incremental_indexing(db, campus):
+    tenant, cs, _, _ = campus
+    _review(db, tenant.id, cs[0], ["꿀강", "팀플"], "과제가 적어요")
+    _review(db, tenant.id, cs[1], ["꿀강"], "시험 어려움 시험")
+    # a review written without going through index_review
+    db.add(CourseReview(tenant_id=tenant.id, course_id=cs[1], tags=["팀플"], comment="발표"))
+    db.commit()
+    postings = _table(db, ReviewTerm, "review_id", "kind", "term", "course_id")
+    counts = _table(db, CourseTermCount, "course_id", "kind", "term", "count")
+
+    assert rebuild_review_index(db, tenant.id) == len(postings) + 2
+    assert _table(db, ReviewTerm, "review_id", "kind", "term", "course_id") > postings
+    rebuilt = _table(db, CourseTermCount, "course_id", "kind", "term", "count")
+    assert (cs[1], "tag", "팀플", 1) in rebuilt and (cs[1], "keyword", "발표", 1) in rebuilt
+    assert rebuilt - {(cs[1], "tag", "팀플", 1), (cs[1], "keyword", "발표", 1)} == counts
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import random
+from itertools import combinations
+
+import pytest
+
+from app.services.scheduler.types import AssignmentLite
+from app.services.timetable_search import (
+    PERIODS_PER_DAY,
+    Candidate,
+    avoid_mask,
+    build_candidates,
+    score_candidates,
+    slot_bit,
+    top_subsets,
+)
+
+
+def _days(mask: int) -> int:
+    days = 0
+    for bit in range(5 * PERIODS_PER_DAY):
+        if mask >> bit & 1:
+            days |= 1 << (bit // PERIODS_PER_DAY)
+    return days
+
+
+def _random_candidates(rng: random.Random, n: int) -> list[Candidate]:
+    out = []
+    for i in range(n):
+        mask = 0
+        for _ in range(rng.randint(1, 3)):
+            mask |= 1 << rng.randrange(5 * PERIODS_PER_DAY)
+        out.append(Candidate(course_id=i + 1, blocks=[], mask=mask, days=_days(mask), order=i, weight=round(rng.uniform(0.2, 3.0), 3)))
+    return out
+
+
+def _score(chosen, day_weight: float) -> float:
+    days = 0
+    for c in chosen:
+        days |= c.days
+    return sum(c.weight for c in chosen) - day_weight * days.bit_count()
+
+
+def _best(candidates, **kwargs):
+    return top_subsets(candidates, k=1, **kwargs)[0]
+
+
+def _feasible(candidates, max_courses):
+    yield ()
+    for size in range(1, max_courses + 1):
+        for combo in combinations(candidates, size):
+            mask = 0
+            for c in combo:
+                if mask & c.mask:
+                    break
+                mask |= c.mask
+            else:
+                yield combo
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_best_selection_matches_brute_force(seed):
+    rng = random.Random(seed)
+    candidates = _random_candidates(rng, rng.randint(4, 11))
+    max_courses = rng.randint(1, 5)
+    day_weight = rng.choice([0.0, 0.3, 1.5])
+    expected = max(_score(combo, day_weight) for combo in _feasible(candidates, max_courses))
+    selection = _best(candidates, max_courses=max_courses, day_weight=day_weight)
+    assert selection.optimal
+    assert selection.score == pytest.approx(expected, abs=1e-4)
+    assert len(selection.candidates) <= max_courses
+    mask = 0
+    for c in selection.candidates:
+        assert not mask & c.mask
+        mask |= c.mask
+    assert selection.score == pytest.approx(_score(selection.candidates, day_weight), abs=1e-4)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_top_subsets_are_diverse_and_sorted(seed):
+    rng = random.Random(100 + seed)
+    candidates = _random_candidates(rng, 10)
+    selections = top_subsets(candidates, max_courses=4, day_weight=0.3, k=3, min_difference=2)
+    best = _best(candidates, max_courses=4, day_weight=0.3)
+    assert selections[0].score == best.score
+    assert [s.score for s in selections] == sorted((s.score for s in selections), reverse=True)
+    ids = [frozenset(c.course_id for c in s.candidates) for s in selections]
+    for a, b in combinations(ids, 2):
+        assert max(len(a - b), len(b - a)) >= 2
+
+
+def test_empty_timetable_wins_when_days_cost_more_than_courses():
+    rng = random.Random(19)
+    candidates = _random_candidates(rng, 6)
+    selection = _best(candidates, max_courses=3, day_weight=10.0)
+    assert selection.candidates == []
+    assert selection.score == 0.0
+    assert all(s.candidates for s in top_subsets(candidates, max_courses=3, day_weight=1.0, k=4)[1:])
+
+
+def test_node_limit_marks_selection_not_optimal():
+    rng = random.Random(3)
+    candidates = _random_candidates(rng, 14)
+    selection = _best(candidates, max_courses=6, day_weight=0.3, node_limit=5)
+    assert not selection.optimal
+    assert selection.nodes <= 6
+
+
+CATALOG = {
+    1: {"day": "Mon", "period": 1},
+    2: {"day": "Mon", "period": 2},
+    3: {"day": "Tue", "period": 1},
+    4: {"day": "Wed", "period": 5},
+}
+
+
+def _block(course_id: int, *slot_ids: int, room_id: int = 1) -> AssignmentLite:
+    return AssignmentLite(course_id=course_id, room_id=room_id, slot_ids=list(slot_ids))
+
+
+def test_build_candidates_groups_blocks_per_course():
+    candidates = build_candidates(
+        [
+            _block(1, 1, 2),
+            _block(1, 3),
+            _block(1, 1, 2, room_id=2),  # split section: same periods in another room
+            _block(2, 4),
+            _block(2, 4, 99),  # slot outside the catalog drops the whole course
+            _block(3, 1),
+            _block(3, 1, 2),  # partly overlapping own blocks
+            _block(4, 4),
+        ],
+        CATALOG,
+    )
+    assert [c.course_id for c in candidates] == [1, 4]
+    first = candidates[0]
+    assert first.mask == slot_bit("Mon", 1) | slot_bit("Mon", 2) | slot_bit("Tue", 1)
+    assert first.days == 0b11
+    assert len(first.blocks) == 2
+
+
+def test_avoid_mask_filters_when_scoring():
+    candidates = build_candidates([_block(1, 1), _block(2, 2), _block(3, 3), _block(4, 4)], CATALOG)
+    weights = {"course": 1.0, "hour": 0.0, "rating": 0.0, "preferred": 0.0}
+
+    def kept(avoid_days, avoid_periods):
+        exclude = avoid_mask(avoid_days, avoid_periods)
+        return [
+            c.course_id
+            for c in score_candidates(candidates, preferred_ids=set(), ratings={}, weights=weights, exclude=exclude)
+        ]
+
+    assert kept(set(), set()) == [1, 2, 3, 4]
+    assert kept({"Mon"}, set()) == [3, 4]
+    assert kept(set(), {1}) == [2, 4]
+    assert kept({"Wed"}, {2, 99}) == [1, 3]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event, null, select, update
+
+from app.models import Assignment, Plan, Room
+from app.services import plans, utilization
+from app.services.scheduler.types import AssignmentLite
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    utilization._CACHE.clear()
+    yield
+    utilization._CACHE.clear()
+
+
+def _publish(db, campus, *triples):
+    tenant, cs, rs, ss = campus
+    result = plans.publish_plan(
+        db, tenant.id, [AssignmentLite(course_id=cs[c], room_id=rs[r], slot_ids=[ss[s]]) for c, r, s in triples]
+    )
+    db.refresh(tenant)
+    return result["plan_id"]
+
+
+def _stored(db, plan_id):
+    return db.execute(select(Plan.rollup).where(Plan.id == plan_id)).scalar_one()
+
+
+def test_publish_stores_the_rollup_reads_serve(db, campus):
+    plan_id = _publish(db, campus, (0, 0, 0), (1, 0, 1), (2, 1, 1))
+    rollup = utilization.get_rollup(db, campus[0])
+    assert rollup == _stored(db, plan_id)
+    assert rollup["occupied"] == 3
+    assert rollup["cells"] == 3 * 6
+    assert rollup["buildings"][utilization.UNSPECIFIED]["floors"][utilization.UNSPECIFIED]["rooms"][
+        str(campus[2][0])
+    ]["occupied"] == 2
+
+
+def _writes_during(db, fn):
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return result, statements
+
+
+def test_get_rollup_never_writes(db, campus):
+    tenant = campus[0]
+    plan_id = _publish(db, campus, (0, 0, 0), (1, 1, 1))
+    db.execute(update(Plan).where(Plan.id == plan_id).values(rollup=null()))
+    db.commit()
+
+    rollup, writes = _writes_during(db, lambda: utilization.get_rollup(db, tenant))
+    assert rollup["occupied"] == 2
+    assert writes == []
+    assert _stored(db, plan_id) is None
+
+    # a catalog change is recomputed in memory too; the stored copy stays as published
+    utilization.backfill_rollups(db)
+    db.add(Room(tenant_id=tenant.id, name="R9"))
+    db.commit()
+    fresh, writes = _writes_during(db, lambda: utilization.get_rollup(db, tenant))
+    assert fresh["room_count"] == 4 and fresh["occupied"] == 2
+    assert writes == []
+    assert _stored(db, plan_id)["room_count"] == 3
+
+
+def test_backfill_fills_plans_without_rollups(db, campus):
+    first = _publish(db, campus, (0, 0, 0))
+    second = _publish(db, campus, (0, 0, 0), (1, 1, 1))
+    db.execute(update(Plan).values(rollup=null()))
+    db.commit()
+
+    assert utilization.backfill_rollups(db) == 2
+    assert _stored(db, first)["occupied"] == 1
+    assert _stored(db, second)["occupied"] == 2
+    assert utilization.backfill_rollups(db) == 0
+
+
+def test_legacy_plan_gets_a_rollup_when_adopted(db, campus):
+    tenant, cs, rs, ss = campus
+    db.add(Assignment(tenant_id=tenant.id, course_id=cs[0], room_id=rs[0], timeslot_id=ss[0]))
+    db.commit()
+    result = plans.publish_plan(db, tenant.id, [AssignmentLite(course_id=cs[1], room_id=rs[1], slot_ids=[ss[1]])])
+    assert _stored(db, result["previous_plan_id"])["occupied"] == 1
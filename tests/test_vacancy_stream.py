@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from app.services import vacancy_stream
+from app.services.vacancy_stream import notify_plan_change, subscribe
+
+TIMEOUT = 2.0
+
+
+def _state(*occupied: int, plan_id: int = 1) -> dict:
+    return {
+        "plan_id": plan_id,
+        "day": "Mon",
+        "period": None,
+        "total_rooms": 3,
+        "occupied_rooms": len(occupied),
+        "vacant_rooms": 3 - len(occupied),
+        "utilization_ratio": round(len(occupied) / 3, 4),
+        "rooms": {"1": "101", "2": "102", "3": "103"},
+        "occupied": sorted(occupied),
+    }
+
+
+class FakeLive:
+    """Stand-in for ``_live_state``: returns ``current`` (or raises queued errors) and counts calls."""
+
+    def __init__(self, state: dict) -> None:
+        self.current = state
+        self.errors: list[Exception] = []
+        self.calls = 0
+
+    def __call__(self, tenant_id, building):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.current, 60.0
+
+
+@pytest.fixture()
+def live(monkeypatch):
+    fake = FakeLive(_state(1))
+    monkeypatch.setattr(vacancy_stream, "_live_state", fake)
+    monkeypatch.setattr(vacancy_stream, "_RETRY_MIN", 0.01)
+    vacancy_stream._HUBS.clear()
+    yield fake
+    vacancy_stream._HUBS.clear()
+
+
+def _parse(frame: str) -> tuple[str, dict]:
+    event, data = frame.strip().split("\n")
+    return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+async def _next(stream) -> tuple[str, dict]:
+    return _parse(await asyncio.wait_for(stream.__anext__(), TIMEOUT))
+
+
+def test_clients_share_one_hub_and_get_deltas(live):
+    async def scenario():
+        first = subscribe(1)
+        assert await _next(first) == ("snapshot", _state(1))
+        second = subscribe(1)
+        # a late joiner gets the cached snapshot without another refresh
+        assert await _next(second) == ("snapshot", _state(1))
+        assert live.calls == 1
+        assert len(vacancy_stream._HUBS) == 1
+
+        live.current = _state(2, 3, plan_id=2)
+        notify_plan_change(1)
+        delta = {
+            "plan_id": 2,
+            "occupied_rooms": 2,
+            "vacant_rooms": 1,
+            "utilization_ratio": 0.6667,
+            "taken": [2, 3],
+            "freed": [1],
+        }
+        assert await _next(first) == ("delta", delta)
+        assert await _next(second) == ("delta", delta)
+        # snapshot for the next joiner is the state after the delta
+        third = subscribe(1)
+        assert await _next(third) == ("snapshot", _state(2, 3, plan_id=2))
+
+        hub = vacancy_stream._HUBS[(1, None)]
+        for stream in (first, second, third):
+            await stream.aclose()
+        assert vacancy_stream._HUBS == {}
+        await asyncio.wait([hub.task], timeout=TIMEOUT)
+        assert hub.task.cancelled()
+
+    asyncio.run(scenario())
+
+
+def test_unchanged_refresh_sends_nothing(live):
+    async def scenario():
+        stream = subscribe(1)
+        await _next(stream)
+        notify_plan_change(1)
+        notify_plan_change(2)  # other tenants' hubs are not woken
+        await asyncio.sleep(0.05)
+        assert live.calls == 2
+        live.current = _state(1, 2)
+        notify_plan_change(1)
+        event, data = await _next(stream)
+        assert event == "delta" and data["taken"] == [2] and "freed" not in data
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_failed_refresh_retries_and_keeps_the_hub(live):
+    live.errors = [RuntimeError("database is locked"), RuntimeError("database is locked")]
+
+    async def scenario():
+        stream = subscribe(1)
+        assert await _next(stream) == ("snapshot", _state(1))
+        assert live.calls == 3
+        await stream.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_dead_hub_ends_streams_and_unregisters(live):
+    async def scenario():
+        stream = subscribe(1)
+        await _next(stream)
+        hub = vacancy_stream._HUBS[(1, None)]
+        hub.task.cancel()
+        with pytest.raises(StopAsyncIteration):
+            await asyncio.wait_for(stream.__anext__(), TIMEOUT)
+        assert (1, None) not in vacancy_stream._HUBS
+
+        # the next subscriber starts a fresh hub
+        again = subscribe(1)
+        assert await _next(again) == ("snapshot", _state(1))
+        assert vacancy_stream._HUBS[(1, None)] is not hub
+        await again.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_slow_client_is_dropped(live):
+    async def scenario():
+        hub = vacancy_stream._Hub(tenant_id=1, building=None, loop=asyncio.get_running_loop())
+        slow: asyncio.Queue = asyncio.Queue(maxsize=2)
+        fast: asyncio.Queue = asyncio.Queue(maxsize=8)
+        hub.clients = {slow, fast}
+        for i in range(3):
+            hub.broadcast(f"frame{i}")
+        assert hub.clients == {fast}
+        assert [slow.get_nowait(), slow.get_nowait()] == ["frame1", None]
+        assert fast.qsize() == 3
+
+    asyncio.run(scenario())